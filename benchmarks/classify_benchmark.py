@@ -0,0 +1,105 @@
+"""Micro-benchmark for Marvin_Helper.classify_command.
+
+Compares the original substring scan, which tested every keyword, with the
+scan classify_command uses for small tables (which moves on to the next
+label at the first keyword found) and the KeywordAutomaton it compiles for
+larger ones, on Marvin's own keyword table and on synthetic tables of up to
+ten thousand keywords.
+
+Usage:
+    python benchmarks/classify_benchmark.py [--commands N]
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from marvin_helper import KeywordAutomaton, Marvin_Helper  # noqa: E402
+
+
+def naive_classify(command_keywords, command):
+    """The original classify_command implementation."""
+    labels = []
+    for label in command_keywords:
+        for keyword in command_keywords[label]:
+            if keyword in command:
+                labels.append(label)
+    return labels
+
+
+def random_word(rng, length):
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(length))
+
+
+def make_keywords(rng, num_keywords, num_labels=16):
+    """Builds a keyword table with num_keywords keywords spread over
+        num_labels labels, on top of Marvin's own keywords."""
+    keywords = {label: list(words) for label, words
+                in Marvin_Helper().command_keywords.items()}
+    for i in range(num_keywords):
+        label = "label{}".format(i % num_labels)
+        keywords.setdefault(label, []).append(
+            random_word(rng, rng.randint(4, 10)))
+    return keywords
+
+
+def make_commands(rng, keywords, num_commands):
+    all_keywords = [k for words in keywords.values() for k in words]
+    commands = []
+    for _ in range(num_commands):
+        words = [random_word(rng, rng.randint(2, 8))
+                 for _ in range(rng.randint(3, 12))]
+        words.insert(rng.randrange(len(words)), rng.choice(all_keywords))
+        commands.append(" ".join(words))
+    return commands
+
+
+def time_per_command(fun, commands):
+    start = time.perf_counter()
+    for command in commands:
+        fun(command)
+    return (time.perf_counter() - start) / len(commands)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--commands", type=int, default=2000)
+    args = parser.parse_args()
+    rng = random.Random(0)
+
+    helper = Marvin_Helper()
+    print("{:>9} {:>12} {:>12} {:>15} {:>9} {:>8} {:>9}".format(
+        "keywords", "naive cmd/s", "scan cmd/s", "automaton cmd/s",
+        "build ms", "speedup", "classify"))
+    # 0 extra keywords is Marvin's own table, the size classification runs at
+    for num_keywords in (0, 100, 1000, 5000, 10000):
+        keywords = make_keywords(rng, num_keywords)
+        helper.command_keywords = keywords
+        helper.compile_keywords()
+        commands = make_commands(rng, keywords, args.commands)
+        start = time.perf_counter()
+        automaton = KeywordAutomaton(keywords)
+        build = time.perf_counter() - start
+        helper.keyword_automaton, compiled = None, helper.keyword_automaton
+        for command in commands[:200]:
+            expected = list(dict.fromkeys(naive_classify(keywords, command)))
+            assert helper.classify_command(command) == expected, command
+            assert automaton.find_labels(command) == expected, command
+        naive = time_per_command(
+            lambda c: naive_classify(keywords, c), commands)
+        scan = time_per_command(helper.classify_command, commands)
+        found = time_per_command(automaton.find_labels, commands)
+        helper.keyword_automaton = compiled
+        print("{:>9} {:>12.0f} {:>12.0f} {:>15.0f} {:>9.1f} {:>7.1f}x "
+              "{:>9}".format(
+                  sum(len(words) for words in keywords.values()),
+                  1 / naive, 1 / scan, 1 / found, build * 1000,
+                  naive / (scan if compiled is None else found),
+                  "scan" if compiled is None else "automaton"))
+
+if __name__ == "__main__":
+    main()
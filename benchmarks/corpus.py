@@ -0,0 +1,78 @@
+"""Generates corpora of commands for the benchmarks, by filling in templates
+of the commands every module understands."""
+import random
+
+TEMPLATES = [
+    "play {song}",
+    "play {song} by {artist}",
+    "play {song} by {artist} on spotify",
+    "pause my music",
+    "resume spotify",
+    "skip this song",
+    "next song",
+    "previous song",
+    "play playlist {number}",
+    "play my playlist {song}",
+    "what song is this",
+    "what's playing now?",
+    "list my playlists",
+    "volume up",
+    "make it louder",
+    "quieter please",
+    "what's the weather today?",
+    "what's the weather like today",
+    "what is the weather going to be tomorrow",
+    "what's the weather today in {city}",
+    "what's the weather in {city} today?",
+    "what's the weather in {city} going to be tomorrow",
+    "what's the weather going to be on {day}",
+    "what's the weather going to be on {day} in {city}",
+    "what's the weather in {city} on {day}?",
+    "what are my events today",
+    "what's on my calendar tomorrow",
+    "what's my schedule this week",
+    "send a text message",
+    "please send a sms",
+    "what is the stock price of {ticker}",
+    "stock price of {ticker} today?",
+    "what is {topic}",
+    "who is {person}?",
+    "search {topic} on wikipedia",
+    "look up {topic}",
+    "what was the score of the {team} game yesterday?",
+    "score of the {team} game today",
+    "score of the {team} game last {day}?",
+    "what is the record of the {team}",
+    "what is the {team}'s record this year",
+    "play the game score",
+    "tell me a joke",
+    "hello there",
+]
+
+WORDS = {
+    "song": ["hey jude", "yesterday", "bohemian rhapsody", "hotel california",
+             "imagine", "let it be", "smells like teen spirit"],
+    "artist": ["the beatles", "queen", "the eagles", "john lennon",
+               "nirvana"],
+    "number": ["one", "two", "three", "4", "seven"],
+    "city": ["paris", "new york", "los angeles", "boston", "san francisco",
+             "philadelphia"],
+    "day": ["monday", "tuesday", "wednesday", "thursday", "friday",
+            "saturday", "sunday"],
+    "ticker": ["aapl", "msft", "goog", "amzn", "tsla"],
+    "topic": ["siri", "python", "black holes", "the roman empire",
+              "photosynthesis"],
+    "person": ["benjamin franklin", "ada lovelace", "alan turing"],
+    "team": ["dodgers", "yankees", "red sox", "mets", "cubs", "giants"],
+}
+
+
+def make_commands(num_commands, seed=0):
+    """Returns a list of num_commands commands drawn from TEMPLATES."""
+    rng = random.Random(seed)
+    commands = []
+    for _ in range(num_commands):
+        template = rng.choice(TEMPLATES)
+        commands.append(template.format(
+            **{key: rng.choice(words) for key, words in WORDS.items()}))
+    return commands
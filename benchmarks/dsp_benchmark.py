@@ -0,0 +1,161 @@
+"""Benchmark of the post-processing of recorded commands.
+
+Compares the original pure Python is_silent, normalize, trim, add_silence and
+struct.pack stages of MarvinSpeechToText with the NumPy stages in
+modules/speech_to_text/dsp.py, on synthetic recordings of 10 to 60 seconds.
+Reports the time and the peak memory traced by each stage.
+
+Usage:
+    python benchmarks/dsp_benchmark.py [--seconds 10 30 60]
+"""
+import argparse
+import io
+import os
+import sys
+import time
+import tracemalloc
+import wave
+from array import array
+from struct import pack
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+from modules.speech_to_text import dsp  # noqa: E402
+
+RATE = 16000
+CHUNK_SIZE = 1024
+THRESHOLD = 500
+
+
+def naive_is_silent(snd_data):
+    return max(snd_data) < THRESHOLD
+
+
+def naive_normalize(snd_data):
+    MAXIMUM = 16384
+    times = float(MAXIMUM)/max(abs(i) for i in snd_data)
+
+    r = array('h')
+    for i in snd_data:
+        r.append(int(i*times))
+    return r
+
+
+def naive_trim(snd_data):
+    def _trim(snd_data):
+        snd_started = False
+        r = array('h')
+
+        for i in snd_data:
+            if not snd_started and abs(i) > THRESHOLD:
+                snd_started = True
+                r.append(i)
+
+            elif snd_started:
+                r.append(i)
+        return r
+
+    snd_data = _trim(snd_data)
+    snd_data.reverse()
+    snd_data = _trim(snd_data)
+    snd_data.reverse()
+    return snd_data
+
+
+def naive_add_silence(snd_data, seconds):
+    r = array('h', [0 for i in range(int(seconds*RATE))])
+    r.extend(snd_data)
+    r.extend([0 for i in range(int(seconds*RATE))])
+    return r
+
+
+def write_wav(data):
+    wf = wave.open(io.BytesIO(), 'wb')
+    wf.setnchannels(1)
+    wf.setsampwidth(2)
+    wf.setframerate(RATE)
+    wf.writeframes(data)
+    wf.close()
+
+
+def naive_write(data):
+    write_wav(pack('<' + ('h'*len(data)), *data))
+
+
+def make_recording(seconds, rng):
+    """Returns a recording of seconds of quiet noise around loud noise."""
+    samples = rng.randint(-200, 200, int(seconds * RATE)).astype(np.int16)
+    quiet = int(RATE / 2)
+    samples[quiet:-quiet] *= 40
+    return samples
+
+
+def measure(function, *args):
+    """Returns the result of calling function, the seconds it took and the
+        peak memory it allocated."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function(*args)
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def naive_stages(recording):
+    chunks = [array('h', recording[i:i + CHUNK_SIZE].tobytes())
+              for i in range(0, len(recording), CHUNK_SIZE)]
+    r = array('h', recording.tobytes())
+    r, *normalize = measure(naive_normalize, r)
+    r, *trim = measure(naive_trim, r)
+    r, *add_silence = measure(naive_add_silence, r, 0.5)
+    return [
+        ("is_silent", measure(lambda: [naive_is_silent(chunk)
+                                       for chunk in chunks])[1:]),
+        ("normalize", normalize),
+        ("trim", trim),
+        ("add_silence", add_silence),
+        ("write", measure(naive_write, r)[1:]),
+    ]
+
+
+def numpy_stages(recording):
+    chunks = [dsp.as_samples(recording[i:i + CHUNK_SIZE].tobytes())
+              for i in range(0, len(recording), CHUNK_SIZE)]
+    r, *normalize = measure(dsp.normalize, recording)
+    r, *trim = measure(dsp.trim, r, THRESHOLD)
+    r, *add_silence = measure(dsp.add_silence, r, 0.5, RATE)
+    return [
+        ("is_silent", measure(lambda: [dsp.is_silent(chunk, THRESHOLD)
+                                       for chunk in chunks])[1:]),
+        ("normalize", normalize),
+        ("trim", trim),
+        ("add_silence", add_silence),
+        ("write", measure(lambda: write_wav(dsp.frames(r)))[1:]),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=int, nargs="+",
+                        default=[10, 30, 60])
+    args = parser.parse_args()
+    rng = np.random.RandomState(0)
+
+    print("{:>8} {:<12} {:>12} {:>12} {:>12} {:>12}".format(
+        "seconds", "stage", "python ms", "numpy ms", "python KiB",
+        "numpy KiB"))
+    for seconds in args.seconds:
+        recording = make_recording(seconds, rng)
+        naive = naive_stages(recording)
+        vectorized = numpy_stages(recording)
+        for (stage, (naive_time, naive_peak)), (_, (time_, peak)) in zip(
+                naive, vectorized):
+            print("{:>8} {:<12} {:>12.1f} {:>12.2f} {:>12.0f} {:>12.0f}".format(
+                seconds, stage, 1000 * naive_time, 1000 * time_,
+                naive_peak / 1024, peak / 1024))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""Hermetic end-to-end benchmark of every module command.
+
+Routes one command for each label of each module through Marvin.route_command,
+with the external services (OWM, ipstack, Spotify, Google Calendar, Twilio,
+Alpha Vantage, Wikipedia and baseball-reference) replaced by the recordings in
+benchmarks/fixtures/services.pickle. For each label it reports the median
+latency, the most service calls of one run, and the memory blocks allocated and
+peak memory traced by one command.
+
+The number of service calls of each case doesn't depend on the machine, so
+it is checked against the committed benchmarks/baselines/e2e.json, and the
+run fails if a case makes more calls. Timings are only comparable on the
+machine (and Python) they were measured on, so they are checked against a
+baseline saved locally with --save-baseline (and not committed), if there is
+one.
+
+The SMS and Spotify modules act on the world (they send texts and change what
+is playing), so they are always recorded against the stubs in stubs.py.
+Recording the other modules needs the credentials of their services, once:
+    python benchmarks/e2e_benchmark.py --record
+
+With --stub, every module is recorded against the stubs, without credentials
+or network access; the committed fixtures and baseline were made that way:
+    python benchmarks/e2e_benchmark.py --record --stub
+
+Replaying the fixtures needs no credentials or network access:
+    python benchmarks/e2e_benchmark.py [--iterations N] [--save-baseline]
+        [--save-calls]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from marvin import MODULE_CLASSES, Marvin, import_object  # noqa: E402
+from services import (ServiceStore, record_module,  # noqa: E402
+                      replay_module)
+from stubs import SIDE_EFFECTS, stub_module  # noqa: E402
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES = os.path.join(BENCHMARK_DIR, "fixtures", "services.pickle")
+BASELINE = os.path.join(BENCHMARK_DIR, "baselines", "e2e.json")
+LOCAL_BASELINE = os.path.join(BENCHMARK_DIR, "baselines", "e2e.local.json")
+# Slowdowns of fewer milliseconds than this are scheduling noise, which is
+# larger than the whole run time of the fastest cases
+NOISE_MS = 0.1
+
+# One (module, label, command, replies to the module's questions) case for
+# every label
+CASES = [
+    ("music", "resume", "resume spotify", []),
+    ("music", "pause", "pause my music", []),
+    ("music", "next", "skip this song", []),
+    ("music", "previous", "play the previous song", []),
+    ("music", "search", "play bohemian rhapsody by queen", []),
+    ("music", "current", "what song is playing", []),
+    # playlists are played by the names listed before
+    ("music", "list playlist", "list my playlists", ["no"]),
+    ("music", "play playlist", "play my playlist one", []),
+    ("music", "volume up", "turn the volume up", []),
+    ("music", "volume down", "turn the volume down", []),
+    ("weather", "current today", "what is the weather like today", []),
+    ("weather", "current tomorrow", "what is the weather tomorrow", []),
+    ("weather", "external today", "what is the weather today in boston", []),
+    ("weather", "external tomorrow",
+     "what is the weather tomorrow in boston", []),
+    ("weather", "current specific",
+     "what is the weather going to be on friday", []),
+    ("weather", "external specific",
+     "what is the weather in boston on friday", []),
+    ("calendar", "today events", "what is on my calendar today", []),
+    ("calendar", "tomorrow events", "what is on my schedule tomorrow", []),
+    ("calendar", "current week events", "what events do i have this week",
+     []),
+    ("sms", "send", "send a text", ["5555555555", "yes", "hello", "yes"]),
+    ("stocks", "price", "what is the stock price of aapl", []),
+    ("wiki", "search", "look up alan turing", []),
+    ("sports", "result today", "tell me the score of the red sox game", []),
+    ("sports", "result yesterday",
+     "what was the score of the red sox game yesterday", []),
+    ("sports", "result specific",
+     "what was the score of the red sox game on friday", []),
+    ("sports", "record", "tell me the record of the red sox", []),
+]
+
+
+def module_name(label):
+    return "spotify" if label == "music" else label
+
+
+def check_cases(marvin):
+    """Fails if a case's command isn't routed to the label it benchmarks."""
+    for module, label, command, replies in CASES:
+        intent = marvin.helper.match_intent(
+            command, marvin.helper.classify_command(command))
+        if (intent.module, intent.label) != (module, label):
+            raise ValueError("{!r} is parsed as {} {!r}, not {} {!r}".format(
+                command, intent.module, intent.label, module, label))
+
+
+def build_marvin(store, record, stub=False):
+    """Returns a Marvin whose modules call services through store.
+
+        Args:
+            store: the ServiceStore recording or replaying service calls
+            record: True to record the calls of real modules, and False to
+                replay them
+            stub: True to record every module against stubs, rather than
+                only the modules with side effects
+    """
+    marvin = Marvin("Benchmark", default_music="spotify")
+    names = sorted({module_name(module) for module, _, _, _ in CASES})
+    for name in names:
+        if record:
+            if stub or name in SIDE_EFFECTS:
+                module = stub_module(name, import_object(MODULE_CLASSES[name]))
+                marvin.modules[name] = module
+            else:
+                module = marvin.get_module(name)
+            record_module(store, name, module)
+        else:
+            marvin.modules[name] = replay_module(
+                store, name, import_object(MODULE_CLASSES[name]))
+    return marvin
+
+
+def run_case(marvin, command, replies):
+    """Routes one command, answering the module's questions with replies."""
+    said = []
+    pending = list(replies)
+    marvin.route_command(command, said.append, lambda: pending.pop(0))
+    return said
+
+
+def measure(marvin, store, iterations):
+    """Returns a dictionary from "module/label" to the measurements of each
+        case."""
+    results = {}
+    for module, label, command, replies in CASES:
+        name = module_name(module)
+        # the first run fills caches and compiles the dispatcher
+        run_case(marvin, command, replies)
+        # the most calls of one run, since some commands stop calling once
+        # the state they change saturates (like the volume at 0)
+        calls = 0
+        latencies = []
+        for _ in range(iterations):
+            before_calls = store.calls[name]
+            start = time.perf_counter()
+            run_case(marvin, command, replies)
+            latencies.append(time.perf_counter() - start)
+            calls = max(calls, store.calls[name] - before_calls)
+        # allocations are measured separately, since tracing them slows
+        # every allocation down
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        run_case(marvin, command, replies)
+        after = tracemalloc.take_snapshot()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        blocks = sum(stat.count_diff
+                     for stat in after.compare_to(before, "lineno")
+                     if stat.count_diff > 0)
+        latencies.sort()
+        results["{}/{}".format(module, label)] = {
+            "median_ms": latencies[len(latencies) // 2] * 1000,
+            "calls": calls,
+            "blocks": blocks,
+            "peak_kb": peak / 1024,
+        }
+    return results
+
+
+def load_json(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as json_file:
+        return json.load(json_file)
+
+
+def save_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as json_file:
+        json.dump(data, json_file, indent=2, sort_keys=True)
+        json_file.write("\n")
+
+
+def report(results, calls_baseline, local_baseline, max_regression):
+    """Prints the results next to the baselines.
+
+        Returns:
+            The cases which make more service calls than in calls_baseline,
+            and the cases whose median latency regressed by more than
+            max_regression times (and by more than NOISE_MS) since
+            local_baseline.
+    """
+    print("{:<32}{:>12}{:>8}{:>10}{:>10}{:>10}".format(
+        "case", "median (ms)", "calls", "blocks", "peak (KB)", "vs local"))
+    more_calls = []
+    slower = []
+    for case, result in results.items():
+        if (case in calls_baseline
+                and result["calls"] > calls_baseline[case]["calls"]):
+            more_calls.append(case)
+        ratio = ""
+        if case in local_baseline and local_baseline[case]["median_ms"] > 0:
+            change = result["median_ms"] / local_baseline[case]["median_ms"]
+            ratio = "{:.2f}x".format(change)
+            if (change > max_regression and result["median_ms"]
+                    - local_baseline[case]["median_ms"] > NOISE_MS):
+                slower.append(case)
+        print("{:<32}{:>12.3f}{:>8}{:>10}{:>10.1f}{:>10}".format(
+            case, result["median_ms"], result["calls"], result["blocks"],
+            result["peak_kb"], ratio))
+    return more_calls, slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--record", action="store_true",
+                        help="call the services and record fixtures")
+    parser.add_argument("--stub", action="store_true",
+                        help="record every module against stubs")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="store these results as this machine's "
+                             "baseline")
+    parser.add_argument("--save-calls", action="store_true",
+                        help="store the service calls of these results as "
+                             "the committed baseline")
+    parser.add_argument("--max-regression", type=float, default=1.25,
+                        help="fail if a case is this many times slower than "
+                             "this machine's baseline")
+    args = parser.parse_args()
+    if args.record:
+        store = ServiceStore()
+    elif not os.path.exists(FIXTURES):
+        sys.exit("No fixtures at {}; record them with --record".format(
+            FIXTURES))
+    else:
+        store = ServiceStore.load(FIXTURES)
+    marvin = build_marvin(store, args.record, args.stub)
+    check_cases(marvin)
+    if args.record:
+        for module, label, command, replies in CASES:
+            run_case(marvin, command, replies)
+        os.makedirs(os.path.dirname(FIXTURES), exist_ok=True)
+        store.save(FIXTURES)
+        print("Recorded {} service calls to {}".format(
+            len(store.recordings), FIXTURES))
+        return
+    results = measure(marvin, store, args.iterations)
+    more_calls, slower = report(results, load_json(BASELINE),
+                                load_json(LOCAL_BASELINE), args.max_regression)
+    if args.save_calls:
+        save_json(BASELINE, {case: {"calls": result["calls"]}
+                             for case, result in results.items()})
+        print("Saved the service calls to {}".format(BASELINE))
+        more_calls = []
+    if args.save_baseline:
+        save_json(LOCAL_BASELINE, results)
+        print("Saved baseline to {}".format(LOCAL_BASELINE))
+        slower = []
+    failures = []
+    if more_calls:
+        failures.append("More service calls than the baseline: {}".format(
+            ", ".join(more_calls)))
+    if slower:
+        failures.append("Slower than the baseline: {}".format(
+            ", ".join(slower)))
+    if failures:
+        sys.exit("\n".join(failures))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Benchmark of the audio encodings of the google backend on slow uplinks.
+
+Plays a synthetic spoken command in real time through GoogleBackend in each
+encoding (LINEAR16, FLAC and OGG_OPUS), over a simulated uplink of each
+bandwidth, and reports the audio bytes sent and the time from the end of the
+command to its transcript. The backend runs against the local gRPC stand-in
+in speech_standin.py, so no credentials or network access are needed.
+
+Usage:
+    python benchmarks/encoding_benchmark.py [--uplink-kbps 0 64 256]
+        [--speech-seconds 3] [--repeats 3]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+from modules.speech_to_text.backends import (ENCODINGS,  # noqa: E402
+                                             GoogleBackend)
+from modules.speech_to_text.sources import SyntheticSource  # noqa: E402
+from modules.speech_to_text.vad import VoiceActivityDetector  # noqa: E402
+from speech_standin import StandInSpeech, serve  # noqa: E402
+
+RATE = 16000
+CHUNK_SIZE = 1024
+LEAD = 0.3
+
+
+class UplinkBackend(GoogleBackend):
+    """A GoogleBackend whose requests queue for an uplink of kbps kilobits
+        per second, and which counts the audio bytes it sends.
+
+        Attributes:
+            kbps: the bandwidth of the uplink, or 0 for no limit
+            bytes_sent: the number of audio bytes sent so far
+    """
+
+    def __init__(self, rate, chunk_size, kbps=0, **kwargs):
+        super().__init__(rate, chunk_size, **kwargs)
+        self.kbps = kbps
+        self.bytes_sent = 0
+
+    def requests(self, stream, vad, done):
+        # the time the uplink finishes sending the requests so far
+        free_at = time.perf_counter()
+        for request in super().requests(stream, vad, done):
+            size = len(request.audio_content)
+            self.bytes_sent += size
+            if self.kbps:
+                free_at = (max(free_at, time.perf_counter())
+                           + 8 * size / (1000 * self.kbps))
+                delay = free_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            yield request
+
+
+def make_command(speech_seconds, rng):
+    """Returns LEAD seconds of quiet noise, speech_seconds of a loud voiced
+        sound and then 4 seconds of quiet noise."""
+    length = int((LEAD + speech_seconds + 4) * RATE)
+    samples = 200 * rng.standard_normal(length)
+    start, end = int(LEAD * RATE), int((LEAD + speech_seconds) * RATE)
+    t = np.arange(end - start) / RATE
+    samples[start:end] += 6000 * (np.sin(2 * np.pi * 150 * t)
+                                  * (1 + np.sin(2 * np.pi * 3 * t)))
+    return np.clip(samples, -32768, 32767).astype('<i2')
+
+
+def transcribe(backend, command, speech_seconds):
+    """Plays command to backend in real time.
+
+        Returns:
+            The seconds from the end of the speech to the transcript, and the
+            transcript.
+    """
+    source = SyntheticSource(
+        RATE, len(command) / RATE, real_time=True,
+        generate=lambda start, frames: command[start:start + frames])
+    transcript = backend.transcribe(source, VoiceActivityDetector(RATE))
+    latency = (time.perf_counter() - source.start
+               - (LEAD + speech_seconds))
+    return latency, transcript
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--uplink-kbps", type=float, nargs="+",
+                        default=[0, 64, 256],
+                        help="the uplink bandwidths, where 0 is unlimited")
+    parser.add_argument("--speech-seconds", type=float, default=3.0)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    server, port = serve(StandInSpeech("what is the weather today"))
+    rng = np.random.RandomState(0)
+    command = make_command(args.speech_seconds, rng)
+
+    print("{:>8} {:<10} {:>10} {:>10} {:>12} {:>10}".format(
+        "uplink", "encoding", "bytes", "kbit/s", "latency ms", "heard"))
+    for kbps in args.uplink_kbps:
+        for encoding in ENCODINGS:
+            backend = UplinkBackend(RATE, CHUNK_SIZE, kbps=kbps,
+                                    endpoint="localhost:{}".format(port),
+                                    encoding=encoding)
+            latencies = []
+            heard = 0
+            for _ in range(args.repeats):
+                latency, transcript = transcribe(backend, command,
+                                                 args.speech_seconds)
+                latencies.append(latency)
+                heard += transcript is not None
+            sent = backend.bytes_sent / args.repeats
+            # the audio streamed ends a hangover after the speech
+            streamed = LEAD + args.speech_seconds + 0.5
+            print("{:>8} {:<10} {:>10.0f} {:>10.1f} {:>12.0f} {:>10}".format(
+                "{:g}k".format(kbps) if kbps else "none", encoding, sent,
+                8 * sent / streamed / 1000,
+                1000 * sorted(latencies)[len(latencies) // 2],
+                "{}/{}".format(heard, args.repeats)))
+    server.stop(0)
+
+
+if __name__ == "__main__":
+    main()
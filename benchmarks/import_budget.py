@@ -0,0 +1,97 @@
+"""Cold-start import check for marvin.py.
+
+Imports marvin in fresh interpreters, reports the slowest imports (from
+python -X importtime) and the resident memory after the import, and exits
+with status 1 if the median import time goes over the budget or if a
+library which should only be imported on demand was imported.
+
+Usage:
+    python benchmarks/import_budget.py [--budget-ms MS] [--runs N]
+
+The budget can also be set with the MARVIN_IMPORT_BUDGET_MS environment
+variable.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# libraries (and Marvin's own modules) which importing marvin must not
+# import, since they are imported when they are first built
+DEFERRED = ["tensorflow", "pyaudio", "pyttsx3", "google.cloud.speech",
+            "spotipy", "pyowm", "googleapiclient", "twilio", "wikipedia",
+            "pybaseball", "requests", "marvin_helper", "marvin_intents"]
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+import marvin
+elapsed = time.perf_counter() - start
+print(elapsed)
+print(marvin.resident_memory())
+print(",".join(sorted(sys.modules)))
+"""
+
+
+def run_probe():
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=ROOT, check=True,
+        stdout=subprocess.PIPE, universal_newlines=True).stdout.splitlines()
+    return float(output[0]), int(output[1]), output[2].split(",")
+
+
+def slowest_imports(count):
+    """Returns the (cumulative microseconds, module) pairs of the slowest
+        imports of marvin."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import marvin"],
+        cwd=ROOT, check=True, stderr=subprocess.PIPE,
+        universal_newlines=True).stderr
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        imports.append((int(cumulative_us), module.strip()))
+    return sorted(imports, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=float(
+        os.environ.get("MARVIN_IMPORT_BUDGET_MS", 150)))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    times = []
+    for _ in range(args.runs):
+        elapsed, memory, modules = run_probe()
+        times.append(elapsed)
+    median = statistics.median(times)
+
+    print("{:>12}  {}".format("cumulative", "slowest imports"))
+    for cumulative_us, module in slowest_imports(args.top):
+        print("{:>9.1f} ms  {}".format(cumulative_us / 1000, module))
+    print("import marvin: median {:.1f} ms over {} runs (budget {:.0f} ms)"
+          .format(median * 1000, args.runs, args.budget_ms))
+    print("resident memory after import: {:.1f} MB".format(memory / 2 ** 20))
+
+    failed = False
+    eager = [name for name in DEFERRED
+             if any(module == name or module.startswith(name + ".")
+                    for module in modules)]
+    if eager:
+        print("FAIL: imported at startup: {}".format(", ".join(eager)))
+        failed = True
+    if median * 1000 > args.budget_ms:
+        print("FAIL: import time is over budget")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
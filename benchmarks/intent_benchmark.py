@@ -0,0 +1,65 @@
+"""Benchmark for the compiled IntentDispatcher.
+
+Compares routing a corpus of commands by trying each classified module's
+helper in turn (the way Marvin.route_command used to) against a single
+IntentDispatcher match, and checks that both find the same intents.
+
+Usage:
+    python benchmarks/intent_benchmark.py [--commands N]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from marvin_helper import Marvin_Helper  # noqa: E402
+from corpus import make_commands  # noqa: E402
+
+
+def sequential_match(helper, command, labels):
+    """Tries the helper of every classified module in priority order."""
+    for module, module_helper in helper.module_helpers.items():
+        if module not in labels:
+            continue
+        label, args = module_helper.parse_intent(command)
+        if label is not None:
+            return module, label, args
+    return None, None, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--commands", type=int, default=50000)
+    args = parser.parse_args()
+    helper = Marvin_Helper()
+    commands = make_commands(args.commands)
+    classified = [(command, helper.classify_command(command))
+                  for command in commands]
+
+    for command, labels in classified:
+        expected = sequential_match(helper, command, labels)
+        assert tuple(helper.match_intent(command, labels)) == expected, command
+
+    start = time.perf_counter()
+    for command, labels in classified:
+        sequential_match(helper, command, labels)
+    sequential = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for command, labels in classified:
+        helper.match_intent(command, labels)
+    dispatched = time.perf_counter() - start
+
+    print("{} commands".format(len(commands)))
+    print("{:<24} {:>10} {:>12}".format("path", "cmd/s", "us/cmd"))
+    for name, elapsed in (("per-module helpers", sequential),
+                          ("intent dispatcher", dispatched)):
+        print("{:<24} {:>10.0f} {:>12.2f}".format(
+            name, len(commands) / elapsed, elapsed / len(commands) * 1e6))
+    print("speedup: {:.1f}x".format(sequential / dispatched))
+
+
+if __name__ == "__main__":
+    main()
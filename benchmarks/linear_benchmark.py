@@ -0,0 +1,151 @@
+"""Fuzz test and worst-case benchmark for the linear matching engine.
+
+The fuzz test mutates commands from the corpus and checks that the "re" and
+"linear" IntentDispatchers find the same intents, first on one thread and
+then with --threads threads sharing one cold linear dispatcher, as the batch
+workers and daemon sessions do. The worst-case benchmark
+times both engines on long adversarial transcripts which make the
+backtracking engine retry every split point of its patterns.
+
+Usage:
+    python benchmarks/linear_benchmark.py [--fuzz N] [--threads N]
+        [--max-length BYTES]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from marvin_helper import Marvin_Helper  # noqa: E402
+from corpus import make_commands  # noqa: E402
+
+FRAGMENTS = ["play ", "weather ", "in ", "today", "tomorrow", " on ",
+             "monday", "score of the ", " game", "record", "the ", "'s", "?",
+             "!", " ", "a", "x", "1", ":", "what is ", "search ",
+             " on wikipedia", "stock price of ", "price of ", "playlist ",
+             " by ", " on spotify", "volume", "#"]
+
+# inputs which almost match, followed by a character no pattern accepts,
+# and long inputs which do match
+WORST_CASES = {
+    "repeated play": ("play ", "#"),
+    "repeated weather in": ("weather in ", "#"),
+    "repeated score of the": ("score of the x game ", "#"),
+    "repeated what is": ("what is ", "#"),
+    "letters and spaces": ("ab ", "#"),
+    "matching search": ("play me ", "a"),
+    "matching wiki": ("who is the ", "a"),
+}
+
+
+def mutate(rng, command):
+    parts = list(command)
+    for _ in range(rng.randint(0, 4)):
+        parts.insert(rng.randint(0, len(parts)), rng.choice(FRAGMENTS))
+    return "".join(parts)
+
+
+def fuzz(num_commands):
+    rng = random.Random(0)
+    backtracking = Marvin_Helper()
+    linear = Marvin_Helper(engine="linear")
+    modules = list(backtracking.module_helpers)
+    for command in make_commands(num_commands):
+        command = mutate(rng, command)
+        labels = rng.choice([modules, backtracking.classify_command(command)])
+        expected = backtracking.match_intent(command, labels)
+        actual = linear.match_intent(command, labels)
+        if expected != actual:
+            raise AssertionError("{!r}: re found {}, linear found {}".format(
+                command, expected, actual))
+    print("fuzz: {} mutated commands matched identically".format(
+        num_commands))
+
+
+def fuzz_concurrent(num_commands, num_threads):
+    rng = random.Random(1)
+    backtracking = Marvin_Helper()
+    modules = list(backtracking.module_helpers)
+    cases = []
+    for command in make_commands(num_commands):
+        command = mutate(rng, command)
+        labels = rng.choice([modules, backtracking.classify_command(command)])
+        cases.append((command, labels,
+                      backtracking.match_intent(command, labels)))
+    linear = Marvin_Helper(engine="linear")
+
+    def check(case):
+        command, labels, expected = case
+        try:
+            actual = linear.match_intent(command, labels)
+        except Exception as e:
+            actual = e
+        return expected != actual
+
+    with ThreadPoolExecutor(num_threads) as executor:
+        mismatches = sum(executor.map(check, cases, chunksize=16))
+    if mismatches:
+        raise AssertionError("{} of {} mutated commands matched differently "
+                             "on {} threads".format(mismatches, num_commands,
+                                                    num_threads))
+    print("fuzz: {} mutated commands matched identically on {} threads"
+          .format(num_commands, num_threads))
+
+
+def time_match(helper, command, modules):
+    start = time.perf_counter()
+    helper.match_intent(command, modules)
+    return time.perf_counter() - start
+
+
+def worst_case(max_length, timeout):
+    backtracking = Marvin_Helper()
+    linear = Marvin_Helper(engine="linear")
+    modules = list(backtracking.module_helpers)
+    # warm the linear engine's DFA on a short input
+    for fragment, suffix in WORST_CASES.values():
+        linear.match_intent(fragment * 4 + suffix, modules)
+    print("{:<24} {:>8} {:>12} {:>12}".format(
+        "input", "bytes", "re ms", "linear ms"))
+    lengths = [1000]
+    while lengths[-1] * 2 <= max_length:
+        lengths.append(lengths[-1] * 2)
+    for name, (fragment, suffix) in WORST_CASES.items():
+        skip_re = False
+        for length in lengths:
+            command = (fragment * (length // len(fragment) + 1))[:length - 1]
+            command += suffix
+            if skip_re:
+                re_time = "skipped"
+            else:
+                elapsed = time_match(backtracking, command, modules)
+                # the backtracking engine is at least quadratic, so stop
+                # before it takes too long
+                skip_re = elapsed * 4 > timeout
+                re_time = "{:.1f}".format(elapsed * 1000)
+            linear_time = time_match(linear, command, modules)
+            print("{:<24} {:>8} {:>12} {:>12.1f}".format(
+                name, length, re_time, linear_time * 1000))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--fuzz", type=int, default=20000)
+    parser.add_argument("--threads", type=int, default=8,
+                        help="the threads sharing one linear dispatcher in "
+                             "the concurrent fuzz test")
+    parser.add_argument("--max-length", type=int, default=64000)
+    parser.add_argument("--timeout", type=float, default=5.0,
+                        help="seconds after which re is no longer timed")
+    args = parser.parse_args()
+    fuzz(args.fuzz)
+    fuzz_concurrent(args.fuzz, args.threads)
+    worst_case(args.max_length, args.timeout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""Record/replay stand-ins for the external services Marvin's modules call.
+
+In record mode, the service clients of real modules (and the module globals
+through which they reach a service, like requests or wikipedia) are wrapped
+in RecordingProxy objects, which pass every call through and record its
+result. In replay mode, ReplayProxy objects answer the same calls from the
+recordings without touching the network, so benchmarks need no credentials.
+
+A call whose result is another object of a service library (a requests
+Response, a pyowm Observation, a Google API request...) is proxied in turn, so
+chains like calendar.events().list(...).execute() are recorded call by call.
+Calls are keyed by their full path and arguments. When replaying a call whose
+arguments changed (calendar queries use the current time, for example), the
+last recording of the same path is used whatever its arguments.
+"""
+import pickle
+import re
+import threading
+import types
+from collections import Counter
+
+# Objects from these libraries (or from their stand-ins in stubs.py),
+# returned by a service call, are proxied instead of being recorded as data
+SERVICE_LIBRARIES = ("requests", "pyowm", "spotipy", "googleapiclient",
+                     "twilio", "wikipedia", "http", "urllib", "stubs")
+
+# For each module, the attributes holding its service clients and the
+# globals of its Python module which call services directly
+SERVICES = {
+    "spotify": {"clients": ["_spotify"], "globals": []},
+    "weather": {"clients": ["_OWM"], "globals": ["requests", "urlopen"]},
+    "calendar": {"clients": ["calendar"], "globals": []},
+    "sms": {"clients": ["client"], "globals": []},
+    "stocks": {"clients": [], "globals": ["requests"]},
+    "wiki": {"clients": [], "globals": ["wikipedia"]},
+    "sports": {"clients": [], "globals": ["schedule_and_record"]},
+}
+
+# Credentials are never written to fixtures: they are redacted from call keys
+# and from the state of modules
+SECRET_ARGUMENT = re.compile(
+    r"((?:access_key|apikey|api_key|key|token)=)[^&'\"\s)]+")
+SECRET_ATTRIBUTES = ("key", "ipstack_api_key")
+REDACTED = "REDACTED"
+
+
+class MissingRecording(Exception):
+    """Raised when a replayed call was never recorded."""
+
+
+def redact(text):
+    return SECRET_ARGUMENT.sub(r"\1" + REDACTED, text)
+
+
+def format_call(path, args, kwargs):
+    arguments = [repr(arg) for arg in args]
+    arguments += ["{}={!r}".format(name, kwargs[name])
+                  for name in sorted(kwargs)]
+    return redact("{}({})".format(path, ", ".join(arguments)))
+
+
+def is_service_object(value):
+    """True if value comes from a service library and should be proxied."""
+    if isinstance(value, types.ModuleType):
+        return True
+    root = type(value).__module__.split(".", 1)[0]
+    return root in SERVICE_LIBRARIES
+
+
+class ServiceStore:
+    """The recordings of service calls, and counts of the calls made.
+
+        Attributes:
+            recordings: a dictionary from call keys to (kind, value) pairs,
+                where kind is "value", "raise" or "proxy"
+            loose: the same recordings keyed by call paths without arguments
+            state: a dictionary from module names to the attributes (other
+                than service clients) of each module when it was recorded
+            calls: a Counter of the service calls made by each module
+            lock: a lock guarding calls and recordings
+    """
+
+    def __init__(self):
+        self.recordings = {}
+        self.loose = {}
+        self.state = {}
+        self.calls = Counter()
+        self.lock = threading.Lock()
+
+    def record(self, key, loose_key, kind, value):
+        with self.lock:
+            self.recordings[key] = (kind, value)
+            self.loose[loose_key] = (kind, value)
+
+    def find(self, key, loose_key):
+        entry = self.recordings.get(key)
+        if entry is None:
+            entry = self.loose.get(loose_key)
+        return entry
+
+    def count(self, service):
+        with self.lock:
+            self.calls[service] += 1
+
+    def capture(self, name, module):
+        """Records the attributes of a module other than its service
+            clients, which replay_module restores."""
+        clients = SERVICES[name]["clients"]
+        state = {}
+        for attribute, value in vars(module).items():
+            if attribute in clients:
+                continue
+            if attribute in SECRET_ATTRIBUTES:
+                value = REDACTED
+            state[attribute] = value
+        self.state[name] = state
+
+    def save(self, path):
+        with open(path, "wb") as fixture:
+            pickle.dump({"recordings": self.recordings, "loose": self.loose,
+                         "state": self.state}, fixture)
+
+    @classmethod
+    def load(cls, path):
+        store = cls()
+        with open(path, "rb") as fixture:
+            data = pickle.load(fixture)
+        store.recordings = data["recordings"]
+        store.loose = data["loose"]
+        store.state = data["state"]
+        return store
+
+
+class RecordingProxy:
+    """Passes attribute reads and calls through to a service object,
+        recording their results in a ServiceStore."""
+
+    def __init__(self, target, store, service, path, loose):
+        self._target = target
+        self._store = store
+        self._service = service
+        self._path = path
+        self._loose = loose
+
+    def __getattr__(self, name):
+        value = getattr(self._target, name)
+        path = "{}.{}".format(self._path, name)
+        loose = "{}.{}".format(self._loose, name)
+        if isinstance(value, type):
+            # classes, like the exceptions modules catch
+            return value
+        if callable(value) or isinstance(value, types.ModuleType):
+            return RecordingProxy(value, self._store, self._service, path,
+                                  loose)
+        self._store.record(path, loose, "value", value)
+        return value
+
+    def __call__(self, *args, **kwargs):
+        key = format_call(self._path, args, kwargs)
+        loose = self._loose + "()"
+        self._store.count(self._service)
+        try:
+            result = self._target(*args, **kwargs)
+        except Exception as e:
+            self._store.record(key, loose, "raise", e)
+            raise
+        if is_service_object(result):
+            self._store.record(key, loose, "proxy", None)
+            return RecordingProxy(result, self._store, self._service, key,
+                                  loose)
+        self._store.record(key, loose, "value", result)
+        return result
+
+
+class ReplayProxy:
+    """Answers attribute reads and calls from the recordings of a
+        ServiceStore.
+
+        Classes (like exceptions) are still read from the real object when
+        there is one, since modules catch them by name.
+    """
+
+    def __init__(self, target, store, service, path, loose):
+        self._target = target
+        self._store = store
+        self._service = service
+        self._path = path
+        self._loose = loose
+
+    def __getattr__(self, name):
+        real = getattr(self._target, name, None)
+        if isinstance(real, type):
+            return real
+        path = "{}.{}".format(self._path, name)
+        loose = "{}.{}".format(self._loose, name)
+        entry = self._store.find(path, loose)
+        if entry is not None and entry[0] == "value":
+            return entry[1]
+        return ReplayProxy(real, self._store, self._service, path, loose)
+
+    def __call__(self, *args, **kwargs):
+        key = format_call(self._path, args, kwargs)
+        loose = self._loose + "()"
+        self._store.count(self._service)
+        entry = self._store.find(key, loose)
+        if entry is None:
+            raise MissingRecording(key)
+        kind, value = entry
+        if kind == "raise":
+            raise value
+        if kind == "proxy":
+            return ReplayProxy(None, self._store, self._service, key, loose)
+        return value
+
+
+def record_module(store, name, module):
+    """Wraps the service clients and globals of a real module in recording
+        proxies, and captures the rest of its state."""
+    store.capture(name, module)
+    for attribute in SERVICES[name]["clients"]:
+        path = "{}.{}".format(name, attribute)
+        setattr(module, attribute, RecordingProxy(
+            getattr(module, attribute), store, name, path, path))
+    python_module = __import__(type(module).__module__, fromlist=["_"])
+    for attribute in SERVICES[name]["globals"]:
+        path = "{}.{}".format(name, attribute)
+        setattr(python_module, attribute, RecordingProxy(
+            getattr(python_module, attribute), store, name, path, path))
+
+
+def replay_module(store, name, module_class):
+    """Builds a module of module_class from its recorded state, without
+        calling its constructor, with replay proxies for its services."""
+    module = module_class.__new__(module_class)
+    vars(module).update(store.state[name])
+    for attribute in SERVICES[name]["clients"]:
+        path = "{}.{}".format(name, attribute)
+        setattr(module, attribute,
+                ReplayProxy(None, store, name, path, path))
+    python_module = __import__(module_class.__module__, fromlist=["_"])
+    for attribute in SERVICES[name]["globals"]:
+        path = "{}.{}".format(name, attribute)
+        original = getattr(python_module, attribute)
+        if isinstance(original, (RecordingProxy, ReplayProxy)):
+            original = original._target
+        setattr(python_module, attribute,
+                ReplayProxy(original, store, name, path, path))
+    return module
@@ -0,0 +1,170 @@
+"""A local gRPC stand-in for Google's streaming speech to text API.
+
+StandInSpeech answers StreamingRecognize calls like the real service, without
+credentials or network access: it finds speech in the streamed audio by its
+loudness, sends interim results while the speech goes on, signals the end of
+the utterance after end_silence seconds of silence (when single_utterance is
+set), and then sends a fixed transcript as the final result. Recognition is
+charged processing seconds per second of audio as the audio arrives, so
+uploading a whole recording at once costs more than streaming it. FLAC and
+OGG_OPUS audio is decoded with soundfile as it arrives.
+
+Point Marvin at a running stand-in with the SPEECH_TO_TEXT_ENDPOINT
+environment variable:
+    python benchmarks/speech_standin.py --port 50051 --transcript "pause"
+    SPEECH_TO_TEXT_ENDPOINT=localhost:50051 python marvin.py NAME --user-spoken
+"""
+import argparse
+import io
+import time
+from concurrent import futures
+
+import grpc
+import numpy as np
+import soundfile
+from google.cloud.speech_v1.proto import cloud_speech_pb2
+from google.cloud.speech_v1.proto import cloud_speech_pb2_grpc
+
+WAV_HEADER_SIZE = 44
+# The number of samples decoded at once, the length of a FLAC frame written
+# by libsndfile
+DECODE_BLOCK = 4096
+
+
+def decode(data):
+    """Returns the 16 bit samples of a FLAC or Ogg stream, which may be cut
+        off anywhere.
+
+        SoundFile seeks past the samples each read returns, and a FLAC
+        stream of unknown length (as streamed FLAC is) can't be seeked to
+        the end of the samples decoded so far, so the read which reaches it
+        fails after filling its buffer. That block is kept without its
+        trailing zeros, which are the part of the buffer the read didn't
+        fill; until the stream is finished, it is a whole frame.
+    """
+    blocks = []
+    with soundfile.SoundFile(io.BytesIO(data)) as compressed:
+        while True:
+            block = np.zeros(DECODE_BLOCK, dtype=np.int16)
+            try:
+                frames = compressed.buffer_read_into(block, dtype='int16')
+            except RuntimeError:
+                blocks.append(np.trim_zeros(block, 'b'))
+                break
+            if not frames:
+                break
+            blocks.append(block[:frames])
+    return np.concatenate(blocks) if blocks else np.zeros(0, dtype=np.int16)
+
+
+class StandInSpeech(cloud_speech_pb2_grpc.SpeechServicer):
+    """Recognizes every utterance as transcript.
+
+        Attributes:
+            transcript: the final transcript of every utterance
+            threshold: the peak level above which a request holds speech
+            end_silence: the seconds of silence which end an utterance
+            interim_every: the seconds of speech between interim results
+            processing: the seconds spent recognizing each second of audio
+    """
+
+    def __init__(self, transcript, threshold=500, end_silence=0.5,
+                 interim_every=0.5, processing=0.05):
+        self.transcript = transcript
+        self.threshold = threshold
+        self.end_silence = end_silence
+        self.interim_every = interim_every
+        self.processing = processing
+
+    def interim(self, fraction):
+        """Returns the interim response of the first fraction of the
+            transcript."""
+        words = self.transcript.split()
+        partial = " ".join(words[:max(1, int(fraction * len(words)))])
+        return cloud_speech_pb2.StreamingRecognizeResponse(results=[
+            cloud_speech_pb2.StreamingRecognitionResult(
+                alternatives=[cloud_speech_pb2.SpeechRecognitionAlternative(
+                    transcript=partial)],
+                stability=0.5)])
+
+    def StreamingRecognize(self, request_iterator, context):
+        streaming_config = next(request_iterator).streaming_config
+        rate = streaming_config.config.sample_rate_hertz
+        compressed = streaming_config.config.encoding in (
+            cloud_speech_pb2.RecognitionConfig.FLAC,
+            cloud_speech_pb2.RecognitionConfig.OGG_OPUS)
+        received = bytearray()
+        decoded = 0
+        speech = silence = since_interim = 0.0
+        for request in request_iterator:
+            audio = request.audio_content
+            if compressed:
+                # the stream so far is decoded again, since a codec's frames
+                # don't line up with requests
+                received += audio
+                try:
+                    samples = decode(bytes(received))
+                except RuntimeError:
+                    # not even the stream's header has arrived
+                    samples = np.zeros(0, dtype=np.int16)
+                audio = samples[decoded:].tobytes()
+                decoded = max(decoded, len(samples))
+            elif audio[:4] == b"RIFF":
+                audio = audio[WAV_HEADER_SIZE:]
+            seconds = len(audio) / 2 / rate
+            time.sleep(seconds * self.processing)
+            if audio and np.abs(np.frombuffer(audio, dtype='<i2').astype(
+                    np.int32)).max() >= self.threshold:
+                speech += seconds
+                since_interim += seconds
+                silence = 0.0
+            elif speech:
+                silence += seconds
+            if (streaming_config.interim_results
+                    and since_interim >= self.interim_every):
+                since_interim = 0.0
+                yield self.interim(min(speech / 2, 0.9))
+            if (streaming_config.single_utterance and speech
+                    and silence >= self.end_silence):
+                yield cloud_speech_pb2.StreamingRecognizeResponse(
+                    speech_event_type=cloud_speech_pb2
+                    .StreamingRecognizeResponse.END_OF_SINGLE_UTTERANCE)
+                break
+        if speech:
+            yield cloud_speech_pb2.StreamingRecognizeResponse(results=[
+                cloud_speech_pb2.StreamingRecognitionResult(
+                    alternatives=[
+                        cloud_speech_pb2.SpeechRecognitionAlternative(
+                            transcript=self.transcript, confidence=0.9)],
+                    is_final=True)])
+
+
+def serve(servicer, port=0):
+    """Starts a gRPC server of servicer on localhost.
+
+        Returns:
+            The server, and the port it listens on.
+    """
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=4))
+    cloud_speech_pb2_grpc.add_SpeechServicer_to_server(servicer, server)
+    port = server.add_insecure_port("localhost:{}".format(port))
+    server.start()
+    return server, port
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=50051)
+    parser.add_argument("--transcript", default="what is the weather today")
+    args = parser.parse_args()
+    server, port = serve(StandInSpeech(args.transcript), args.port)
+    print("Listening on localhost:{}".format(port))
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Benchmark of the time from the end of a command to its transcript.
+
+Plays a synthetic spoken command in real time, and compares the original
+path, which recorded until 30 silent chunks had been read, trimmed the
+recording and uploaded it whole, with GoogleBackend, which streams the audio
+while the command is said. Both run against the local gRPC stand-in in
+speech_standin.py, so no credentials or network access are needed.
+
+Usage:
+    python benchmarks/streaming_benchmark.py [--speech-seconds 1 3 6]
+"""
+import argparse
+import io
+import os
+import sys
+import time
+import wave
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+from google.cloud import speech  # noqa: E402
+from modules.speech_to_text import dsp  # noqa: E402
+from modules.speech_to_text.backends import GoogleBackend  # noqa: E402
+from modules.speech_to_text.vad import VoiceActivityDetector  # noqa: E402
+from speech_standin import StandInSpeech, serve  # noqa: E402
+
+RATE = 16000
+CHUNK_SIZE = 1024
+THRESHOLD = 500
+
+
+class RealTimeStream:
+    """Reads samples no faster than they would be captured by a microphone.
+
+        Attributes:
+            samples: the int16 samples of the whole recording
+            position: the index of the next sample read
+            start: the perf_counter time the first sample was captured
+    """
+
+    def __init__(self, samples):
+        self.samples = samples
+        self.position = 0
+        self.start = time.perf_counter()
+
+    def read(self, frames, exception_on_overflow=False):
+        end = self.position + frames
+        delay = self.start + end / RATE - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        chunk = self.samples[self.position:end]
+        self.position = end
+        return chunk.tobytes()
+
+
+def make_command(speech_seconds, rng):
+    """Returns 0.3 seconds of quiet noise, speech_seconds of loud noise and
+        then 4 seconds of quiet noise."""
+    samples = rng.randint(-200, 200, int((speech_seconds + 4.3) * RATE))
+    start = int(0.3 * RATE)
+    samples[start:start + int(speech_seconds * RATE)] *= 40
+    return samples.astype('<i2')
+
+
+def upload_after_silence(client, config, stream):
+    """The original record and convert_to_text."""
+    chunks = []
+    num_silent = 0
+    snd_started = False
+    while 1:
+        snd_data = dsp.as_samples(stream.read(CHUNK_SIZE))
+        chunks.append(snd_data)
+        silent = dsp.is_silent(snd_data, THRESHOLD)
+        if silent and snd_started:
+            num_silent += 1
+        elif not silent and not snd_started:
+            snd_started = True
+        if snd_started and num_silent > 30:
+            break
+    r = dsp.normalize(np.concatenate(chunks))
+    r = dsp.add_silence(dsp.trim(r, THRESHOLD), 0.5, RATE)
+    buffer = io.BytesIO()
+    wf = wave.open(buffer, 'wb')
+    wf.setnchannels(1)
+    wf.setsampwidth(2)
+    wf.setframerate(RATE)
+    wf.writeframes(dsp.frames(r))
+    wf.close()
+    requests = [speech.types.StreamingRecognizeRequest(
+        audio_content=buffer.getvalue())]
+    results = client.streaming_recognize(
+        speech.types.StreamingRecognitionConfig(config=config), requests)
+    for result in results:
+        return result.results[0].alternatives[0].transcript
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--speech-seconds", type=float, nargs="+",
+                        default=[1, 3, 6])
+    parser.add_argument("--processing", type=float, default=0.05,
+                        help="seconds the stand-in spends recognizing each "
+                             "second of audio")
+    args = parser.parse_args()
+    server, port = serve(StandInSpeech("what is the weather today",
+                                       processing=args.processing))
+    backend = GoogleBackend(RATE, CHUNK_SIZE,
+                            endpoint="localhost:{}".format(port))
+    vad = VoiceActivityDetector(RATE)
+    rng = np.random.RandomState(0)
+
+    print("{:>8} {:>14} {:>14} {:>10}".format(
+        "speech s", "upload ms", "streaming ms", "interims"))
+    for speech_seconds in args.speech_seconds:
+        command = make_command(speech_seconds, rng)
+        end_of_speech = 0.3 + speech_seconds
+
+        stream = RealTimeStream(command)
+        upload_after_silence(backend.client,
+                             backend.streaming_config.config, stream)
+        upload = time.perf_counter() - stream.start - end_of_speech
+
+        interims = []
+        stream = RealTimeStream(command)
+        backend.transcribe(stream, vad, interims.append)
+        streaming = time.perf_counter() - stream.start - end_of_speech
+
+        print("{:>8.1f} {:>14.0f} {:>14.0f} {:>10}".format(
+            speech_seconds, 1000 * upload, 1000 * streaming, len(interims)))
+    server.stop(0)
+
+
+if __name__ == "__main__":
+    main()
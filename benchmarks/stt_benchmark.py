@@ -0,0 +1,163 @@
+"""Benchmark of the speech to text backends on labelled recordings.
+
+Runs every WAV file (mono, 16 bit, 16 kHz) of a directory through each
+backend and reports its word error rate against the transcripts in the
+directory's labels.json (a mapping from file names to transcripts), its real
+time factor (the seconds spent per second of audio) and its tail latency (the
+time from the last chunk of audio read to the transcript).
+
+The google backend uses --endpoint, or the local stand-in of
+speech_standin.py with --standin. The replay backend answers from --replay,
+which --record fills with the transcripts of the first other backend.
+
+Usage:
+    python benchmarks/stt_benchmark.py CLIPS [--backends google offline]
+        [--endpoint HOST:PORT | --standin] [--replay FILE [--record]]
+        [--vad] [--real-time]
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.speech_to_text.backends import load_backend  # noqa: E402
+from modules.speech_to_text.sources import WavSource  # noqa: E402
+from modules.speech_to_text.vad import VoiceActivityDetector  # noqa: E402
+
+RATE = 16000
+CHUNK_SIZE = 1024
+
+
+class ClipSource(WavSource):
+    """Reads a clip, timing the reads.
+
+        Attributes:
+            last_read: the perf_counter time of the last read
+    """
+
+    def __init__(self, path, real_time=False):
+        super().__init__(path, real_time)
+        self.last_read = None
+
+    def read(self, frames, exception_on_overflow=False):
+        data = super().read(frames)
+        self.last_read = time.perf_counter()
+        return data
+
+
+def words(text):
+    return re.findall(r"[a-z0-9']+", (text or "").lower())
+
+
+def word_errors(reference, hypothesis):
+    """Returns the number of substituted, deleted and inserted words."""
+    previous = list(range(len(hypothesis) + 1))
+    for i, word in enumerate(reference, 1):
+        current = [i]
+        for j, guess in enumerate(hypothesis, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (word != guess)))
+        previous = current
+    return previous[-1]
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def run_backend(backend, clips, directory, args):
+    """Transcribes every clip with backend.
+
+        Returns:
+            A dictionary from clip names to (transcript, seconds of audio,
+            seconds spent, tail latency in seconds).
+    """
+    results = {}
+    for name in clips:
+        stream = ClipSource(os.path.join(directory, name), args.real_time)
+        vad = VoiceActivityDetector(RATE) if args.vad else None
+        try:
+            transcript = backend.transcribe(stream, vad)
+        finally:
+            stream.close()
+        done = time.perf_counter()
+        results[name] = (transcript, stream.position / RATE,
+                         done - stream.start, done - stream.last_read)
+    return results
+
+
+def build_backend(name, args):
+    kwargs = {}
+    if name == "google" and args.endpoint:
+        kwargs["endpoint"] = args.endpoint
+    if name == "replay":
+        kwargs["path"] = args.replay
+    return load_backend(name)(RATE, CHUNK_SIZE, **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("clips", help="a directory of labelled WAV clips")
+    parser.add_argument("--backends", nargs="+", default=["google"])
+    parser.add_argument("--endpoint", metavar="HOST:PORT",
+                        help="the endpoint of the google backend")
+    parser.add_argument("--standin", action="store_true",
+                        help="run the google backend against a local "
+                             "stand-in")
+    parser.add_argument("--replay", metavar="FILE",
+                        help="the transcripts of the replay backend")
+    parser.add_argument("--record", action="store_true",
+                        help="record the transcripts of the first backend "
+                             "into the replay file")
+    parser.add_argument("--vad", action="store_true",
+                        help="end utterances with the voice activity "
+                             "detector instead of at the end of each clip")
+    parser.add_argument("--real-time", action="store_true",
+                        help="read clips no faster than they were recorded")
+    args = parser.parse_args()
+    with open(os.path.join(args.clips, "labels.json")) as labels_file:
+        labels = json.load(labels_file)
+    clips = sorted(labels)
+
+    server = None
+    if args.standin:
+        from speech_standin import StandInSpeech, serve
+        server, port = serve(StandInSpeech("what is the weather today"))
+        args.endpoint = "localhost:{}".format(port)
+
+    print("{:<10} {:>7} {:>7} {:>9} {:>9} {:>9}".format(
+        "backend", "WER", "RTF", "p50 ms", "p95 ms", "max ms"))
+    recorded = False
+    for name in args.backends:
+        backend = build_backend(name, args)
+        results = run_backend(backend, clips, args.clips, args)
+        backend.close()
+        errors = sum(word_errors(words(labels[clip]), words(result[0]))
+                     for clip, result in results.items())
+        reference_words = sum(len(words(labels[clip])) for clip in clips)
+        audio = sum(result[1] for result in results.values())
+        spent = sum(result[2] for result in results.values())
+        tails = [result[3] for result in results.values()]
+        print("{:<10} {:>7.1%} {:>7.3f} {:>9.0f} {:>9.0f} {:>9.0f}".format(
+            name, errors / max(reference_words, 1), spent / audio,
+            1000 * percentile(tails, 0.5), 1000 * percentile(tails, 0.95),
+            1000 * max(tails)))
+        if args.record and name != "replay" and not recorded:
+            recorded = True
+            replay = load_backend("replay")(RATE, CHUNK_SIZE, path=args.replay)
+            for clip, result in results.items():
+                stream = WavSource(os.path.join(args.clips, clip))
+                vad = VoiceActivityDetector(RATE) if args.vad else None
+                replay.record(replay.key(stream, vad), result[0])
+                stream.close()
+    if server is not None:
+        server.stop(0)
+
+
+if __name__ == "__main__":
+    main()
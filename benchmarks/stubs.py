@@ -0,0 +1,293 @@
+"""Stand-ins for the service clients of Marvin's modules, with canned answers.
+
+Recording fixtures against the real services sends texts and changes what the
+user's Spotify account is playing, so the SMS and Spotify modules are always
+recorded against these stubs. With --stub, e2e_benchmark.py records every
+module against them, which needs no credentials or network access; the
+fixtures in benchmarks/fixtures were recorded that way.
+
+Each stub answers the calls its module makes with data shaped like the
+service's, and is built into a module by stub_module without calling the
+module's constructor (which logs in to the service).
+"""
+import importlib
+import zlib
+from datetime import date, datetime, timedelta
+from urllib.parse import parse_qs, urlparse
+
+from modules.marvin_calendar.calendar_helper import CalendarHelper
+from modules.sms.sms_helper import SMSHelper
+from modules.sports.sports_helper import SportsHelper
+from modules.spotify.spotify_helper import SpotifyHelper
+from modules.stocks.stocks_helper import StocksHelper
+from modules.weather.weather_helper import WeatherHelper
+from modules.wiki.wiki_helper import WikiHelper
+from modules.prefetch import PrefetchMemo
+
+# The modules whose commands act on the world, which are never recorded
+# against the real services
+SIDE_EFFECTS = ("spotify", "sms")
+
+LOCATION = dict(city="Cambridge", latitude=42.37, longitude=-71.11)
+
+
+def seed(*values):
+    """Returns a number derived from values, the same in every run."""
+    return zlib.crc32(repr(values).encode("utf-8"))
+
+
+class StubWeather:
+    """The weather at one place and time, like a pyowm Weather."""
+
+    def __init__(self, *place):
+        number = seed(*place)
+        self.code = (800, 500, 803, 601)[number % 4]
+        self.low = 40 + number % 30
+
+    def get_weather_code(self):
+        return self.code
+
+    def get_temperature(self, unit="kelvin"):
+        return {"temp": self.low + 5, "temp_min": self.low,
+                "temp_max": self.low + 10, "temp_kf": None}
+
+
+class StubObservation:
+    def __init__(self, *place):
+        self.place = place
+
+    def get_weather(self):
+        return StubWeather(*self.place)
+
+
+class StubForecaster:
+    def __init__(self, *place):
+        self.place = place
+
+    def get_weather_at(self, time):
+        return StubWeather(time.weekday(), *self.place)
+
+
+class StubOWM:
+    """Answers the calls the weather module makes to pyowm's OWM."""
+
+    def weather_at_coords(self, latitude, longitude):
+        return StubObservation(latitude, longitude)
+
+    def weather_at_place(self, name):
+        return StubObservation(name)
+
+    def three_hours_forecast_at_coords(self, latitude, longitude):
+        return StubForecaster(latitude, longitude)
+
+    def three_hours_forecast(self, name):
+        return StubForecaster(name)
+
+
+class StubEventRequest:
+    """A request for the events between two times, like a Google API
+        HttpRequest."""
+
+    def __init__(self, start, end):
+        self.start = datetime.strptime(start, "%Y-%m-%dT%H:%M:%SZ")
+        self.end = datetime.strptime(end, "%Y-%m-%dT%H:%M:%SZ")
+
+    def execute(self):
+        items = []
+        day = self.start
+        while day < self.end:
+            for hour, summary in ((9, "Standup"), (14, "Design review")):
+                start = day.replace(hour=hour, minute=30)
+                items.append({
+                    "summary": summary,
+                    "start": {"dateTime": start.strftime(
+                        "%Y-%m-%dT%H:%M:%S-04:00")},
+                    "end": {"dateTime": (start + timedelta(hours=1)).strftime(
+                        "%Y-%m-%dT%H:%M:%S-04:00")},
+                })
+            day += timedelta(1)
+        return {"kind": "calendar#events", "items": items}
+
+
+class StubEvents:
+    def list(self, calendarId, timeMin, timeMax, singleEvents=False,
+             orderBy=None):
+        return StubEventRequest(timeMin, timeMax)
+
+
+class StubCalendar:
+    """Answers the calls the calendar module makes to the Google Calendar
+        API."""
+
+    def events(self):
+        return StubEvents()
+
+
+class StubMessages:
+    """Accepts messages like Twilio's MessageList, without sending them."""
+
+    def __init__(self):
+        self.sent = 0
+
+    def __call__(self, sid):
+        raise NotImplementedError("stub messages can't be looked up")
+
+    def create(self, to, from_, body):
+        self.sent += 1
+        return {"sid": "SM{:032d}".format(self.sent), "status": "queued",
+                "to": to, "from": from_, "body": body}
+
+
+class StubTwilio:
+    def __init__(self):
+        self.messages = StubMessages()
+
+
+class StubSpotify:
+    """Answers the calls the spotify module makes to spotipy, without
+        touching any playback."""
+
+    PLAYLISTS = ["one", "Discover Weekly", "Release Radar", "Running",
+                 "Focus", "Road Trip", "Jazz Classics"]
+
+    def __init__(self):
+        self.track = self.make_track("Under Pressure", "Queen")
+
+    def make_track(self, name, artist):
+        return {"name": name, "artists": [{"name": artist}],
+                "uri": "spotify:track:{:022d}".format(seed(name, artist))}
+
+    def start_playback(self, device_id=None, context_uri=None, uris=None,
+                       offset=None):
+        return None
+
+    def pause_playback(self, device_id=None):
+        return None
+
+    def next_track(self, device_id=None):
+        return None
+
+    def previous_track(self, device_id=None):
+        return None
+
+    def volume(self, volume_percent, device_id=None):
+        return None
+
+    def search(self, q, limit=10, offset=0, type="track", market=None):
+        name, _, artist = q.partition(" by ")
+        self.track = self.make_track(name.title(), artist.title() or "Queen")
+        return {"tracks": {"items": [self.track][:limit]}}
+
+    def currently_playing(self, market=None):
+        return {"is_playing": True, "item": self.track}
+
+    def current_user_playlists(self, limit=50, offset=0):
+        return {"items": [{"name": name,
+                           "uri": "spotify:playlist:{:022d}".format(
+                               seed(name))}
+                          for name in self.PLAYLISTS[offset:offset + limit]]}
+
+    def current_user(self):
+        return {"id": "benchmark"}
+
+
+class StubResponse:
+    def __init__(self, data):
+        self.data = data
+
+    def json(self):
+        return self.data
+
+
+class StubRequests:
+    """Answers the Alpha Vantage requests of the stocks module."""
+
+    def get(self, url, **kwargs):
+        symbol = parse_qs(urlparse(url).query)["symbol"][0]
+        price = 20 + seed(symbol) % 50000 / 100
+        return StubResponse({"Global Quote": {
+            "01. symbol": symbol.upper(),
+            "05. price": "{:.4f}".format(price),
+        }})
+
+
+class StubWikipedia:
+    def summary(self, query, sentences=0, chars=0, auto_suggest=True,
+                redirect=True):
+        return ("{} is the subject of this article. It is a stand-in "
+                "summary of {} sentences.".format(query.title(), sentences))
+
+
+def stub_schedule_and_record(season, team):
+    """Returns a season of games of team on every day of the season's year,
+        like pybaseball's schedule_and_record; games after today have no
+        result yet."""
+    import pandas as pd
+    today = date.today()
+    rows = []
+    wins = losses = 0
+    day = date(season, 1, 1)
+    while day.year == season:
+        number = seed(team, day.toordinal())
+        row = {"Date": "{}, {} {}".format(day.strftime("%A"),
+                                         day.strftime("%b"), day.day),
+               "Tm": team, "Opp": ("NYY", "TOR", "BAL", "TBR")[number % 4],
+               "R": float("nan"), "RA": float("nan"), "W-L": None}
+        if day <= today:
+            runs, runs_against = number % 9, (number // 9) % 9
+            if runs == runs_against:
+                runs += 1
+            wins += runs > runs_against
+            losses += runs < runs_against
+            row.update(R=float(runs), RA=float(runs_against),
+                       **{"W-L": "{}-{}".format(wins, losses)})
+        rows.append(row)
+        day += timedelta(1)
+    return pd.DataFrame(rows)
+
+
+def stub_module(name, module_class, my_name="Benchmark"):
+    """Builds a module of module_class whose services are stubs.
+
+        Args:
+            name: the name of the module in Marvin
+            module_class: the class of the module
+            my_name: the name of Marvin's user
+        Returns:
+            The module, built without calling its constructor.
+    """
+    module = module_class.__new__(module_class)
+    python_module = importlib.import_module(module_class.__module__)
+    if name == "spotify":
+        module._spotify = StubSpotify()
+        module.helper = SpotifyHelper()
+        module.auth = True
+        module.volume = 100
+    elif name == "weather":
+        module._OWM = StubOWM()
+        module.ipstack_api_key = None
+        module.current_location = dict(LOCATION)
+        module.helper = WeatherHelper()
+    elif name == "calendar":
+        module.calendar = StubCalendar()
+        module.helper = CalendarHelper()
+    elif name == "sms":
+        module.client = StubTwilio()
+        module.twilio_number = "+15550000000"
+        module.sms_suffix = "Sent from Marvin by: {}".format(my_name)
+        module.helper = SMSHelper()
+    elif name == "stocks":
+        python_module.requests = StubRequests()
+        module.key = None
+        module.helper = StocksHelper()
+        module.prefetched = PrefetchMemo()
+    elif name == "wiki":
+        python_module.wikipedia = StubWikipedia()
+        module.helper = WikiHelper()
+        module.prefetched = PrefetchMemo()
+    elif name == "sports":
+        python_module.schedule_and_record = stub_schedule_and_record
+        module.helper = SportsHelper()
+    else:
+        raise KeyError("No stub for the {} module".format(name))
+    return module
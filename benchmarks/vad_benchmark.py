@@ -0,0 +1,154 @@
+"""Benchmark of end-of-utterance detection on labelled clips.
+
+Compares the original rule, which ended a recording after 30 chunks whose
+signed maximum was under THRESHOLD=500, with the adaptive
+VoiceActivityDetector. For each clip the true end of speech is known, and the
+benchmark reports the delay from it to the detected end, the rate of
+utterances cut off before they ended (truncated), and the rate of clips which
+never ended (missed).
+
+Clips are the WAV files (mono, 16 bit, 16 kHz) of a directory with a
+labels.json mapping each file name to the second its speech ends. Without
+--clips, labelled clips are synthesized in quiet, office and noisy rooms.
+
+Usage:
+    python benchmarks/vad_benchmark.py [--clips DIR] [--hangover 0.5]
+"""
+import argparse
+import json
+import os
+import sys
+import wave
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+from modules.speech_to_text.vad import VoiceActivityDetector  # noqa: E402
+
+RATE = 16000
+CHUNK_SIZE = 1024
+THRESHOLD = 500
+
+# The RMS level of the background noise and of speech in each synthetic room
+ROOMS = {"quiet": (30, 2500), "office": (300, 3000), "noisy": (900, 4000)}
+
+
+def synthesize(rng, noise_level, speech_level):
+    """Returns the samples of a command of words made of syllables, said
+        after some noise and followed by 3 seconds of noise, and the second
+        its speech ends."""
+    lead = rng.uniform(0.2, 0.8)
+    speech = []
+    for word in range(rng.randint(1, 6)):
+        for syllable in range(rng.randint(1, 4)):
+            length = int(rng.uniform(0.08, 0.25) * RATE)
+            # a voiced sound with a rising and falling envelope
+            t = np.arange(length) / RATE
+            tone = np.sin(2 * np.pi * rng.uniform(100, 300) * t)
+            tone += 0.5 * rng.standard_normal(length)
+            envelope = np.sin(np.pi * np.arange(length) / length)
+            speech.append(speech_level * rng.uniform(0.5, 1.5)
+                          * envelope * tone)
+            speech.append(np.zeros(int(rng.uniform(0.02, 0.08) * RATE)))
+        # the pause between words
+        speech.append(np.zeros(int(rng.uniform(0.05, 0.3) * RATE)))
+    speech = np.concatenate(speech[:-2])
+    samples = np.concatenate([np.zeros(int(lead * RATE)), speech,
+                              np.zeros(3 * RATE)])
+    samples += noise_level * rng.standard_normal(len(samples))
+    end = lead + len(speech) / RATE
+    return np.clip(samples, -32768, 32767).astype(np.int16), end
+
+
+def synthetic_clips(count):
+    rng = np.random.RandomState(0)
+    for room, (noise_level, speech_level) in ROOMS.items():
+        for _ in range(count):
+            samples, end = synthesize(rng, noise_level, speech_level)
+            yield room, samples, end
+
+
+def read_clips(directory):
+    with open(os.path.join(directory, "labels.json")) as labels_file:
+        labels = json.load(labels_file)
+    for name, end in sorted(labels.items()):
+        with wave.open(os.path.join(directory, name), "rb") as clip:
+            samples = np.frombuffer(clip.readframes(clip.getnframes()),
+                                    dtype='<i2')
+        yield "clips", samples, end
+
+
+def chunks(samples):
+    for start in range(0, len(samples) - CHUNK_SIZE + 1, CHUNK_SIZE):
+        yield start + CHUNK_SIZE, samples[start:start + CHUNK_SIZE]
+
+
+def fixed_end(samples):
+    """The second the original rule stopped recording, or None."""
+    num_silent = 0
+    snd_started = False
+    for end, chunk in chunks(samples):
+        silent = chunk.max() < THRESHOLD
+        if silent and snd_started:
+            num_silent += 1
+        elif not silent and not snd_started:
+            snd_started = True
+        if snd_started and num_silent > 30:
+            return end / RATE
+    return None
+
+
+def adaptive_end(samples, hangover):
+    vad = VoiceActivityDetector(RATE, hangover=hangover)
+    for end, chunk in chunks(samples):
+        if vad.update(chunk):
+            return end / RATE
+    return None
+
+
+def summarize(ends):
+    """Returns the median and 95th percentile delay in ms of the utterances
+        which weren't truncated, and the truncated and missed rates."""
+    delays = sorted(found - end for found, end in ends
+                    if found is not None and found >= end)
+    truncated = sum(1 for found, end in ends
+                    if found is not None and found < end)
+    missed = sum(1 for found, _ in ends if found is None)
+    if delays:
+        median = 1000 * delays[len(delays) // 2]
+        p95 = 1000 * delays[min(len(delays) - 1, int(0.95 * len(delays)))]
+    else:
+        median = p95 = float("nan")
+    return median, p95, truncated / len(ends), missed / len(ends)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clips", metavar="DIR",
+                        help="a directory of labelled WAV clips")
+    parser.add_argument("--count", type=int, default=50,
+                        help="the number of clips synthesized in each room")
+    parser.add_argument("--hangover", type=float, default=0.5)
+    args = parser.parse_args()
+    if args.clips:
+        clips = read_clips(args.clips)
+    else:
+        clips = synthetic_clips(args.count)
+
+    results = {}
+    for room, samples, end in clips:
+        fixed, adaptive = results.setdefault(room, ([], []))
+        fixed.append((fixed_end(samples), end))
+        adaptive.append((adaptive_end(samples, args.hangover), end))
+
+    print("{:<8} {:<9} {:>10} {:>10} {:>10} {:>8}".format(
+        "room", "end rule", "median ms", "p95 ms", "truncated", "missed"))
+    for room, methods in results.items():
+        for name, ends in zip(("fixed", "adaptive"), methods):
+            median, p95, truncated, missed = summarize(ends)
+            print("{:<8} {:<9} {:>10.0f} {:>10.0f} {:>10.1%} {:>8.1%}".format(
+                room, name, median, p95, truncated, missed))
+
+
+if __name__ == "__main__":
+    main()
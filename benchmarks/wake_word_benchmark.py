@@ -0,0 +1,90 @@
+"""Benchmark of wake word inference on CPU.
+
+Compares the original run_graph, which imported the frozen graph and opened a
+new tf.Session for every window, with WakeWordModel, which keeps one session
+and scores batches of windows in one session run. Reports the windows scored
+per second and the latency of one window for each batch size.
+
+Usage:
+    python benchmarks/wake_word_benchmark.py [--windows N] [--batch-sizes 1 4]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from array import array
+
+os.environ.setdefault("CUDA_VISIBLE_DEVICES", "")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tensorflow as tf  # noqa: E402
+from modules.speech_to_text.inference import WakeWordModel  # noqa: E402
+from modules.speech_to_text.wake_word import encode_wav  # noqa: E402
+
+MODEL_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "modules", "speech_to_text")
+GRAPH = os.path.join(MODEL_DIR, "frozen_graph.pb")
+LABELS = os.path.join(MODEL_DIR, "conv_labels.txt")
+RATE = 16000
+
+
+def make_windows(rng, count):
+    """Returns count one second windows of noise, encoded as WAV files."""
+    return [encode_wav(array("h", (rng.randint(-3000, 3000)
+                                   for _ in range(RATE))), RATE)
+            for _ in range(count)]
+
+
+def session_per_window(wavs):
+    """The original run_graph: a new graph and session for every window."""
+    with tf.gfile.FastGFile(GRAPH, 'rb') as graph_file:
+        graph_def = tf.GraphDef()
+        graph_def.ParseFromString(graph_file.read())
+    for wav in wavs:
+        with tf.Graph().as_default():
+            tf.import_graph_def(graph_def, name='')
+            with tf.Session() as sess:
+                softmax_tensor = sess.graph.get_tensor_by_name(
+                    'labels_softmax:0')
+                sess.run(softmax_tensor, {'wav_data:0': wav})
+
+
+def report(name, seconds, windows):
+    print("{:<24} {:>12.1f} {:>16.2f}".format(
+        name, windows / seconds, 1000 * seconds / windows))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--windows", type=int, default=64)
+    parser.add_argument("--batch-sizes", type=int, nargs="+",
+                        default=[1, 2, 4, 8])
+    args = parser.parse_args()
+    rng = random.Random(0)
+    wavs = make_windows(rng, args.windows)
+    labels = [line.rstrip() for line in tf.gfile.GFile(LABELS)]
+
+    print("{:<24} {:>12} {:>16}".format("inference", "windows/s",
+                                        "ms per window"))
+    # the old approach is slow enough that a few windows are representative
+    sample = wavs[:min(len(wavs), 8)]
+    start = time.perf_counter()
+    session_per_window(sample)
+    report("session per window", time.perf_counter() - start, len(sample))
+
+    for batch_size in args.batch_sizes:
+        model = WakeWordModel(GRAPH, labels, batch_size=batch_size)
+        # the first run allocates the session's buffers
+        model.predict(wavs[:batch_size])
+        start = time.perf_counter()
+        model.predict(wavs)
+        report("persistent, batch {}".format(batch_size),
+               time.perf_counter() - start, len(wavs))
+        model.close()
+
+
+if __name__ == "__main__":
+    main()
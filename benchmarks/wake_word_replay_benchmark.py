@@ -0,0 +1,243 @@
+"""Benchmark of wake word detection on hours of audio, faster than real time.
+
+Streams recorded audio through WakeWordDetector as fast as the frozen graph
+can score it, and reports the windows scored per second, the CPU seconds
+spent per second of audio, the delay from the end of each wake word to its
+detection, and the false accepts per hour. By default it runs once scoring
+every window and once behind the energy gate, whose CPU use on audio without
+the wake word (such as the default noise) is Marvin's idle CPU use.
+
+Since the audio is always waiting, windows are scored in full batches, and
+the latency includes the wait for a batch to fill, as it does when scoring
+falls behind a microphone.
+
+The audio is the WAV files (mono, 16 bit, 16 kHz) or raw 16 bit little
+endian PCM files given with --audio, or --hours of synthetic noise. With
+--wake-clips, the WAV clips of a directory are mixed into the audio every
+--every seconds, so the true position of each wake word is known: a
+detection up to --tolerance seconds after the end of a clip is a hit, and any
+other detection is a false accept.
+
+Usage:
+    python benchmarks/wake_word_replay_benchmark.py [--audio FILE ...]
+        [--hours 1] [--wake-clips DIR [--every 30]] [--batch-size 4]
+        [--gate off|on|both]
+"""
+import argparse
+import os
+import sys
+import time
+import wave
+from types import SimpleNamespace
+
+os.environ.setdefault("CUDA_VISIBLE_DEVICES", "")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+from modules.speech_to_text import dsp  # noqa: E402
+from modules.speech_to_text.sources import (AudioSource,  # noqa: E402
+                                            PipeSource, SyntheticSource,
+                                            WavSource)
+from modules.speech_to_text.wake_word import WakeWordDetector  # noqa: E402
+
+MODEL_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "modules", "speech_to_text")
+GRAPH = os.path.join(MODEL_DIR, "frozen_graph.pb")
+LABELS = os.path.join(MODEL_DIR, "conv_labels.txt")
+RATE = 16000
+CHUNK_SIZE = 1024
+# The measurements reported as percentages
+PERCENTAGES = ("windows gated", "wake words detected")
+
+
+class SplicedSource(AudioSource):
+    """Another source with clips mixed into it at known positions.
+
+        Attributes:
+            source: the AudioSource of the background audio
+            clips: the int16 arrays of the clips, mixed in turn
+            every: the number of samples from the start of one clip to the
+                start of the next
+            spans: the start and end position of each clip mixed in so far
+    """
+
+    def __init__(self, source, clips, every):
+        super().__init__(source.rate)
+        self.source = source
+        self.clips = clips
+        self.every = every
+        self.spans = []
+
+    def read_samples(self, frames):
+        data = self.source.read(frames)
+        if not self.clips or not data:
+            return data
+        samples = dsp.as_samples(data).astype(np.int32)
+        start, end = self.position, self.position + len(samples)
+        # the clip starting in each period overlapping this chunk
+        for period in range(start // self.every, (end - 1) // self.every + 1):
+            clip = self.clips[period % len(self.clips)]
+            clip_start = period * self.every + (self.every - len(clip)) // 2
+            low, high = max(start, clip_start), min(end, clip_start + len(clip))
+            if low >= high:
+                continue
+            samples[low - start:high - start] += clip[low - clip_start:
+                                                      high - clip_start]
+            if high == clip_start + len(clip):
+                self.spans.append((clip_start, high))
+        return np.clip(samples, -32768, 32767).astype('<i2').tobytes()
+
+    def close(self):
+        self.source.close()
+
+
+def read_clips(directory):
+    clips = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".wav"):
+            with wave.open(os.path.join(directory, name), "rb") as clip:
+                clips.append(np.frombuffer(clip.readframes(clip.getnframes()),
+                                           dtype='<i2'))
+    return clips
+
+
+def open_audio(path):
+    if path.endswith(".wav"):
+        return WavSource.open(path, RATE, False)
+    return PipeSource(open(path, "rb"), RATE)
+
+
+def replay(detector, source):
+    """Runs detector over all of source.
+
+        Returns:
+            The position of every detection.
+    """
+    detections = []
+    while detector.detect(source):
+        detections.append(source.position)
+    return detections
+
+
+def match(detections, spans, tolerance):
+    """Matches detections to the clips they heard.
+
+        Args:
+            detections: the positions of the detections, in order
+            spans: the start and end positions of the clips, in order
+            tolerance: the number of samples after the end of a clip its
+                detection counts as a hit
+
+        Returns:
+            The latency in seconds from the end of each detected clip to its
+            first detection, and the number of detections of no clip.
+    """
+    latencies = []
+    false_accepts = 0
+    clips = iter(spans)
+    clip = next(clips, None)
+    heard = None
+    for position in detections:
+        while clip is not None and position > clip[1] + tolerance:
+            clip = next(clips, None)
+        if clip is not None and position >= clip[0]:
+            if clip is not heard:
+                heard = clip
+                latencies.append((position - clip[1]) / RATE)
+        else:
+            false_accepts += 1
+    return latencies, false_accepts
+
+
+def run(detector, args, clips):
+    """Replays the audio of args through detector.
+
+        Returns:
+            A dictionary of the benchmark's measurements.
+    """
+    if args.audio:
+        sources = [open_audio(path) for path in args.audio]
+    else:
+        sources = [SyntheticSource(RATE, 3600 * args.hours)]
+    audio = 0
+    latencies = []
+    false_accepts = 0
+    said = 0
+    windows = detector.windows_scored
+    start, start_cpu = time.perf_counter(), time.process_time()
+    for background in sources:
+        source = SplicedSource(background, clips, int(args.every * RATE))
+        detections = replay(detector, source)
+        hits, misfires = match(detections, source.spans, args.tolerance * RATE)
+        latencies.extend(hits)
+        false_accepts += misfires
+        said += len(source.spans)
+        audio += source.position / RATE
+        source.close()
+    wall = time.perf_counter() - start
+    cpu = time.process_time() - start_cpu
+    latencies.sort()
+    nan = float("nan")
+    return {
+        "audio hours": audio / 3600,
+        "speed (x real time)": audio / wall,
+        "windows scored/s": (detector.windows_scored - windows) / wall,
+        "windows gated": detector.gated_fraction(),
+        "CPU ms per audio second": 1000 * cpu / audio,
+        "false accepts per hour": 3600 * false_accepts / audio,
+        "wake words detected": len(latencies) / said if said else nan,
+        "median latency ms": (1000 * latencies[len(latencies) // 2]
+                              if latencies else nan),
+        "p95 latency ms": (1000 * latencies[
+            min(len(latencies) - 1, int(0.95 * len(latencies)))]
+            if latencies else nan),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--audio", nargs="+", metavar="FILE", default=[],
+                        help="WAV or raw PCM files to replay")
+    parser.add_argument("--hours", type=float, default=1.0,
+                        help="the hours of noise to replay without --audio")
+    parser.add_argument("--wake-clips", metavar="DIR",
+                        help="a directory of WAV clips of the wake word")
+    parser.add_argument("--every", type=float, default=30.0,
+                        help="the seconds between wake word clips")
+    parser.add_argument("--tolerance", type=float, default=1.0,
+                        help="the seconds after the end of a clip its "
+                             "detection counts as a hit")
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--threshold", type=float, default=0.90)
+    parser.add_argument("--gate", choices=["off", "on", "both"],
+                        default="both",
+                        help="score every window, only the windows the "
+                             "energy gate lets through, or compare both")
+    args = parser.parse_args()
+
+    from modules.speech_to_text.inference import WakeWordModel
+    with open(LABELS) as labels_file:
+        labels = [line.rstrip() for line in labels_file]
+    model = WakeWordModel(GRAPH, labels, batch_size=args.batch_size)
+    stt = SimpleNamespace(RATE=RATE, CHUNK_SIZE=CHUNK_SIZE, model=model,
+                          normalize=dsp.normalize)
+    clips = read_clips(args.wake_clips) if args.wake_clips else []
+
+    gates = ["off", "on"] if args.gate == "both" else [args.gate]
+    results = [run(WakeWordDetector(stt, threshold=args.threshold,
+                                    gated=gate == "on"), args, clips)
+               for gate in gates]
+    model.close()
+
+    print("{:<26}".format("gate") + "".join("{:>10}".format(gate)
+                                            for gate in gates))
+    for name in results[0]:
+        print("{:<26}".format(name) + "".join(
+            "{:>10.1%}".format(result[name]) if name in PERCENTAGES
+            else "{:>10.2f}".format(result[name]) for result in results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,548 @@
+"""A regular expression engine which matches in time linear in the length of
+its input, for the subset of regular expression syntax used by Marvin's
+intent tables.
+
+Patterns are compiled to a Thompson NFA. Whether (and which of several
+patterns) a string fully matches is decided by a lazily built DFA, so each
+character of the input costs one dictionary lookup once the DFA is warm.
+The named groups of the winning pattern are then recovered with a Pike VM,
+which follows every thread in priority order and so reports the same groups
+as Python's backtracking re module, without its exponential worst case.
+
+Supported syntax: literals, escapes, '.', character classes (with ranges and
+negation), the escapes \\d, \\w and \\s (ASCII only), groups (capturing,
+non-capturing and named), alternation, and the greedy and lazy quantifiers
+'*', '+' and '?'. Anything else raises a ValueError. Groups are only
+reported for the last iteration of a repeat, so a repeated group which can
+match the empty string may capture differently than with re.
+"""
+import string
+import threading
+
+
+DIGITS = frozenset(string.digits)
+WORD = frozenset(string.ascii_letters + string.digits + "_")
+SPACE = frozenset(" \t\n\r\f\v")
+CLASS_ESCAPES = {"d": DIGITS, "w": WORD, "s": SPACE}
+
+# NFA instructions, stored as tuples whose first element is the opcode
+CHAR = 0    # (CHAR, chars, negated)
+SPLIT = 1   # (SPLIT, preferred pc, other pc)
+JMP = 2     # (JMP, pc)
+SAVE = 3    # (SAVE, slot)
+MATCH = 4   # (MATCH,)
+
+
+class _Parser:
+    """Parses a pattern into a tree of tuples:
+        ("char", chars, negated), ("concat", [nodes]), ("alt", [nodes]),
+        ("repeat", node, min, max, greedy) and ("group", name, node).
+    """
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.pos = 0
+        self.group_names = []
+
+    def error(self, message):
+        return ValueError("{} at position {} of {!r}".format(
+            message, self.pos, self.pattern))
+
+    def peek(self):
+        if self.pos < len(self.pattern):
+            return self.pattern[self.pos]
+        return None
+
+    def next(self):
+        char = self.peek()
+        if char is None:
+            raise self.error("Unexpected end of pattern")
+        self.pos += 1
+        return char
+
+    def parse(self):
+        node = self.parse_alternation()
+        if self.peek() is not None:
+            raise self.error("Unbalanced parenthesis")
+        return node
+
+    def parse_alternation(self):
+        branches = [self.parse_concat()]
+        while self.peek() == "|":
+            self.pos += 1
+            branches.append(self.parse_concat())
+        if len(branches) == 1:
+            return branches[0]
+        return ("alt", branches)
+
+    def parse_concat(self):
+        nodes = []
+        while self.peek() not in (None, "|", ")"):
+            nodes.append(self.parse_repeat())
+        return ("concat", nodes)
+
+    def parse_repeat(self):
+        node = self.parse_atom()
+        char = self.peek()
+        if char in ("*", "+", "?"):
+            self.pos += 1
+            minimum = 1 if char == "+" else 0
+            maximum = 1 if char == "?" else None
+            greedy = True
+            if self.peek() == "?":
+                self.pos += 1
+                greedy = False
+            if self.peek() in ("*", "+", "?", "{"):
+                raise self.error("Multiple repeat")
+            return ("repeat", node, minimum, maximum, greedy)
+        elif char == "{":
+            raise self.error("Counted repetition is not supported")
+        return node
+
+    def parse_atom(self):
+        char = self.next()
+        if char == "(":
+            name = None
+            if self.peek() == "?":
+                self.pos += 1
+                kind = self.next()
+                if kind == "P" and self.peek() == "<":
+                    self.pos += 1
+                    end = self.pattern.find(">", self.pos)
+                    if end == -1:
+                        raise self.error("Unterminated group name")
+                    name = self.pattern[self.pos:end]
+                    if not name.isidentifier() or name in self.group_names:
+                        raise self.error("Bad group name")
+                    self.group_names.append(name)
+                    self.pos = end + 1
+                elif kind != ":":
+                    raise self.error("Unsupported group type")
+            node = self.parse_alternation()
+            if self.next() != ")":
+                raise self.error("Missing )")
+            return ("group", name, node)
+        elif char == "[":
+            return self.parse_class()
+        elif char == ".":
+            return ("char", frozenset("\n"), True)
+        elif char == "\\":
+            return self.parse_escape()
+        elif char in ("*", "+", "?"):
+            raise self.error("Nothing to repeat")
+        elif char in ("^", "$", "{", "}"):
+            raise self.error("{!r} is not supported".format(char))
+        return ("char", frozenset(char), False)
+
+    def parse_escape(self):
+        char = self.next()
+        if char in CLASS_ESCAPES:
+            return ("char", CLASS_ESCAPES[char], False)
+        elif char.isalnum():
+            raise self.error("Unsupported escape \\{}".format(char))
+        return ("char", frozenset(char), False)
+
+    def parse_class(self):
+        negated = False
+        if self.peek() == "^":
+            self.pos += 1
+            negated = True
+        chars = set()
+        first = True
+        while True:
+            char = self.next()
+            if char == "]" and not first:
+                break
+            first = False
+            if char == "\\":
+                escaped = self.next()
+                if escaped in CLASS_ESCAPES:
+                    chars |= CLASS_ESCAPES[escaped]
+                    continue
+                elif escaped.isalnum():
+                    raise self.error("Unsupported escape \\{}".format(escaped))
+                char = escaped
+            if self.peek() == "-" and self.pattern[self.pos + 1:self.pos + 2] \
+                    not in ("]", ""):
+                self.pos += 1
+                end = self.next()
+                if end == "\\":
+                    end = self.next()
+                if ord(end) < ord(char):
+                    raise self.error("Bad character range")
+                chars.update(chr(c) for c in range(ord(char), ord(end) + 1))
+            else:
+                chars.add(char)
+        return ("char", frozenset(chars), negated)
+
+
+class _Compiler:
+    """Compiles a parsed pattern into a list of NFA instructions."""
+
+    def __init__(self, group_names):
+        self.program = []
+        self.slots = {name: 2 * i for i, name in enumerate(group_names)}
+
+    def emit(self, instruction):
+        self.program.append(instruction)
+        return len(self.program) - 1
+
+    def compile(self, node):
+        self.visit(node)
+        self.emit((MATCH,))
+        return self.program
+
+    def visit(self, node):
+        kind = node[0]
+        if kind == "char":
+            self.emit((CHAR, node[1], node[2]))
+        elif kind == "concat":
+            for child in node[1]:
+                self.visit(child)
+        elif kind == "group":
+            name = node[1]
+            if name is not None:
+                self.emit((SAVE, self.slots[name]))
+            self.visit(node[2])
+            if name is not None:
+                self.emit((SAVE, self.slots[name] + 1))
+        elif kind == "alt":
+            jumps = []
+            branches = node[1]
+            for branch in branches[:-1]:
+                split = self.emit(None)
+                self.visit(branch)
+                jumps.append(self.emit(None))
+                self.program[split] = (SPLIT, split + 1, len(self.program))
+            self.visit(branches[-1])
+            for jump in jumps:
+                self.program[jump] = (JMP, len(self.program))
+        elif kind == "repeat":
+            child, minimum, maximum, greedy = node[1:]
+            for _ in range(minimum):
+                self.visit(child)
+            if maximum is None:
+                # child* after the required repetitions
+                split = self.emit(None)
+                self.visit(child)
+                self.emit((JMP, split))
+                self.program[split] = self.split(split + 1, len(self.program),
+                                                 greedy)
+            elif maximum > minimum:
+                split = self.emit(None)
+                self.visit(child)
+                self.program[split] = self.split(split + 1, len(self.program),
+                                                 greedy)
+
+    def split(self, body, after, greedy):
+        if greedy:
+            return (SPLIT, body, after)
+        return (SPLIT, after, body)
+
+
+def _closure(program, pcs):
+    """Returns the CHAR and MATCH instructions reachable from pcs without
+        consuming input, in priority order."""
+    reached = []
+    seen = set()
+    stack = list(reversed(pcs))
+    while stack:
+        pc = stack.pop()
+        if pc in seen:
+            continue
+        seen.add(pc)
+        instruction = program[pc]
+        op = instruction[0]
+        if op == SPLIT:
+            stack.append(instruction[2])
+            stack.append(instruction[1])
+        elif op == JMP:
+            stack.append(instruction[1])
+        elif op == SAVE:
+            stack.append(pc + 1)
+        else:
+            reached.append(pc)
+    return reached
+
+
+def _accepts(instruction, char):
+    return (char in instruction[1]) != instruction[2]
+
+
+class LinearMatch:
+    """The result of a successful LinearPattern.fullmatch.
+
+        Attributes:
+            string: the string which was matched
+            re: the LinearPattern which matched it
+    """
+
+    def __init__(self, pattern, string, slots):
+        self.re = pattern
+        self.string = string
+        self._slots = slots
+
+    def group(self, name):
+        if isinstance(name, int):
+            if name == 0:
+                return self.string
+            name = self.re.group_names[name - 1]
+        start = self._slots[self.re.slots[name]]
+        end = self._slots[self.re.slots[name] + 1]
+        if start is None or end is None:
+            return None
+        return self.string[start:end]
+
+    def groupdict(self):
+        return {name: self.group(name) for name in self.re.group_names}
+
+
+class LinearPattern:
+    """A compiled pattern which matches in linear time.
+
+        Only named groups capture, so unnamed groups are treated as
+        non-capturing.
+
+        Attributes:
+            pattern: the pattern string
+            group_names: the names of the named groups, in order
+            groupindex: a dictionary from group names to group numbers
+            program: the list of NFA instructions of the pattern
+    """
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+        parser = _Parser(pattern)
+        tree = parser.parse()
+        self.group_names = parser.group_names
+        self.groupindex = {name: i + 1
+                           for i, name in enumerate(self.group_names)}
+        compiler = _Compiler(self.group_names)
+        self.program = compiler.compile(tree)
+        self.slots = compiler.slots
+        self._dfa = _DFA([self.program])
+        self._closures = {}
+
+    def fullmatch(self, string):
+        """Returns a LinearMatch if the whole of string matches, else None."""
+        if self._dfa.run(string) is None:
+            return None
+        return LinearMatch(self, string, _pike(self.program, self._closures,
+                                               string,
+                                               2 * len(self.group_names)))
+
+
+class LinearMultiPattern:
+    """Several LinearPatterns compiled into one DFA, which finds the first
+        pattern to fully match a string in a single pass.
+
+        Attributes:
+            patterns: the list of LinearPatterns, in priority order
+    """
+
+    def __init__(self, patterns):
+        self.patterns = [pattern if isinstance(pattern, LinearPattern)
+                         else LinearPattern(pattern) for pattern in patterns]
+        self._dfa = _DFA([pattern.program for pattern in self.patterns])
+
+    def fullmatch(self, string):
+        """Returns the index of the first pattern which fully matches string
+            and its LinearMatch, or (None, None) if none of them match."""
+        index = self._dfa.run(string)
+        if index is None:
+            return None, None
+        return index, self.patterns[index].fullmatch(string)
+
+
+class _DFACache:
+    """The DFA states built so far by a _DFA, which are dropped together
+        when it is flushed.
+
+        Attributes:
+            states: the set of NFA states of each DFA state
+            ids: a dictionary from sets of NFA states to their DFA state
+            transitions: a dictionary for each DFA state from the characters
+                seen in it to the following DFA state
+            accepting: the index of the first program matching in each DFA
+                state, or None
+            start: the DFA state at the start of the input
+    """
+
+    def __init__(self):
+        self.states = []
+        self.ids = {}
+        self.transitions = []
+        self.accepting = []
+        self.start = None
+
+
+class _DFA:
+    """A DFA built on demand from the NFAs of several programs.
+
+        Each DFA state is a set of (program index, pc) NFA states. The
+        transitions of a state are computed the first time each character is
+        seen in that state, and the cache is flushed if it grows past
+        max_states, so memory stays bounded while each character of input
+        costs at most one pass over the NFA.
+
+        One DFA is shared by every thread matching with its pattern: states
+        and transitions are only added, and the cache only replaced, while
+        holding lock, so a thread following warm transitions never takes it
+        and always sees a consistent cache.
+    """
+
+    DEAD = -1
+
+    def __init__(self, programs, max_states=10000):
+        self.programs = programs
+        self.max_states = max_states
+        self.lock = threading.Lock()
+        self.cache = None
+        with self.lock:
+            self.flush()
+
+    def flush(self):
+        """Replaces the cache with one holding only the start state. Called
+            with lock held."""
+        cache = _DFACache()
+        start = []
+        for index, program in enumerate(self.programs):
+            start.extend((index, pc) for pc in _closure(program, [0]))
+        cache.start = self.add_state(cache, frozenset(start))
+        self.cache = cache
+
+    def add_state(self, cache, nfa_states):
+        state = cache.ids.get(nfa_states)
+        if state is not None:
+            return state
+        if not nfa_states:
+            return self.DEAD
+        matches = [index for index, pc in nfa_states
+                   if self.programs[index][pc][0] == MATCH]
+        state = len(cache.states)
+        cache.transitions.append({})
+        cache.accepting.append(min(matches) if matches else None)
+        cache.states.append(nfa_states)
+        cache.ids[nfa_states] = state
+        return state
+
+    def step(self, cache, state, char):
+        """Returns the state following state on char in cache, adding it if
+            it is new."""
+        with self.lock:
+            next_state = cache.transitions[state].get(char)
+            if next_state is not None:
+                return next_state
+            following = {}
+            for index, pc in cache.states[state]:
+                instruction = self.programs[index][pc]
+                if instruction[0] == CHAR and _accepts(instruction, char):
+                    following.setdefault(index, []).append(pc + 1)
+            nfa_states = frozenset(
+                (index, reached) for index, pcs in following.items()
+                for reached in _closure(self.programs[index], pcs))
+            next_state = self.add_state(cache, nfa_states)
+            cache.transitions[state][char] = next_state
+            return next_state
+
+    def run(self, string):
+        """Returns the index of the first program which fully matches
+            string, or None."""
+        cache = self.cache
+        if len(cache.states) > self.max_states:
+            with self.lock:
+                if self.cache is cache:
+                    self.flush()
+                cache = self.cache
+        transitions = cache.transitions
+        state = cache.start
+        if state == self.DEAD:
+            return None
+        for char in string:
+            next_state = transitions[state].get(char)
+            if next_state is None:
+                next_state = self.step(cache, state, char)
+            if next_state == self.DEAD:
+                return None
+            state = next_state
+        return cache.accepting[state]
+
+
+def _save_closure(program, pc):
+    """Returns the CHAR and MATCH instructions reachable from pc without
+        consuming input, in priority order, each with the capture slots set
+        on the highest priority path to it."""
+    reached = []
+    seen = set()
+    stack = [(pc, ())]
+    while stack:
+        pc, saves = stack.pop()
+        if pc in seen:
+            continue
+        seen.add(pc)
+        instruction = program[pc]
+        op = instruction[0]
+        if op == SPLIT:
+            stack.append((instruction[2], saves))
+            stack.append((instruction[1], saves))
+        elif op == JMP:
+            stack.append((instruction[1], saves))
+        elif op == SAVE:
+            stack.append((pc + 1, saves + (instruction[1],)))
+        else:
+            reached.append((pc, saves))
+    return tuple(reached)
+
+
+def _pike(program, closures, string, num_slots):
+    """Runs a Pike VM over string and returns the capture slots of the
+        highest priority thread to reach MATCH at the end of the string.
+
+        Args:
+            program: the list of NFA instructions
+            closures: a dictionary caching the _save_closure of each pc
+            string: the string to match
+            num_slots: the number of capture slots
+    """
+    def follow(threads, seen, pc, slots, position):
+        closure = closures.get(pc)
+        if closure is None:
+            closure = closures[pc] = _save_closure(program, pc)
+        for reached, saves in closure:
+            # a thread which reaches an instruction first has priority over
+            # every later thread reaching it
+            if reached in seen:
+                continue
+            seen.add(reached)
+            if saves:
+                saved = list(slots)
+                for slot in saves:
+                    saved[slot] = position
+                threads.append((reached, tuple(saved)))
+            else:
+                threads.append((reached, slots))
+
+    threads = []
+    follow(threads, set(), 0, (None,) * num_slots, 0)
+    position = 0
+    for char in string:
+        position += 1
+        following = []
+        seen = set()
+        for pc, slots in threads:
+            instruction = program[pc]
+            if instruction[0] == CHAR and \
+                    (char in instruction[1]) != instruction[2]:
+                follow(following, seen, pc + 1, slots, position)
+        threads = following
+        if not threads:
+            return None
+    for pc, slots in threads:
+        if program[pc][0] == MATCH:
+            return slots
+    return None
+
+
+def compile(pattern):
+    """Compiles a pattern string into a LinearPattern."""
+    return LinearPattern(pattern)
@@ -1,34 +1,91 @@
 import os
-import glob
-import yaml
-import re
 import sys
-import spotipy
-import pyowm
-import googleapiclient
-import pyaudio
-import pyttsx3
-from google.cloud import speech
-from google.cloud.speech import enums
-from google.cloud.speech import types
-from twilio.base.exceptions import TwilioException
-from wikipedia.exceptions import WikipediaException
-from modules.spotify.spotify import Spotify
-from modules.weather.weather import Weather
-from modules.marvin_calendar.marvin_calendar import Calendar
-from modules.sms.sms import SMS
-from modules.wiki.wiki import Wiki
-from modules.speech_to_text.speech_to_text import MarvinSpeechToText
-from modules.sports.sports import Sports
-from modules.stocks.stocks import Stocks
-from marvin_helper import Marvin_Helper
-from time import sleep
+import argparse
+import asyncio
+import atexit
+import copy
+import importlib
+import threading
+from modules.cache import RESPONSE_CACHE
+from modules.tracing import TRACER, span
+from time import perf_counter
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+# The class of each module, imported the first time the module is built so
+# that Marvin doesn't pay for the libraries of modules it never uses
+MODULE_CLASSES = OrderedDict([
+    ("spotify", "modules.spotify.spotify.Spotify"),
+    ("weather", "modules.weather.weather.Weather"),
+    ("calendar", "modules.marvin_calendar.marvin_calendar.Calendar"),
+    ("sms", "modules.sms.sms.SMS"),
+    ("wiki", "modules.wiki.wiki.Wiki"),
+    ("sports", "modules.sports.sports.Sports"),
+    ("stocks", "modules.stocks.stocks.Stocks"),
+])
+
+# The exception raised by the module of each label when its service fails,
+# and what Marvin says when it is raised
+MODULE_ERRORS = {
+    "music": ("spotipy.client.SpotifyException",
+              "Error executing Spotify command"),
+    "weather": ("pyowm.exceptions.api_call_error.APICallError",
+                "An error occurred while connecting to Open Weather Map"),
+    "calendar": ("googleapiclient.errors.HttpError",
+                 "An error occurred while connecting to Google Calendar"),
+    "sms": ("twilio.base.exceptions.TwilioException",
+            "An error occured while connecting to Twilio"),
+    "wiki": ("wikipedia.exceptions.WikipediaException",
+             "An error occurred while connecting to Wikipedia"),
+    "sports": ("builtins.KeyError", "Cannot understand command"),
+}
+
+# Where the audio of Marvin's fixed phrases is rendered to
+PHRASE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "modules", "text_to_speech", "phrases")
+
+StartupStats = namedtuple("StartupStats",
+                          ["import_seconds", "build_seconds", "memory"])
+
+
+def import_object(path):
+    """Imports and returns an object given its dotted path (e.g.
+        "modules.wiki.wiki.Wiki")."""
+    module_path, name = path.rsplit(".", 1)
+    return getattr(importlib.import_module(module_path), name)
+
+
+def resident_memory():
+    """Returns the resident memory of this process in bytes."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+        # ru_maxrss is the peak resident memory, in bytes on macOS and
+        # kilobytes elsewhere
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return usage if sys.platform == "darwin" else usage * 1024
+
+
+def lazy_module(name):
+    """Returns a property which builds the named module of a Marvin object the
+        first time it is accessed."""
+    def get(self):
+        return self.get_module(name)
+    return property(get)
 
 
 class Marvin:
     """Creates an AI assistant which can respond to spoken or typed commands
         of numerous kinds.
 
+       Modules are built the first time a command is routed to them (or when
+       they are warmed), so Marvin starts without waiting on the network calls
+       and authorization that building some modules requires. The libraries
+       behind each module and the speech components are only imported when
+       they are built.
+
        Attributes:
             spotify: A Spotify object, executes and responds to Spotify
                 commands
@@ -36,156 +93,625 @@ class Marvin:
                 commands
             calendar: A Calendar object, executes and responds to Calendar
                 commands
+            module_classes: an OrderedDict from module names to the dotted
+                path of their class
+            module_args: a dictionary from module names to the arguments their
+                class is built with
+            modules: a dictionary from module names to the modules which have
+                been built so far
+            startup_stats: a dictionary from the names of Marvin's modules
+                and components to StartupStats of the time it took to import
+                and build them and the resident memory they added
+            startup_failures: a dictionary from module names to the exception
+                raised while warming that module in the background
+            executor: a ThreadPoolExecutor with workers threads, which runs
+                the blocking work of route_command_async
             helper: A helper which chooses which module to send commands to
             user_spoken: True if Marvin should listen to commands through the
                 microphone, and False if the command line should be used
+            stt: the MarvinSpeechToText object listening to commands, if
+                user_spoken, from the audio_source audio source and
+                transcribing them with the stt_backend speech to text backend
             marvin_spoken: True if Marvin should use text to speech, and False if
                 print statements should be used
+            speech_queue: a SpeechQueue which speaks responses on its own
+                thread, if marvin_spoken
+            current_music_name: the name of the module used for music commands,
+                or None if no music module is selected
+            parent: the Marvin this Marvin is a session of, or None
+            speculative: True if every module a command could be for should
+                parse it (and prefetch its data) at the same time, instead of
+                parsing it with one module after another
             current_music: If music is currently being played or used, then
                 current_music is equal to corresponding music module object in
                 Marvin's attributes
        """
 
+    spotify = lazy_module("spotify")
+    weather = lazy_module("weather")
+    calendar = lazy_module("calendar")
+    sms = lazy_module("sms")
+    wiki = lazy_module("wiki")
+    sports = lazy_module("sports")
+    stocks = lazy_module("stocks")
+
     def __init__(self, sms_name, default_music=None,
-                 user_spoken=False, marvin_spoken=False):
-        self.spotify = Spotify()
-        self.weather = Weather()
-        self.calendar = Calendar()
-        self.sms = SMS(sms_name)
-        self.wiki = Wiki()
-        self.sports = Sports()
-        self.stocks = Stocks()
-        self.helper = Marvin_Helper()
+                 user_spoken=False, marvin_spoken=False,
+                 linear_matching=False, warm_modules=False, workers=None,
+                 speculative=False, stt_backend=None, audio_source=None):
+        self.module_classes = OrderedDict(MODULE_CLASSES)
+        self.module_args = {"sms": (sms_name,)}
+        self.modules = {}
+        self.module_locks = {name: threading.Lock()
+                             for name in self.module_classes}
+        self.startup_stats = OrderedDict()
+        self.startup_failures = {}
+        self.executor = ThreadPoolExecutor(max_workers=workers,
+                                           thread_name_prefix="marvin")
+        if linear_matching:
+            self.helper = self.build("helper", "marvin_helper.Marvin_Helper",
+                                     "linear")
+        else:
+            self.helper = self.build("helper", "marvin_helper.Marvin_Helper")
         self.user_spoken = user_spoken
         self.marvin_spoken = marvin_spoken
         self.sms_name = sms_name
         if self.user_spoken:
-            self.stt = MarvinSpeechToText()
+            self.stt = self.build(
+                "speech to text",
+                "modules.speech_to_text.speech_to_text.MarvinSpeechToText",
+                stt_backend, audio_source)
         if self.marvin_spoken:
-            self.speech_engine = pyttsx3.init()
-        if default_music is None:
-            self.current_music = None
-        else:
-            if default_music == "spotify":
-                self.current_music = self.spotify
+            self.speech_queue = self.build(
+                "text to speech",
+                "modules.text_to_speech.speech_queue.SpeechQueue",
+                "pyttsx3.init", PHRASE_DIRECTORY,
+                # cached phrases play through the engine which captures the
+                # microphone, so one object owns the audio device
+                self.stt.audio.output if self.user_spoken else None)
+        self.current_music_name = default_music
+        self.speculative = speculative
+        self.parent = None
+        if warm_modules:
+            self.warm_modules()
+
+    @property
+    def current_music(self):
+        if self.current_music_name is None:
+            return None
+        return self.get_module(self.current_music_name)
+
+    def build(self, name, path, *args):
+        """Imports the class (or function) at path and calls it with args,
+            recording the time and memory taken in startup_stats."""
+        memory = resident_memory()
+        start = perf_counter()
+        component_class = import_object(path)
+        imported = perf_counter()
+        component = component_class(*args)
+        self.startup_stats[name] = StartupStats(
+            imported - start, perf_counter() - imported,
+            resident_memory() - memory)
+        return component
+
+    def get_module(self, name):
+        """Returns the named module, building it if it hasn't been built
+            yet."""
+        module = self.modules.get(name)
+        if module is None:
+            with self.module_locks[name]:
+                module = self.modules.get(name)
+                if module is None and self.parent is not None:
+                    # a shallow copy shares the parent's clients and caches,
+                    # while the attributes a command assigns (like the volume
+                    # or playlists of Spotify) stay in this session
+                    module = copy.copy(self.parent.get_module(name))
+                    self.modules[name] = module
+                elif module is None:
+                    module = self.build(name, self.module_classes[name],
+                                        *self.module_args.get(name, ()))
+                    self.modules[name] = module
+        return module
+
+    def load_module(self, label, say):
+        """Returns the module which executes the commands of a label,
+            building it if it hasn't been built yet.
+
+            Modules are built on first use, so a module whose constructor
+            fails (for example because its service can't be reached) fails
+            in the middle of a session. It isn't kept, so the next command
+            for it tries to build it again.
+
+            Returns:
+                The module, or None after telling the user with say that it
+                is unavailable.
+        """
+        try:
+            return self.get_module(self.module_name(label))
+        except Exception:
+            say("The {} module is unavailable right now".format(label))
+            return None
+
+    def session(self):
+        """Returns a Marvin for one user of this Marvin.
+
+            The session shares this Marvin's helper, worker threads and the
+            clients of its modules, but has its own current music and its own
+            copy of the state of each module it uses.
+        """
+        session = copy.copy(self)
+        session.parent = self
+        session.modules = {}
+        session.module_locks = {name: threading.Lock()
+                                for name in self.module_classes}
+        return session
+
+    def get_module_errors(self, label):
+        """Returns the exception raised by the module of a label when its
+            service fails (or an empty tuple) and the message to say when it
+            is raised."""
+        if label not in MODULE_ERRORS:
+            return (), None
+        path, message = MODULE_ERRORS[label]
+        return import_object(path), message
+
+    def warm_modules(self, names=None):
+        """Builds modules on a background thread, so they are ready before
+            the first command is routed to them.
+
+            Args:
+                names: the names of the modules to build, defaults to every
+                    module
+            Returns:
+                The thread building the modules.
+        """
+        if names is None:
+            names = list(self.module_classes)
+
+        def warm():
+            for name in names:
+                try:
+                    self.get_module(name)
+                except Exception as e:
+                    # the module will be built again (and the error raised)
+                    # when a command is routed to it
+                    self.startup_failures[name] = e
+
+        thread = threading.Thread(target=warm, name="marvin-warm-modules",
+                                  daemon=True)
+        thread.start()
+        return thread
+
+    def startup_report(self):
+        """Returns a string with the time it took to import and build each of
+            Marvin's components and modules, and the memory they added."""
+        lines = ["{:<16} {:>10} {:>10} {:>10}".format(
+            "Startup", "import ms", "build ms", "memory MB")]
+        for name, stats in list(self.startup_stats.items()):
+            lines.append("{:<16} {:>10.1f} {:>10.1f} {:>10.1f}".format(
+                name, stats.import_seconds * 1000, stats.build_seconds * 1000,
+                stats.memory / 2 ** 20))
+        for name in self.module_classes:
+            if name in self.startup_failures:
+                lines.append("{:<16} failed: {}".format(
+                    name, self.startup_failures[name]))
+            elif name not in self.startup_stats:
+                lines.append("{:<16} {:>10}".format(name, "not built"))
+        lines.append("{:<16} {:>32.1f}".format(
+            "resident MB", resident_memory() / 2 ** 20))
+        return "\n".join(lines)
 
     def text_input(self):
         user_input = input("> ")
         return user_input
 
-    def prompt(self):
-        """Prompts the user for input to Marvin"""
+    def listen(self):
+        """Records user input for the modules, through either speech to text
+            or the command line."""
+        self.flush_speech()
+        if self.user_spoken:
+            return self.stt.record_and_convert()
+        return self.text_input()
+
+    def read_command(self):
+        """Waits for the user's next command and returns it in lower case
+            (empty if nothing was recognized)."""
+        self.flush_speech()
         if self.user_spoken:
             self.stt.detect_wake_word()
             print(">")
-            sleep(0.2)
-            try:
-                command = self.stt.record_and_convert(after_wake_word=True)
-                if command is None:
-                    command = ""
-                self.route_command(command.lower())
-            except IndexError:
-                return
+            command = self.stt.record_and_convert(after_wake_word=True)
+            if command is None:
+                command = ""
         else:
             command = self.text_input()
-            self.route_command(command.lower())
+        return command.lower()
 
-    def route_command(self, command):
-        """Sends a user command to the corresponding module where it will be
-            executed."""
+    def prompt(self):
+        """Prompts the user for input to Marvin"""
+        command = self.read_command()
+        if command is not None:
+            self.route_command(command)
+
+    def find_labels(self, command, say):
+        """Classifies a command.
+
+            Args:
+                command: string, command entered by user
+                say: the function used to tell the user why a command can't
+                    be executed
+            Returns:
+                The labels of the command, or None (after telling the user
+                why) if the command can't be executed.
+        """
         labels = self.helper.classify_command(command)
-        # set the function that will record user input for the other modules
-        if self.user_spoken:
-            listen = self.stt.record_and_convert
-        else:
-            listen = self.text_input
-        if "music" in labels:
-            if self.current_music is not None:
-                try:
-                    result = self.current_music.route_command(
-                        command,
-                        self.say,
-                        listen
-                    )
-                    if result:
-                        return
-                except spotipy.client.SpotifyException:
-                    self.say("Error executing Spotify command")
-                    return
-            else:
-                self.say("No music currently selected.")
-                return
-        if "weather" in labels:
-            try:
-                result = self.weather.route_command(
-                    command,
-                    self.say,
-                    listen
-                )
-                if result:
-                    return
-            except pyowm.exceptions.api_call_error.APICallError:
-                self.say("An error occurred while connecting to Open Weather \
-                Map")
-                return
-        if "calendar" in labels:
-            try:
-                result = self.calendar.route_command(
-                    command,
-                    self.say,
-                    listen
-                )
-                if result:
-                    return
-            except googleapiclient.errors.HttpError:
-                self.say("An error occurred while connecting to Google \
-                Calendar")
-                return
-        if "sms" in labels:
-            try:
-                result = self.sms.route_command(command, self.say, listen)
-                if result:
-                    return
-            except TwilioException:
-                self.say("An error occured while connecting to Twilio")
-                return
-        if "stocks" in labels:
-            result = self.stocks.route_command(command, self.say, listen)
-            if result:
-                return
-        if "wiki" in labels:
-            try:
-                result = self.wiki.route_command(command, self.say, listen)
-                if result:
-                    return
-            except WikipediaException:
-                self.say("An error occurred while connecting to Wikipedia")
-                return
-        if "sports" in labels:
+        if "music" in labels and self.current_music_name is None:
+            say("No music currently selected.")
+            return None
+        return labels
+
+    def module_name(self, label):
+        """Returns the name of the module which executes commands with a
+            given label."""
+        if label == "music":
+            return self.current_music_name
+        return label
+
+    def speculation_order(self, labels):
+        """Returns the labels of a command in the order their modules are
+            tried, which is the priority order of the intent dispatcher."""
+        return [label for label in self.helper.module_helpers
+                if label in labels]
+
+    def evaluate(self, command, label):
+        """Parses a command with the module of a single label and, if it
+            parses, builds that module and lets it prefetch the data the
+            command needs.
+
+            Returns:
+                The Intent of the command and the module which executes it,
+                or the Intent and None if the command doesn't parse or the
+                module can't be built.
+        """
+        intent = self.helper.match_intent(command, [label])
+        if intent.module is None:
+            return intent, None
+        try:
+            module = self.get_module(self.module_name(label))
+        except Exception:
+            # route_command builds it again and reports the error
+            return intent, None
+        prefetch = getattr(module, "prefetch", None)
+        if prefetch is not None:
             try:
-                result = self.sports.route_command(command, self.say, listen)
-                if result:
-                    return
-            except KeyError:
-                self.say("Cannot understand command")
-                return
-        self.say("Cannot understand command")
+                prefetch(intent.label, intent.args)
+            except Exception:
+                # run_intent fetches the data again and reports the error
+                pass
+        return intent, module
+
+    def speculate(self, command, labels):
+        """Evaluates a command with the module of every label at the same
+            time, on self.executor.
+
+            Results are collected in priority order, so the first module to
+            parse the command is the one route_command would have chosen.
+            Evaluations which haven't started by then are cancelled.
+
+            Returns:
+                The Intent of the command and the module which executes it
+                (or None if it can't be built), or (None, None) if no module
+                parses the command.
+        """
+        futures = [self.executor.submit(self.evaluate, command, label)
+                   for label in self.speculation_order(labels)]
+        try:
+            for future in futures:
+                intent, module = future.result()
+                if intent.module is not None:
+                    return intent, module
+            return None, None
+        finally:
+            for future in futures:
+                future.cancel()
+
+    async def speculate_async(self, command, labels):
+        """Evaluates a command like speculate, without blocking the event
+            loop."""
+        loop = asyncio.get_running_loop()
+        futures = [loop.run_in_executor(self.executor, self.evaluate,
+                                        command, label)
+                   for label in self.speculation_order(labels)]
+        try:
+            for future in futures:
+                intent, module = await future
+                if intent.module is not None:
+                    return intent, module
+            return None, None
+        finally:
+            for future in futures:
+                if not future.cancel():
+                    # mark errors of evaluations which lost as retrieved
+                    future.exception()
+
+    def find_intent(self, command, say):
+        """Classifies and parses a command, evaluating every candidate module
+            at the same time if Marvin is speculative.
+
+            Args:
+                command: string, command entered by user
+                say: the function used to tell the user why a command can't
+                    be executed
+            Returns:
+                The Intent of the command and its module if it has been built
+                (otherwise None), or (None, None) after telling the user why
+                the command can't be executed.
+        """
+        labels = self.find_labels(command, say)
+        if labels is None:
+            return None, None
+        if self.speculative:
+            intent, module = self.speculate(command, labels)
+        else:
+            intent = self.helper.match_intent(command, labels)
+            module = self.modules.get(self.module_name(intent.module))
+        if intent is None or intent.module is None:
+            say("Cannot understand command")
+            return None, None
+        return intent, module
+
+    async def find_intent_async(self, command, say):
+        """Classifies and parses a command like find_intent, without blocking
+            the event loop."""
+        labels = self.find_labels(command, say)
+        if labels is None:
+            return None, None
+        if self.speculative:
+            intent, module = await self.speculate_async(command, labels)
+        else:
+            intent = self.helper.match_intent(command, labels)
+            module = self.modules.get(self.module_name(intent.module))
+        if intent is None or intent.module is None:
+            say("Cannot understand command")
+            return None, None
+        return intent, module
+
+    def route_command(self, command, say=None, listen=None):
+        """Sends a user command to the corresponding module where it will be
+            executed.
+
+            Args:
+                command: string, command entered by user
+                say: the function used to respond to the command, defaults
+                    to self.say
+                listen: the function used to ask the user for more input,
+                    defaults to self.listen
+            Returns:
+                The label of the module which executed the command, or None
+                if it couldn't be executed.
+        """
+        say = say or self.say
+        listen = listen or self.listen
+        intent, module = self.find_intent(command, say)
+        if intent is None:
+            return None
+        if module is None:
+            module = self.load_module(intent.module, say)
+            if module is None:
+                return None
+        errors, error_message = self.get_module_errors(intent.module)
+        try:
+            with span("module.run", module=intent.module, label=intent.label):
+                module.run_intent(intent.label, intent.args, say, listen)
+        except errors:
+            say(error_message)
+        return intent.module
+
+    async def route_command_async(self, command, say=None, listen=None):
+        """Sends a user command to the corresponding module where it will be
+            executed, without blocking the event loop.
+
+            Modules which define a run_intent_async coroutine are awaited
+            directly. The run_intent of other modules, and the building of
+            modules, run on self.executor, which bounds how many commands
+            execute at once. Arguments and the return value are those of
+            route_command.
+        """
+        say = say or self.say
+        listen = listen or self.listen
+        intent, module = await self.find_intent_async(command, say)
+        if intent is None:
+            return None
+        loop = asyncio.get_running_loop()
+        if module is None:
+            module = await loop.run_in_executor(
+                self.executor, self.load_module, intent.module, say)
+            if module is None:
+                return None
+        errors, error_message = self.get_module_errors(intent.module)
+        try:
+            with span("module.run", module=intent.module, label=intent.label):
+                if hasattr(module, "run_intent_async"):
+                    await module.run_intent_async(intent.label, intent.args,
+                                                  say, listen)
+                else:
+                    await loop.run_in_executor(
+                        self.executor, module.run_intent, intent.label,
+                        intent.args, say, listen)
+        except errors:
+            say(error_message)
+        return intent.module
+
+    async def warm_modules_async(self, names=None):
+        """Builds modules concurrently on self.executor.
+
+            Args:
+                names: the names of the modules to build, defaults to every
+                    module
+        """
+        if names is None:
+            names = list(self.module_classes)
+        loop = asyncio.get_running_loop()
+        results = await asyncio.gather(
+            *[loop.run_in_executor(self.executor, self.get_module, name)
+              for name in names],
+            return_exceptions=True)
+        for name, result in zip(names, results):
+            if isinstance(result, Exception):
+                self.startup_failures[name] = result
 
     def say(self, text):
         """Says given text, either through printing it or using
             speech-to-text."""
-        if self.marvin_spoken:
-            self.speech_engine.say(text)
-            self.speech_engine.runAndWait()
-            print(text)
-        else:
+        with span("speech.say", spoken=self.marvin_spoken):
             print(text)
+            if self.marvin_spoken:
+                self.speech_queue.say(text)
+
+    def flush_speech(self):
+        """Waits until Marvin has finished saying everything it was asked to
+            say."""
+        if self.marvin_spoken:
+            self.speech_queue.flush()
+
+    def cancel_speech(self):
+        """Stops saying the current response, and drops the rest of what
+            Marvin was asked to say."""
+        if self.marvin_spoken:
+            self.speech_queue.cancel()
 
     def loop(self):
         """Generates a REPL for Marvin"""
         while True:
             try:
                 self.prompt()
-            except KeyboardInterrupt:
+            except (KeyboardInterrupt, EOFError):
                 self.say("Goodbye!")
+                self.flush_speech()
                 sys.exit()
+
+    async def read_command_async(self):
+        """Waits for the next command like read_command, without blocking
+            the event loop.
+
+            The command is read on a daemon thread rather than self.executor,
+            so a prompt left waiting when Marvin is interrupted neither
+            holds one of the executor's workers nor keeps the process from
+            exiting.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def resolve(command, error):
+            if future.done():
+                return
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(command)
+
+        def read():
+            try:
+                command = self.read_command()
+            except Exception as e:
+                loop.call_soon_threadsafe(resolve, None, e)
+            else:
+                loop.call_soon_threadsafe(resolve, command, None)
+        threading.Thread(target=read, name="marvin-read-command",
+                         daemon=True).start()
+        return await future
+
+    async def loop_async(self, warm_modules=False):
+        """Generates a REPL for Marvin on an asyncio event loop.
+
+            Waiting for the next command and executing commands happen off the
+            event loop, so background tasks keep running in the meantime.
+            Like loop, it says goodbye when the user interrupts it or the
+            input ends.
+
+            Args:
+                warm_modules: True if every module should be built
+                    concurrently in the background
+        """
+        if warm_modules:
+            asyncio.get_running_loop().create_task(self.warm_modules_async())
+        try:
+            while True:
+                try:
+                    command = await self.read_command_async()
+                except EOFError:
+                    break
+                if command is not None:
+                    await self.route_command_async(command)
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            # asyncio.run cancels this coroutine when the user interrupts it
+            pass
+        self.say("Goodbye!")
+        self.flush_speech()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Runs Marvin, an AI assistant, as a REPL.")
+    parser.add_argument("name",
+                        help="your name, which is signed on text messages")
+    parser.add_argument("--default-music", choices=["spotify"],
+                        help="the music module to use for music commands")
+    parser.add_argument("--user-spoken", action="store_true",
+                        help="listen to commands through the microphone")
+    parser.add_argument("--stt-backend", metavar="NAME",
+                        help="the speech to text backend to listen with: "
+                             "google, offline, replay or a dotted path")
+    parser.add_argument("--audio-source", metavar="SPEC",
+                        help="the audio to listen to instead of the "
+                             "microphone: wav:FILE, pipe:FILE, pipe:- or "
+                             "synthetic:SECONDS")
+    parser.add_argument("--marvin-spoken", action="store_true",
+                        help="respond using text to speech")
+    parser.add_argument("--linear-matching", action="store_true",
+                        help="match commands in time linear in their length")
+    parser.add_argument("--warm-modules", action="store_true",
+                        help="build every module in the background at startup")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="print how long each module took to build")
+    parser.add_argument("--asyncio", action="store_true",
+                        help="execute commands on an asyncio event loop")
+    parser.add_argument("--speculative", action="store_true",
+                        help="evaluate every module a command could be for "
+                             "at the same time")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="write a Chrome trace of where each command "
+                             "spends its time to FILE")
+    parser.add_argument("--cache", metavar="FILE",
+                        help="cache service responses in the SQLite database "
+                             "FILE")
+    args = parser.parse_args()
+    if args.trace:
+        TRACER.start(args.trace)
+    if args.cache:
+        RESPONSE_CACHE.open(args.cache)
+    marvin = Marvin(args.name,
+                    default_music=args.default_music,
+                    user_spoken=args.user_spoken,
+                    stt_backend=args.stt_backend,
+                    audio_source=args.audio_source,
+                    marvin_spoken=args.marvin_spoken,
+                    linear_matching=args.linear_matching,
+                    warm_modules=args.warm_modules,
+                    speculative=args.speculative)
+    if args.startup_report:
+        print(marvin.startup_report())
+        atexit.register(lambda: print(marvin.startup_report()))
+    if args.asyncio:
+        try:
+            asyncio.run(marvin.loop_async())
+        except KeyboardInterrupt:
+            # loop_async has said goodbye already
+            pass
+        sys.exit()
+    else:
+        marvin.loop()
+
+
+if __name__ == "__main__":
+    main()
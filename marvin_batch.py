@@ -0,0 +1,218 @@
+import sys
+import json
+import math
+import argparse
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from marvin import Marvin
+from modules.cache import RESPONSE_CACHE
+from modules.tracing import TRACER
+
+# The keys a JSONL record may hold its command and its identifier under
+COMMAND_KEYS = ("command", "text", "body")
+ID_KEYS = ("id", "request_id")
+
+BatchCommand = namedtuple("BatchCommand", ["id", "command", "replies"])
+
+BatchResult = namedtuple("BatchResult", ["id", "command", "module", "said",
+                                         "seconds", "error"])
+
+
+class NoReplyError(Exception):
+    """Raised when a module asks for more input than a batch command
+        provides."""
+
+
+def parse_line(line, index, form="auto"):
+    """Parses one line of a command file.
+
+        Args:
+            line: the line, either a plain text command or a JSON object
+            index: the line number, used as the id of commands without one
+            form: "text", "jsonl", or "auto" to treat lines starting with
+                "{" as JSON
+        Returns:
+            A BatchCommand, or None if the line is blank.
+    """
+    line = line.strip()
+    if not line:
+        return None
+    if form == "text" or (form == "auto" and not line.startswith("{")):
+        return BatchCommand(index, line.lower(), [])
+    record = json.loads(line)
+    command = next((record[key] for key in COMMAND_KEYS if key in record),
+                   None)
+    if command is None:
+        raise ValueError("Line {} has none of the keys {}".format(
+            index, ", ".join(COMMAND_KEYS)))
+    command_id = next((record[key] for key in ID_KEYS if key in record),
+                      index)
+    return BatchCommand(command_id, command.lower(),
+                        list(record.get("replies", [])))
+
+
+def read_commands(lines, form="auto"):
+    """Yields a BatchCommand for each non blank line."""
+    for index, line in enumerate(lines, 1):
+        command = parse_line(line, index, form)
+        if command is not None:
+            yield command
+
+
+def run_command(marvin, batch_command):
+    """Routes one command through marvin, capturing what it says.
+
+        Modules which ask for more input are answered with the command's
+        replies, in order.
+
+        Returns:
+            A BatchResult of the command.
+    """
+    said = []
+    replies = deque(batch_command.replies)
+
+    def listen():
+        if not replies:
+            raise NoReplyError("No reply left for {!r}".format(
+                batch_command.command))
+        return replies.popleft()
+
+    module = None
+    error = None
+    start = perf_counter()
+    try:
+        module = marvin.route_command(batch_command.command, said.append,
+                                      listen)
+    except Exception as e:
+        error = "{}: {}".format(type(e).__name__, e)
+    return BatchResult(batch_command.id, batch_command.command, module,
+                       [str(text) for text in said], perf_counter() - start,
+                       error)
+
+
+def run_batch(marvin, commands, workers=4):
+    """Runs commands through marvin on a pool of workers.
+
+        At most twice as many commands as there are workers are read ahead of
+        the results, so commands can be streamed from a large file or stdin.
+
+        Args:
+            marvin: the Marvin object which routes the commands
+            commands: an iterable of BatchCommand
+            workers: the number of commands run at the same time
+        Yields:
+            The BatchResult of each command, in the order of commands.
+    """
+    with ThreadPoolExecutor(max_workers=workers,
+                            thread_name_prefix="marvin-batch") as executor:
+        pending = deque()
+        for command in commands:
+            pending.append(executor.submit(run_command, marvin, command))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def percentile(sorted_values, fraction):
+    """Returns the nearest rank percentile of a sorted, non empty list."""
+    rank = max(int(math.ceil(fraction * len(sorted_values))) - 1, 0)
+    return sorted_values[rank]
+
+
+def report(results, seconds):
+    """Returns a table of the throughput of a batch, and the latency of the
+        commands executed by each module.
+
+        Args:
+            results: a list of BatchResult
+            seconds: the wall clock time the batch took
+    """
+    latencies = OrderedDict()
+    for result in results:
+        if result.error is not None:
+            name = "errors"
+        else:
+            name = result.module or "not understood"
+        latencies.setdefault(name, []).append(result.seconds)
+    lines = ["{} commands in {:.2f} s ({:.1f} commands/sec)".format(
+        len(results), seconds, len(results) / seconds if seconds else 0.0),
+        "{:<16}{:>8}{:>12}{:>12}{:>12}".format(
+            "module", "count", "p50 (ms)", "p95 (ms)", "p99 (ms)")]
+    for name, values in latencies.items():
+        values.sort()
+        lines.append("{:<16}{:>8}{:>12.2f}{:>12.2f}{:>12.2f}".format(
+            name, len(values), percentile(values, 0.50) * 1000,
+            percentile(values, 0.95) * 1000, percentile(values, 0.99) * 1000))
+    for module, stats in RESPONSE_CACHE.stats().items():
+        lines.append("cache {}: {} hits, {} misses".format(
+            module, stats["hits"], stats["misses"]))
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replays a file of commands through Marvin without "
+                    "prompting, and reports its throughput and latency.")
+    parser.add_argument("name",
+                        help="your name, which is signed on text messages")
+    parser.add_argument("commands", nargs="?", default="-",
+                        help="the file of commands, or - for stdin")
+    parser.add_argument("--format", choices=["auto", "text", "jsonl"],
+                        default="auto",
+                        help="whether lines are plain commands or JSON "
+                             "objects (auto treats lines starting with { as "
+                             "JSON)")
+    parser.add_argument("--output",
+                        help="write the result of each command to this file "
+                             "as JSONL (- for stdout)")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="the number of commands run at the same time")
+    parser.add_argument("--default-music", choices=["spotify"],
+                        help="the music module to use for music commands")
+    parser.add_argument("--linear-matching", action="store_true",
+                        help="match commands in time linear in their length")
+    parser.add_argument("--speculative", action="store_true",
+                        help="evaluate every module a command could be for "
+                             "at the same time")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="write a Chrome trace of where each command "
+                             "spends its time to FILE")
+    parser.add_argument("--cache", metavar="FILE",
+                        help="cache service responses in the SQLite database "
+                             "FILE")
+    args = parser.parse_args()
+    if args.trace:
+        TRACER.start(args.trace)
+    if args.cache:
+        RESPONSE_CACHE.open(args.cache)
+    marvin = Marvin(args.name,
+                    default_music=args.default_music,
+                    linear_matching=args.linear_matching,
+                    speculative=args.speculative)
+    if args.commands == "-":
+        lines = sys.stdin
+    else:
+        lines = open(args.commands)
+    output = None
+    if args.output == "-":
+        output = sys.stdout
+    elif args.output:
+        output = open(args.output, "w")
+    results = []
+    start = perf_counter()
+    with lines:
+        for result in run_batch(marvin, read_commands(lines, args.format),
+                                args.workers):
+            results.append(result)
+            if output is not None:
+                output.write(json.dumps(result._asdict()) + "\n")
+    seconds = perf_counter() - start
+    if output is not None and output is not sys.stdout:
+        output.close()
+    print(report(results, seconds), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
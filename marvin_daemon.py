@@ -0,0 +1,192 @@
+import json
+import asyncio
+import argparse
+import threading
+import concurrent.futures
+from marvin import Marvin
+from modules.cache import RESPONSE_CACHE
+from modules.tracing import TRACER
+
+
+class ListenTimeout(Exception):
+    """Raised in a module which asked a client for more input when the
+        client doesn't answer in time."""
+
+
+class MarvinDaemon:
+    """Serves many users from one long running Marvin over a Unix or TCP
+        socket.
+
+        Each connection is a session with its own state (see Marvin.session),
+        while the helper, module clients, caches and worker threads of the
+        Marvin are shared. Commands from different sessions run concurrently,
+        so a slow API call only holds up the session which made it.
+
+        The protocol is line based. Clients send one command per line, and
+        the daemon answers each with JSON lines:
+            {"say": text} for everything Marvin says,
+            {"listen": true} when a module asks the user for more input, which
+                the client answers with its next line,
+            {"done": label, "error": message} once the command is finished,
+                where label is that of the module which executed it (or
+                null) and error is null unless the command failed.
+
+        A module which listens holds one of the Marvin's workers until the
+        client answers, so a client which doesn't answer within
+        listen_timeout seconds fails its command with a ListenTimeout, and
+        idle clients can't stall every other session. A line sent after
+        that is read as the next command.
+
+        Attributes:
+            marvin: the Marvin shared by every session
+            sessions: a dictionary from session ids to the Marvin session of
+                each open connection
+            next_session_id: the id of the next session
+            loop: the event loop the daemon is serving on
+            listen_timeout: the seconds a client has to answer a module
+                which asked it for more input
+    """
+
+    def __init__(self, marvin, listen_timeout=60):
+        self.marvin = marvin
+        self.listen_timeout = listen_timeout
+        self.sessions = {}
+        self.next_session_id = 1
+        self.loop = None
+
+    async def start_unix(self, path):
+        """Starts serving on a Unix socket, and returns the server."""
+        self.loop = asyncio.get_running_loop()
+        return await asyncio.start_unix_server(self.handle, path=path)
+
+    async def start_tcp(self, host, port):
+        """Starts serving on a TCP socket, and returns the server."""
+        self.loop = asyncio.get_running_loop()
+        return await asyncio.start_server(self.handle, host, port)
+
+    def send(self, writer, message):
+        """Writes a message to a client. Safe to call from any thread, and
+            messages are written in the order they are sent."""
+        line = (json.dumps(message) + "\n").encode()
+        self.loop.call_soon_threadsafe(writer.write, line)
+
+    async def ask(self, reader, writer):
+        """Asks the client for more input and returns its next line."""
+        self.send(writer, {"listen": True})
+        line = await reader.readline()
+        if not line:
+            raise ConnectionError("Session closed while Marvin was listening")
+        return line.decode().strip()
+
+    async def handle(self, reader, writer):
+        """Serves the commands of one connection in its own session."""
+        session_id = self.next_session_id
+        self.next_session_id += 1
+        session = self.marvin.session()
+        self.sessions[session_id] = session
+        loop_thread = threading.current_thread()
+
+        def say(text):
+            self.send(writer, {"say": str(text)})
+
+        def listen():
+            # waiting for the loop on its own thread would deadlock it
+            if threading.current_thread() is loop_thread:
+                raise RuntimeError("Coroutine handlers cannot listen")
+            answer = asyncio.run_coroutine_threadsafe(
+                self.ask(reader, writer), self.loop)
+            try:
+                return answer.result(self.listen_timeout)
+            except concurrent.futures.TimeoutError:
+                answer.cancel()
+                raise ListenTimeout("No answer within {:g} seconds".format(
+                    self.listen_timeout))
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode().strip().lower()
+                if not command:
+                    continue
+                module = None
+                error = None
+                try:
+                    module = await session.route_command_async(
+                        command, say, listen)
+                except Exception as e:
+                    error = "{}: {}".format(type(e).__name__, e)
+                self.send(writer, {"done": module, "error": error})
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            del self.sessions[session_id]
+            writer.close()
+
+
+async def serve(daemon, args):
+    """Serves sessions on the socket given by args until cancelled."""
+    if args.tcp:
+        host, port = args.tcp.rsplit(":", 1)
+        server = await daemon.start_tcp(host, int(port))
+    else:
+        server = await daemon.start_unix(args.unix)
+    try:
+        await server.serve_forever()
+    finally:
+        server.close()
+        await server.wait_closed()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Runs Marvin as a daemon which serves many sessions over "
+                    "a Unix or TCP socket.")
+    parser.add_argument("name",
+                        help="the name signed on text messages")
+    parser.add_argument("--unix", default="/tmp/marvin.sock",
+                        help="the path of the Unix socket to serve on")
+    parser.add_argument("--tcp", metavar="HOST:PORT",
+                        help="serve on a TCP socket instead")
+    parser.add_argument("--workers", type=int,
+                        help="the number of threads running blocking module "
+                             "calls")
+    parser.add_argument("--listen-timeout", type=float, default=60,
+                        help="the seconds a client has to answer a question "
+                             "before its command fails")
+    parser.add_argument("--default-music", choices=["spotify"],
+                        help="the music module to use for music commands")
+    parser.add_argument("--linear-matching", action="store_true",
+                        help="match commands in time linear in their length")
+    parser.add_argument("--speculative", action="store_true",
+                        help="evaluate every module a command could be for "
+                             "at the same time")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="write a Chrome trace of where each command "
+                             "spends its time to FILE")
+    parser.add_argument("--cache", metavar="FILE",
+                        help="cache service responses in the SQLite database "
+                             "FILE")
+    parser.add_argument("--warm-modules", action="store_true",
+                        help="build every module in the background at startup")
+    args = parser.parse_args()
+    if args.trace:
+        TRACER.start(args.trace)
+    if args.cache:
+        RESPONSE_CACHE.open(args.cache)
+    marvin = Marvin(args.name,
+                    default_music=args.default_music,
+                    linear_matching=args.linear_matching,
+                    warm_modules=args.warm_modules,
+                    workers=args.workers,
+                    speculative=args.speculative)
+    try:
+        asyncio.run(serve(MarvinDaemon(marvin, args.listen_timeout), args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
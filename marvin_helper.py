@@ -1,10 +1,109 @@
-import re
+from collections import OrderedDict
+from marvin_intents import IntentDispatcher
+from modules.tracing import span
+from modules.spotify.spotify_helper import SpotifyHelper
+from modules.weather.weather_helper import WeatherHelper
+from modules.marvin_calendar.calendar_helper import CalendarHelper
+from modules.sms.sms_helper import SMSHelper
+from modules.stocks.stocks_helper import StocksHelper
+from modules.wiki.wiki_helper import WikiHelper
+from modules.sports.sports_helper import SportsHelper
+
+
+class KeywordAutomaton:
+    """An Aho-Corasick automaton which finds every label whose keywords occur
+        in a command using a single pass over the command.
+
+        Attributes:
+            labels: the list of labels, in priority order (the order in which
+                they were given)
+            transitions: a list, indexed by state, of dictionaries from
+                characters to the next state. Characters missing from a
+                dictionary lead back to the root state.
+            outputs: a list, indexed by state, of bitmasks of the labels
+                with a keyword ending at that state
+    """
+
+    def __init__(self, keywords_by_label):
+        self.labels = list(keywords_by_label)
+        self.transitions = [{}]
+        self.outputs = [0]
+        # build a trie of all the keywords
+        for priority, label in enumerate(self.labels):
+            for keyword in keywords_by_label[label]:
+                state = 0
+                for char in keyword:
+                    next_state = self.transitions[state].get(char)
+                    if next_state is None:
+                        next_state = len(self.transitions)
+                        self.transitions.append({})
+                        self.outputs.append(0)
+                        self.transitions[state][char] = next_state
+                    state = next_state
+                self.outputs[state] |= 1 << priority
+        self.compile()
+
+    def compile(self):
+        """Adds failure links to the trie, then folds them into the
+            transition table so that matching never has to follow them."""
+        fail = [0] * len(self.transitions)
+        queue = list(self.transitions[0].values())
+        for state in queue:
+            for char, next_state in self.transitions[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and char not in self.transitions[fallback]:
+                    fallback = fail[fallback]
+                fail[next_state] = self.transitions[fallback].get(char, 0)
+                if fail[next_state] == next_state:
+                    fail[next_state] = 0
+                self.outputs[next_state] |= self.outputs[fail[next_state]]
+        # states are visited in breadth first order, so the failure state of
+        # every state already has its full transition table
+        for state in queue:
+            inherited = dict(self.transitions[fail[state]])
+            inherited.update(self.transitions[state])
+            self.transitions[state] = inherited
+        self.all_labels = (1 << len(self.labels)) - 1
+
+    def find_labels(self, text):
+        """Returns the labels with a keyword in text, in priority order."""
+        transitions = self.transitions
+        outputs = self.outputs
+        state = 0
+        found = 0
+        for char in text:
+            state = transitions[state].get(char, 0)
+            if outputs[state]:
+                found |= outputs[state]
+                if found == self.all_labels:
+                    break
+        return [label for priority, label in enumerate(self.labels)
+                if found >> priority & 1]
 
 
 class Marvin_Helper:
-    """A helper class which classifies commands into categories for Marvin"""
+    """A helper class which classifies commands into categories for Marvin
+
+        Attributes:
+            command_keywords: a dictionary from labels to the keywords which
+                suggest a command has that label, in priority order
+            keyword_automaton: a KeywordAutomaton built from command_keywords
+                by compile_keywords, or None if the table has at most
+                SCAN_KEYWORDS keywords, which are scanned for one by one
+            module_helpers: an OrderedDict from labels to the helpers of the
+                modules which execute commands with that label, in the order
+                Marvin tries them
+            dispatcher: an IntentDispatcher built from module_helpers, which
+                matches with the given engine ("re", or "linear" for a
+                matching time linear in the length of the command)
+    """
+
+    # the most keywords for which scanning the command for each keyword in
+    # turn is faster than a pass of the KeywordAutomaton
+    SCAN_KEYWORDS = 40
 
-    def __init__(self):
+    def __init__(self, engine="re"):
         self.command_keywords = {
             "music": ["play", "pause", "spotify", "music", "skip", "next",
                       "song", "playing", "playlist", "previous", "volume",
@@ -16,13 +115,45 @@ class Marvin_Helper:
             "sports": ["score", "game", "record", ],
             "stocks": ["stock"],
         }
+        self.compile_keywords()
+        self.module_helpers = OrderedDict([
+            ("music", SpotifyHelper()),
+            ("weather", WeatherHelper()),
+            ("calendar", CalendarHelper()),
+            ("sms", SMSHelper()),
+            ("stocks", StocksHelper()),
+            ("wiki", WikiHelper()),
+            ("sports", SportsHelper()),
+        ])
+        self.dispatcher = IntentDispatcher(self.module_helpers, engine)
+
+    def compile_keywords(self):
+        """Builds the keyword_automaton of command_keywords, if it has more
+            keywords than are faster to scan for. Called again after
+            command_keywords changes."""
+        num_keywords = sum(len(keywords)
+                           for keywords in self.command_keywords.values())
+        self.keyword_automaton = None
+        if num_keywords > self.SCAN_KEYWORDS:
+            self.keyword_automaton = KeywordAutomaton(self.command_keywords)
 
     def classify_command(self, command):
         """Translates a command into a labels which describes what kind of
             command it could be (e.g. music or weather)"""
-        labels = []
-        for label in self.command_keywords:
-            for keyword in self.command_keywords[label]:
-                if keyword in command:
-                    labels.append(label)
-        return labels
+        with span("marvin.classify"):
+            if self.keyword_automaton is not None:
+                return self.keyword_automaton.find_labels(command)
+            labels = []
+            for label, keywords in self.command_keywords.items():
+                for keyword in keywords:
+                    if keyword in command:
+                        # each label is listed once, in priority order
+                        labels.append(label)
+                        break
+            return labels
+
+    def match_intent(self, command, labels):
+        """Finds the module, label and arguments of a command among the
+            modules whose labels the command was classified with."""
+        with span("marvin.parse", modules=",".join(labels)):
+            return self.dispatcher.match(command, labels)
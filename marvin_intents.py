@@ -0,0 +1,155 @@
+import re
+from collections import namedtuple
+from linear_re import LinearPattern, LinearMultiPattern
+
+
+Intent = namedtuple("Intent", ["module", "label", "args"])
+
+NO_INTENT = Intent(None, None, None)
+
+
+class IntentDispatcher:
+    """Compiles the intent tables of every module helper into one regular
+        expression, so that a single match finds the module, the label and
+        the arguments of a command.
+
+        Each regular expression of each intent table becomes one alternative
+        of the compiled expression, in priority order (modules in the order
+        they were given, then labels and regular expressions in the order of
+        their intent table). Since fullmatch tries alternatives in order, the
+        first alternative to match is the same one the module helpers would
+        have found by trying their regular expressions one by one.
+
+        With the "linear" engine, the intents are compiled by linear_re
+        instead of re, which bounds matching time by the length of the command
+        however the regular expressions would backtrack.
+
+        Attributes:
+            helpers: an ordered dictionary from module names to the
+                ModuleHelper objects which parse their commands, in priority
+                order
+            engine: "re" to match with Python's re module, or "linear" to
+                match with linear_re
+            intents: a list of (module, label, regexp) tuples, one for each
+                alternative of the compiled expression
+            intent_index: a dictionary from the names of the groups around
+                each alternative to the index of its intent
+            slot_groups: a list, indexed like intents, of (name, group name)
+                pairs for each named group of the intent's regexp
+            compiled: a dictionary from tuples of module names to the
+                compiled expression of those modules' intents. Alternatives
+                keep the priority order of helpers whatever the order of the
+                tuple.
+            linear_patterns: a list, indexed like intents, of the LinearPattern
+                of each intent's regexp when the engine is "linear"
+    """
+
+    def __init__(self, helpers, engine="re"):
+        if engine not in ("re", "linear"):
+            raise ValueError("Unknown matching engine {}".format(engine))
+        self.helpers = helpers
+        self.engine = engine
+        self.intents = []
+        for module, helper in helpers.items():
+            intent_table = helper.get_intents()
+            for label in intent_table:
+                for regexp in intent_table[label]:
+                    self.intents.append((module, label, regexp))
+        self.intent_index = {"_{}".format(index): index
+                             for index in range(len(self.intents))}
+        self.slot_groups = [
+            [(name, "_{}_{}".format(index, name)) for name in regexp.groupindex]
+            for index, (module, label, regexp) in enumerate(self.intents)]
+        self.compiled = {}
+        if engine == "linear":
+            # compile every pattern now so unsupported syntax fails early
+            self.linear_patterns = [LinearPattern(regexp.pattern)
+                                    for module, label, regexp in self.intents]
+
+    def compile(self, modules):
+        """Returns the compiled expression which matches the intents of the
+            given modules, building it the first time it is requested."""
+        key = tuple(modules)
+        compiled = self.compiled.get(key)
+        if compiled is None and self.engine == "linear":
+            compiled = LinearIntents(
+                [index for index, intent in enumerate(self.intents)
+                 if intent[0] in key],
+                self.linear_patterns)
+            self.compiled[key] = compiled
+        elif compiled is None:
+            alternatives = []
+            for index, (module, label, regexp) in enumerate(self.intents):
+                if module in key:
+                    # group names must be unique across the whole expression,
+                    # so prefix them with the index of their intent
+                    pattern = re.sub(r'\(\?P<(\w+)>',
+                                     r'(?P<_{}_\1>'.format(index),
+                                     regexp.pattern)
+                    alternatives.append("(?P<_{}>{})".format(index, pattern))
+            if not alternatives:
+                # an expression which never matches
+                alternatives.append("(?!)")
+            compiled = re.compile("|".join(alternatives))
+            self.compiled[key] = compiled
+        return compiled
+
+    def match(self, command, modules=None):
+        """Finds the intent of a command.
+
+            Args:
+                command: string, command entered by user
+                modules: the module names whose intents may match, defaults
+                    to every module
+
+            Returns:
+                an Intent tuple with the name of the module, the label and
+                the arguments of the command, or NO_INTENT if no intent
+                matches.
+        """
+        if modules is None:
+            modules = self.helpers
+        compiled = self.compiled.get(tuple(modules))
+        if compiled is None:
+            compiled = self.compile(modules)
+        if self.engine == "linear":
+            index, match = compiled.fullmatch(command)
+            if match is None:
+                return NO_INTENT
+            module, label, regexp = self.intents[index]
+            return Intent(module, label, self.helpers[module].get_args(
+                label, match.groupdict()))
+        match = compiled.fullmatch(command)
+        if match is None:
+            return NO_INTENT
+        # the outermost group closes last, so it names the intent
+        index = self.intent_index[match.lastgroup]
+        module, label, regexp = self.intents[index]
+        slots = {}
+        for name, group in self.slot_groups[index]:
+            slots[name] = match.group(group)
+        return Intent(module, label,
+                      self.helpers[module].get_args(label, slots))
+
+
+class LinearIntents:
+    """The intents of some modules compiled into one LinearMultiPattern.
+
+        Attributes:
+            indices: the indices in IntentDispatcher.intents of the intents
+                which were compiled, in priority order
+            pattern: the LinearMultiPattern of those intents
+    """
+
+    def __init__(self, indices, linear_patterns):
+        self.indices = indices
+        self.pattern = LinearMultiPattern(
+            [linear_patterns[index] for index in indices])
+
+    def fullmatch(self, command):
+        """Returns the index of the intent which fully matches command and
+            its LinearMatch, or (None, None)."""
+        position, match = self.pattern.fullmatch(command)
+        if position is None:
+            return None, None
+        return self.indices[position], match
@@ -0,0 +1,209 @@
+import pickle
+import sqlite3
+import threading
+from collections import Counter
+from functools import wraps
+from time import time
+
+# How many seconds the responses of each module stay fresh
+DEFAULT_TTLS = {
+    "weather": 10 * 60,
+    "stocks": 60,
+    "wiki": 24 * 60 * 60,
+    "sports": 60 * 60,
+}
+
+
+class ResponseCache:
+    """A cache of the responses of external services, shared by every module
+        and stored in SQLite so it survives restarts.
+
+        Each entry expires after the TTL of the module which stored it, and
+        once there are more than max_entries entries the least recently used
+        ones are evicted. Hits don't write to the database: the times entries
+        were last used are kept in memory, and written with the next put (before
+        it evicts anything) or when the cache is closed. The cache is disabled
+        (and cached functions call straight through) until it is opened.
+
+        Attributes:
+            ttls: a dictionary from module names to the number of seconds
+                their responses are kept; modules without a TTL aren't cached
+            max_entries: the number of entries kept
+            path: the SQLite database of the cache, or ":memory:"
+            connection: the sqlite3 connection to path, or None while the
+                cache is disabled
+            lock: a lock guarding connection (which is shared by threads)
+                and used
+            used: a dictionary from the keys of entries hit since they were
+                last written to the times they were hit
+            hits: a Counter of the lookups answered by each module's entries
+            misses: a Counter of the lookups of each module which had to call
+                the service
+    """
+
+    def __init__(self, ttls=None, max_entries=4096):
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.max_entries = max_entries
+        self.path = None
+        self.connection = None
+        self.lock = threading.Lock()
+        self.used = {}
+        self.hits = Counter()
+        self.misses = Counter()
+
+    @property
+    def enabled(self):
+        with self.lock:
+            return self.connection is not None
+
+    def open(self, path=":memory:"):
+        """Enables the cache, storing entries in the SQLite database at
+            path."""
+        with self.lock:
+            self.path = path
+            self.connection = sqlite3.connect(path, check_same_thread=False)
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, module TEXT, value BLOB, "
+                "expires REAL, used REAL)")
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS entries_used ON entries (used)")
+            self.connection.commit()
+
+    def close(self):
+        """Disables the cache, keeping its entries on disk."""
+        with self.lock:
+            if self.connection is not None:
+                self.write_used()
+                self.connection.commit()
+                self.connection.close()
+                self.connection = None
+
+    def get(self, module, key):
+        """Looks up a response. An entry which can't be unpickled (because
+            it is corrupt, or a class it holds has changed since it was
+            stored) is deleted and counted as a miss.
+
+            Returns:
+                (True, response) if a fresh response is cached for key, and
+                (False, None) otherwise, or if the cache is disabled.
+        """
+        now = time()
+        with self.lock:
+            if self.connection is None:
+                return False, None
+            row = self.connection.execute(
+                "SELECT value, expires FROM entries WHERE key = ?",
+                (key,)).fetchone()
+            if row is None or row[1] < now:
+                if row is not None:
+                    self.connection.execute(
+                        "DELETE FROM entries WHERE key = ?", (key,))
+                    self.connection.commit()
+                self.misses[module] += 1
+                return False, None
+            self.used[key] = now
+            self.hits[module] += 1
+        try:
+            return True, pickle.loads(row[0])
+        except Exception:
+            pass
+        with self.lock:
+            self.used.pop(key, None)
+            self.hits[module] -= 1
+            self.misses[module] += 1
+            if self.connection is not None:
+                self.connection.execute(
+                    "DELETE FROM entries WHERE key = ?", (key,))
+                self.connection.commit()
+        return False, None
+
+    def put(self, module, key, response):
+        """Caches a response for the TTL of module. Responses which can't be
+            pickled aren't cached, and nothing is cached while the cache is
+            disabled."""
+        ttl = self.ttls.get(module)
+        if not ttl:
+            return
+        try:
+            value = pickle.dumps(response)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return
+        now = time()
+        with self.lock:
+            if self.connection is None:
+                return
+            self.used.pop(key, None)
+            self.write_used()
+            self.connection.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                (key, module, value, now + ttl, now))
+            excess = self.connection.execute(
+                "SELECT COUNT(*) FROM entries").fetchone()[0] - self.max_entries
+            if excess > 0:
+                self.connection.execute(
+                    "DELETE FROM entries WHERE key IN (SELECT key FROM "
+                    "entries ORDER BY used LIMIT ?)", (excess,))
+            self.connection.commit()
+
+    def write_used(self):
+        """Writes the times entries were hit since the last write, without
+            committing them. The caller holds the lock."""
+        if self.used:
+            self.connection.executemany(
+                "UPDATE entries SET used = ? WHERE key = ?",
+                [(used, key) for key, used in self.used.items()])
+            self.used.clear()
+
+    def clear(self, module=None):
+        """Removes every entry, or only the entries of module."""
+        with self.lock:
+            self.write_used()
+            if module is None:
+                self.connection.execute("DELETE FROM entries")
+            else:
+                self.connection.execute(
+                    "DELETE FROM entries WHERE module = ?", (module,))
+            self.connection.commit()
+
+    def stats(self):
+        """Returns a dictionary from module names to their number of hits
+            and misses."""
+        return {module: {"hits": self.hits[module],
+                         "misses": self.misses[module]}
+                for module in sorted(set(self.hits) | set(self.misses))}
+
+
+# The cache shared by every module
+RESPONSE_CACHE = ResponseCache()
+
+
+def cached(module, state=()):
+    """Returns a decorator which caches the responses of a fetch method in
+        RESPONSE_CACHE for the TTL of module.
+
+        Args:
+            module: the name of the module whose TTL the responses are kept
+                for
+            state: the names of the attributes of self which the response
+                depends on (like the current location of Weather), which are
+                part of the key along with the method and its arguments
+    """
+    def decorate(method):
+        name = "{}.{}".format(module, method.__qualname__)
+
+        @wraps(method)
+        def wrapped(self, *args, **kwargs):
+            if (not RESPONSE_CACHE.enabled
+                    or not RESPONSE_CACHE.ttls.get(module)):
+                return method(self, *args, **kwargs)
+            key = "{}{!r}{!r}{!r}".format(
+                name, args, sorted(kwargs.items()),
+                [getattr(self, attribute) for attribute in state])
+            found, response = RESPONSE_CACHE.get(module, key)
+            if not found:
+                response = method(self, *args, **kwargs)
+                RESPONSE_CACHE.put(module, key, response)
+            return response
+        return wrapped
+    return decorate
@@ -23,6 +23,9 @@ events)[A-Z|a-z| |\']*today\??'), ],
 schedule|events)[A-Z|a-z| |\']*(this|next) week\??'), ],
         }
 
+    def get_intents(self):
+        return self.calendar_re
+
     def parse_command(self, command):
         """Transforms a command into a label.
 
@@ -33,11 +36,7 @@ schedule|events)[A-Z|a-z| |\']*(this|next) week\??'), ],
                 the label of the first regular expression in
                 self.calendar_re which matches command, then None
         """
-        for label in self.calendar_re:
-            for regexp in self.calendar_re[label]:
-                if regexp.fullmatch(command):
-                    return label, None
-        return None, None
+        return self.parse_intent(command)
 
     def get_non_military_time(self, time_string):
         """Removes dates and military time from strings returned by the Google
@@ -5,6 +5,7 @@ from googleapiclient import discovery
 from httplib2 import Http
 from oauth2client import file, client, tools
 from .calendar_helper import CalendarHelper
+from modules.tracing import traced
 
 
 class Calendar:
@@ -39,6 +40,7 @@ class Calendar:
                                   http=creds.authorize(Http()))
         return service
 
+    @traced("api.google_calendar")
     def get_today_events(self):
         """Returns a list of the events on the current day."""
         today = datetime.utcnow().date()
@@ -58,6 +60,7 @@ class Calendar:
         events = events_result.get('items', [])
         return events
 
+    @traced("api.google_calendar")
     def get_tomorrow_events(self):
         """Returns a list of the events on the day after the current day."""
         today = datetime.utcnow().date()
@@ -77,6 +80,7 @@ class Calendar:
         events = events_result.get('items', [])
         return events
 
+    @traced("api.google_calendar")
     def get_this_week_events(self):
         """Returns a list of the events on the week containing the current
             day."""
@@ -113,6 +117,22 @@ class Calendar:
                     false if the command was invalid.
         """
         label, args = self.helper.parse_command(command)
+        return self.run_intent(label, args, say, listen)
+
+    def run_intent(self, label, args, say, listen):
+        """Executes a command which has already been parsed by self.helper.
+
+            Args:
+                label: the label of the command
+                args: unused, calendar commands have no arguments
+                say: A function which will say (either through text to speech
+                    or printing) a string in the main speaker loop
+                listen: A function which will listen and record user input
+                    through either speech to text or through the CLI
+            Returns:
+                True if a command was executed (or failed while executed) and
+                    false if the label was invalid.
+        """
         # list today's events
         if label == "today events":
             events = self.get_today_events()
@@ -1,3 +1,6 @@
+from modules.tracing import span
+
+
 class ModuleHelper:
     """A base class for each of the submodule helpers which turn commands
         into translated lables.
@@ -53,6 +56,40 @@ class ModuleHelper:
             12: "December",
         }
 
+    def get_intents(self):
+        """Returns the intent table of this helper: an ordered dictionary from
+            string labels to lists of compiled regular expressions, whose named
+            groups capture the arguments of the command."""
+        return {}
+
+    def get_args(self, label, slots):
+        """Converts the named groups captured for a label into the arguments
+            expected by the corresponding module.
+
+            Args:
+                label: the label of the regular expression which matched
+                slots: a dictionary of the named groups of the match
+        """
+        return None
+
+    def parse_intent(self, command):
+        """Finds the first regular expression in the intent table which fully
+            matches command.
+
+            Returns:
+                the label of that regular expression and the arguments
+                captured by its named groups, or (None, None) if no regular
+                expression matches.
+        """
+        with span("helper.parse", helper=type(self).__name__):
+            intents = self.get_intents()
+            for label in intents:
+                for regexp in intents[label]:
+                    match = regexp.fullmatch(command)
+                    if match:
+                        return label, self.get_args(label, match.groupdict())
+            return None, None
+
     def init_number_dict(self):
         """Creates a dictionary from strings of numbers to the corresponding
             ints."""
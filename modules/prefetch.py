@@ -0,0 +1,54 @@
+import threading
+from time import monotonic
+
+
+class PrefetchMemo:
+    """Data fetched by a module for a command it might execute soon.
+
+        When Marvin evaluates a command speculatively, every module which could
+        execute it may fetch its data, but only one module executes the
+        command. The data fetched for a command which wasn't executed stays
+        in the memo, and is used by a later command with the same key (such
+        as the price of the same stock) if that command comes within max_age
+        seconds of the fetch, so data can be up to max_age seconds old when
+        it is used. Older entries are dropped.
+
+        Attributes:
+            max_age: the number of seconds an entry can be used for
+            entries: a dictionary from keys to (time fetched, data) pairs
+            lock: a lock guarding entries, since prefetching happens on
+                Marvin's worker threads
+    """
+
+    def __init__(self, max_age=30):
+        self.max_age = max_age
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def __getstate__(self):
+        # locks can't be copied or pickled, so copies get a lock of their own
+        state = dict(vars(self))
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state):
+        vars(self).update(state)
+        self.lock = threading.Lock()
+
+    def put(self, key, data):
+        """Stores data fetched for key, and drops any expired entries."""
+        now = monotonic()
+        with self.lock:
+            for expired in [k for k, (fetched, _) in self.entries.items()
+                            if now - fetched > self.max_age]:
+                del self.entries[expired]
+            self.entries[key] = (now, data)
+
+    def pop(self, key):
+        """Removes and returns the data fetched for key, or None if none was
+            fetched in the last max_age seconds."""
+        with self.lock:
+            entry = self.entries.pop(key, None)
+        if entry is None or monotonic() - entry[0] > self.max_age:
+            return None
+        return entry[1]
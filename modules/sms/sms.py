@@ -1,4 +1,5 @@
 from .sms_helper import SMSHelper
+from modules.tracing import span
 from twilio.rest import Client
 from twilio.base.exceptions import TwilioException
 import os
@@ -81,11 +82,12 @@ class SMS:
             message = listen()
         message = "{}\n{}".format(message, self.sms_suffix)
         try:
-            self.client.messages.create(
-                body=message,
-                from_=self.twilio_number,
-                to=number_string
-            )
+            with span("api.twilio"):
+                self.client.messages.create(
+                    body=message,
+                    from_=self.twilio_number,
+                    to=number_string
+                )
             say("Message successfully sent")
         except TwilioException:
             say("Failure while sending message")
@@ -106,6 +108,22 @@ class SMS:
                     false if the command was invalid.
         """
         label = self.helper.parse_command(command)
+        return self.run_intent(label, None, say, listen)
+
+    def run_intent(self, label, args, say, listen):
+        """Executes a command which has already been parsed by self.helper.
+
+            Args:
+                label: the label of the command
+                args: unused, SMS commands have no arguments
+                say: A function which will say (either through text to speech
+                    or printing) a string in the main speaker loop
+                listen: A function which will listen and record user input
+                    through either speech to text or through the CLI
+            Returns:
+                True if a command was executed (or failed while executed) and
+                    false if the label was invalid.
+        """
         if label == "send":
             self.send_message(say, listen)
         else:
@@ -11,6 +11,9 @@ class SMSHelper(ModuleHelper):
 [A-Z|a-z|\'| ]*"), ],
         }
 
+    def get_intents(self):
+        return self.sms_re
+
     def parse_command(self, command):
         """Transforms a command into a label.
 
@@ -21,8 +24,5 @@ class SMSHelper(ModuleHelper):
                 the label of the first regular expression in
                 self.sms_re which matches command
         """
-        for label in self.sms_re:
-            for regexp in self.sms_re[label]:
-                if regexp.fullmatch(command):
-                    return label
-        return None
+        label, args = self.parse_intent(command)
+        return label
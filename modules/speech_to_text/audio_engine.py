@@ -0,0 +1,206 @@
+import threading
+from array import array
+from modules.text_to_speech.phrase_cache import read_clip
+
+
+class AudioReader:
+    """A cursor into the audio captured by an AudioEngine, which reads like a
+        pyaudio input stream.
+
+        Readers never miss audio captured between two reads, so a command
+        recorded right after the wake word starts exactly where the wake word
+        detector stopped reading.
+
+        Attributes:
+            engine: the AudioEngine whose audio is read
+            position: the number of samples captured before the next one read
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.position = engine.captured
+
+    def read(self, frames, exception_on_overflow=False):
+        """Blocks until frames samples after position have been captured,
+            and returns them as bytes of native 16 bit samples."""
+        samples = self.engine.read(self, frames)
+        return samples.tobytes()
+
+    def get_read_available(self):
+        """Returns the number of captured samples which haven't been read."""
+        return self.engine.captured - self.position
+
+    def skip(self):
+        """Drops the audio captured so far, so the next read starts with
+            audio captured after this call."""
+        self.position = self.engine.captured
+
+
+class AudioOutput:
+    """The speakers, playing short clips on output streams which stay open.
+
+        pyaudio is only opened to play the first clip, so the engine owning
+        an AudioOutput runs headless until something is played.
+
+        Attributes:
+            streams: a dictionary from the audio formats of clips to the
+                pyaudio output stream playing them
+            lock: a lock serializing playback
+            player: the pyaudio.PyAudio object playing clips, once one has
+                been played
+    """
+
+    def __init__(self):
+        self.streams = {}
+        self.lock = threading.Lock()
+        self.player = None
+
+    def play(self, clip):
+        """Plays a Clip, returning once it has been played."""
+        audio_format = (clip.channels, clip.sample_width, clip.rate)
+        with self.lock:
+            if self.player is None:
+                import pyaudio
+                self.player = pyaudio.PyAudio()
+            stream = self.streams.get(audio_format)
+            if stream is None:
+                stream = self.player.open(
+                    format=self.player.get_format_from_width(
+                        clip.sample_width),
+                    channels=clip.channels, rate=clip.rate, output=True)
+                self.streams[audio_format] = stream
+            elif stream.is_stopped():
+                stream.start_stream()
+            stream.write(clip.frames)
+            # write returns once the frames are buffered, and stopping the
+            # stream waits until they have been played
+            stream.stop_stream()
+
+    def close(self):
+        """Closes every stream."""
+        with self.lock:
+            for stream in self.streams.values():
+                stream.close()
+            self.streams = {}
+            if self.player is not None:
+                self.player.terminate()
+                self.player = None
+
+
+class AudioEngine:
+    """The microphone (or another AudioSource) and speakers, opened once for
+        as long as Marvin runs.
+
+        A capture thread reads the source continuously into a preallocated
+        ring of samples, which AudioReaders read from, so recording starts
+        without opening a stream and no audio is lost between recordings.
+        Short clips such as the notification sound (and Marvin's cached
+        phrases, see PhraseCache) are played through the engine's
+        AudioOutput, so one pyaudio object owns the audio device.
+
+        Attributes:
+            source: the AudioSource captured
+            rate: the sampling rate of the source
+            chunk_size: the number of samples read from the source at once
+            sample_width: the number of bytes in a sample
+            samples: the ring of the last buffer_seconds of captured samples
+            captured: the number of samples captured since the engine started
+            overruns: the number of reads which fell more than the whole ring
+                behind the microphone, and lost the oldest audio
+            condition: a Condition guarding captured, notified whenever a
+                chunk is captured
+            clips: a dictionary from names to the Clips loaded for playback
+            output: the AudioOutput playing clips
+            capture_thread: the thread reading source into samples
+            running: False once the engine has been closed, or the source
+                has run out
+    """
+
+    def __init__(self, source, chunk_size, buffer_seconds=10):
+        self.source = source
+        self.rate = source.rate
+        self.chunk_size = chunk_size
+        self.sample_width = 2
+        self.samples = array('h', bytes(2 * int(buffer_seconds * self.rate)))
+        self.captured = 0
+        self.overruns = 0
+        self.condition = threading.Condition()
+        self.clips = {}
+        self.output = AudioOutput()
+        self.running = True
+        self.capture_thread = threading.Thread(
+            target=self.capture, name="marvin-capture", daemon=True)
+        self.capture_thread.start()
+
+    def capture(self):
+        """Reads the source into samples until the engine is closed or the
+            source runs out."""
+        size = len(self.samples)
+        try:
+            while self.running:
+                chunk = array('h', self.source.read(
+                    self.chunk_size, exception_on_overflow=False))
+                if not chunk:
+                    break
+                start = self.captured % size
+                end = start + len(chunk)
+                if end <= size:
+                    self.samples[start:end] = chunk
+                else:
+                    split = size - start
+                    self.samples[start:] = chunk[:split]
+                    self.samples[:end - size] = chunk[split:]
+                with self.condition:
+                    self.captured += len(chunk)
+                    self.condition.notify_all()
+        finally:
+            # wake up the readers if the source ran out or failed
+            with self.condition:
+                self.running = False
+                self.condition.notify_all()
+
+    def reader(self):
+        """Returns an AudioReader starting with the next captured sample."""
+        return AudioReader(self)
+
+    def read(self, reader, frames):
+        """Blocks until frames samples after the position of reader have been
+            captured, then returns them and advances reader past them."""
+        size = len(self.samples)
+        with self.condition:
+            self.condition.wait_for(
+                lambda: self.captured >= reader.position + frames
+                or not self.running)
+            # the capture thread writes the next chunk over the oldest one
+            # without holding the lock, so that chunk can't be read
+            kept = size - self.chunk_size
+            if self.captured - reader.position > kept:
+                self.overruns += 1
+                reader.position = self.captured - kept
+            frames = min(frames, self.captured - reader.position)
+            start = reader.position % size
+            end = start + frames
+            if end <= size:
+                samples = self.samples[start:end]
+            else:
+                samples = self.samples[start:] + self.samples[:end - size]
+            reader.position += frames
+        return samples
+
+    def load(self, name, path):
+        """Loads the WAV file at path to be played as name."""
+        self.clips[name] = read_clip(path)
+
+    def play(self, name):
+        """Plays the clip loaded as name, returning once it has been
+            played."""
+        self.output.play(self.clips[name])
+
+    def close(self):
+        """Stops capturing, and closes every stream."""
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        self.capture_thread.join()
+        self.source.close()
+        self.output.close()
@@ -0,0 +1,334 @@
+import io
+import os
+import json
+import hashlib
+import importlib
+import threading
+from modules.tracing import span
+from . import dsp
+
+# The speech to text backends, by the name they are configured with
+BACKENDS = {
+    "google": "modules.speech_to_text.backends.GoogleBackend",
+    "offline": "modules.speech_to_text.backends.OfflineBackend",
+    "replay": "modules.speech_to_text.backends.ReplayBackend",
+}
+
+# The encodings the google backend can stream audio in, by the name they are
+# configured with: the RecognitionConfig encoding of each, and the soundfile
+# format and subtype compressing to it (or None to send the raw samples)
+ENCODINGS = {
+    "linear16": ("LINEAR16", None),
+    "flac": ("FLAC", ("FLAC", "PCM_16")),
+    "ogg_opus": ("OGG_OPUS", ("OGG", "OPUS")),
+}
+
+
+def load_backend(name):
+    """Returns the SpeechBackend class called name in BACKENDS, or at the
+        dotted path name."""
+    module_path, class_name = BACKENDS.get(name, name).rsplit(".", 1)
+    return getattr(importlib.import_module(module_path), class_name)
+
+
+class SpeechBackend:
+    """A speech recognizer, which transcribes a command while it is read from
+        a stream of 16 bit little endian audio.
+
+        Attributes:
+            rate: the sampling rate of the audio
+            chunk_size: the number of samples read from the stream at once
+            max_chunks: the number of chunks after which reading stops even
+                if the utterance hasn't ended
+    """
+
+    def __init__(self, rate, chunk_size, max_seconds=15):
+        self.rate = rate
+        self.chunk_size = chunk_size
+        self.max_chunks = int(max_seconds * rate / chunk_size)
+
+    def chunks(self, stream, vad=None):
+        """Yields the chunks read from stream until vad (a
+            VoiceActivityDetector, or None) hears the end of the utterance or
+            the stream runs out."""
+        if vad is not None:
+            vad.reset()
+        for _ in range(self.max_chunks):
+            chunk = stream.read(self.chunk_size, exception_on_overflow=False)
+            if not chunk:
+                return
+            yield chunk
+            if vad is not None and vad.update(dsp.as_samples(chunk)):
+                return
+
+    def transcribe(self, stream, vad=None, on_interim=None, cancelled=None):
+        """Transcribes the utterance read from stream.
+
+            Args:
+                stream: an AudioSource, AudioReader or pyaudio input stream
+                vad: a VoiceActivityDetector ending the utterance, or None to
+                    read until the stream runs out
+                on_interim: an optional function called with each interim
+                    transcript
+                cancelled: an optional threading.Event, set (before the
+                    stream ends) once the transcript isn't needed
+
+            Returns:
+                The transcript, or None if nothing was recognized or the
+                transcript was cancelled.
+        """
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class StreamEncoder:
+    """Compresses a stream of chunks of 16 bit little endian audio with
+        soundfile, handing out the compressed bytes as soon as the codec
+        writes them.
+
+        FLAC is written a frame (4096 samples) at a time, and Ogg Opus a
+        page at a time. soundfile has no way to shorten libsndfile's Ogg
+        pages, which hold up to a second of Opus, so the upload of Opus lags
+        the microphone by up to a second; finish flushes the last page once
+        the vad hears the end of the command.
+
+        Attributes:
+            buffer: the BytesIO the compressed stream is written to
+            file: the soundfile.SoundFile writing to buffer
+            sent: the number of bytes of buffer handed out so far
+    """
+
+    def __init__(self, rate, audio_format, subtype):
+        import soundfile
+        self.buffer = io.BytesIO()
+        self.file = soundfile.SoundFile(self.buffer, 'w', rate, 1, subtype,
+                                        format=audio_format)
+        self.sent = 0
+
+    def take(self):
+        """Returns the bytes written since the last call."""
+        with self.buffer.getbuffer() as written:
+            data = bytes(written[self.sent:])
+        self.sent += len(data)
+        return data
+
+    def encode(self, chunk):
+        """Compresses chunk, and returns the bytes it completed (often
+            none)."""
+        self.file.buffer_write(dsp.frames(dsp.as_samples(chunk)),
+                               dtype='int16')
+        return self.take()
+
+    def finish(self):
+        """Ends the stream, and returns the bytes the codec held back.
+
+            Closing the file also rewrites the header at the start of the
+            stream with its length, but that has been sent already and
+            stream decoders don't need it.
+        """
+        self.file.close()
+        return self.take()
+
+    def close(self):
+        self.file.close()
+
+
+class GoogleBackend(SpeechBackend):
+    """Transcribes a command while it is being said, by streaming it to
+        Google's speech to text API chunk by chunk.
+
+        The recognizer is asked for interim results and for the end of the
+        utterance. Once it (or the vad) says the user has stopped speaking, no
+        more audio is sent and the final transcript arrives a round trip
+        later, instead of after the whole recording has been uploaded.
+
+        On slow uplinks the audio can be compressed on the way, as FLAC
+        (lossless, about two thirds of the bytes) or Ogg Opus (lossy, about
+        an eighth), by choosing an encoding in ENCODINGS.
+
+        Attributes:
+            speech: the google.cloud.speech module
+            client: the speech.SpeechClient the audio is streamed to, connected
+                to endpoint (such as a local stand-in) if there is one
+            encoding: the name of the encoding in ENCODINGS the audio is
+                sent in, from the SPEECH_TO_TEXT_ENCODING environment
+                variable by default
+            codec: the soundfile format and subtype of encoding, or None
+            streaming_config: the StreamingRecognitionConfig of every stream
+    """
+
+    def __init__(self, rate, chunk_size, endpoint=None, language='en-US',
+                 encoding=None, max_seconds=15):
+        super().__init__(rate, chunk_size, max_seconds)
+        from google.cloud import speech
+        self.speech = speech
+        self.encoding = (encoding or os.environ.get('SPEECH_TO_TEXT_ENCODING')
+                         or "linear16").lower()
+        config_encoding, self.codec = ENCODINGS[self.encoding]
+        endpoint = endpoint or os.environ.get('SPEECH_TO_TEXT_ENDPOINT')
+        if endpoint:
+            import grpc
+            self.client = speech.SpeechClient(
+                channel=grpc.insecure_channel(endpoint))
+        else:
+            self.client = speech.SpeechClient()
+        self.streaming_config = speech.types.StreamingRecognitionConfig(
+            config=speech.types.RecognitionConfig(
+                encoding=config_encoding,
+                language_code=language,
+                sample_rate_hertz=rate,
+            ),
+            interim_results=True,
+            single_utterance=True,
+        )
+
+    def encoder(self):
+        """Returns a StreamEncoder for the audio of a stream, or None if it
+            is sent uncompressed."""
+        if self.codec is None:
+            return None
+        return StreamEncoder(self.rate, *self.codec)
+
+    def requests(self, stream, vad, done):
+        """Yields a request for each chunk until done is set."""
+        encoder = self.encoder()
+        try:
+            for chunk in self.chunks(stream, vad):
+                if encoder is not None:
+                    chunk = encoder.encode(chunk)
+                if chunk:
+                    yield self.speech.types.StreamingRecognizeRequest(
+                        audio_content=chunk)
+                if done.is_set():
+                    return
+            if encoder is not None:
+                yield self.speech.types.StreamingRecognizeRequest(
+                    audio_content=encoder.finish())
+        finally:
+            if encoder is not None:
+                encoder.close()
+
+    def transcribe(self, stream, vad=None, on_interim=None, cancelled=None):
+        end_of_utterance = (self.speech.enums.StreamingRecognizeResponse
+                            .SpeechEventType.END_OF_SINGLE_UTTERANCE)
+        done = threading.Event()
+        # the call, once its first response has arrived
+        call = []
+
+        def requests():
+            yield from self.requests(stream, vad, done)
+            if cancelled is not None and cancelled.is_set() and call:
+                # don't wait a round trip for a transcript nobody reads
+                call[0].cancel()
+
+        try:
+            with span("api.google_speech_stream"):
+                responses = self.client.streaming_recognize(
+                    self.streaming_config, requests())
+                call.append(responses)
+                for response in responses:
+                    if cancelled is not None and cancelled.is_set():
+                        responses.cancel()
+                        return None
+                    if response.speech_event_type == end_of_utterance:
+                        # half-close the stream, and wait for the final result
+                        done.set()
+                    for result in response.results:
+                        if not result.alternatives:
+                            continue
+                        transcript = result.alternatives[0].transcript
+                        if result.is_final:
+                            return transcript
+                        if on_interim is not None:
+                            on_interim(transcript)
+        except Exception:
+            # cancelling the call fails the responses
+            if cancelled is not None and cancelled.is_set():
+                return None
+            raise
+        finally:
+            done.set()
+        return None
+
+
+class OfflineBackend(SpeechBackend):
+    """Transcribes commands on this machine with a Vosk (Kaldi) model, which
+        needs no network access.
+
+        Attributes:
+            model: the vosk.Model, loaded from model_path, the
+                VOSK_MODEL_PATH environment variable, or the vosk-model
+                directory next to this file
+            recognizer_class: vosk.KaldiRecognizer
+    """
+
+    def __init__(self, rate, chunk_size, model_path=None, max_seconds=15):
+        super().__init__(rate, chunk_size, max_seconds)
+        import vosk
+        model_path = (model_path or os.environ.get('VOSK_MODEL_PATH')
+                      or os.path.join(os.path.dirname(__file__),
+                                      "vosk-model"))
+        self.model = vosk.Model(model_path)
+        self.recognizer_class = vosk.KaldiRecognizer
+
+    def transcribe(self, stream, vad=None, on_interim=None, cancelled=None):
+        recognizer = self.recognizer_class(self.model, self.rate)
+        segments = []
+        with span("stt.offline"):
+            for chunk in self.chunks(stream, vad):
+                if recognizer.AcceptWaveform(chunk):
+                    # Kaldi found a pause, and finalized the words before it
+                    segments.append(json.loads(recognizer.Result())["text"])
+                elif on_interim is not None:
+                    partial = json.loads(recognizer.PartialResult())["partial"]
+                    if partial:
+                        on_interim(" ".join(segments + [partial]))
+            if cancelled is not None and cancelled.is_set():
+                return None
+            segments.append(json.loads(recognizer.FinalResult())["text"])
+        return " ".join(segment for segment in segments if segment) or None
+
+
+class ReplayBackend(SpeechBackend):
+    """Answers with the transcripts recorded for the same audio, for
+        benchmarks and tests which need neither a network nor a model.
+
+        Attributes:
+            path: the JSON file of the transcripts, from the
+                SPEECH_TO_TEXT_REPLAY environment variable by default
+            transcripts: a dictionary from the key of the audio of each
+                recorded utterance to its transcript
+    """
+
+    def __init__(self, rate, chunk_size, path=None, max_seconds=15):
+        super().__init__(rate, chunk_size, max_seconds)
+        self.path = path or os.environ.get('SPEECH_TO_TEXT_REPLAY')
+        self.transcripts = {}
+        if self.path and os.path.exists(self.path):
+            with open(self.path) as replay_file:
+                self.transcripts = json.load(replay_file)
+
+    def key(self, stream, vad=None):
+        """Reads an utterance from stream, and returns the key of its
+            audio."""
+        digest = hashlib.sha1()
+        for chunk in self.chunks(stream, vad):
+            digest.update(chunk)
+        return digest.hexdigest()
+
+    def record(self, key, transcript):
+        """Stores the transcript of the audio of key, in memory and in
+            path."""
+        self.transcripts[key] = transcript
+        if self.path:
+            with open(self.path, "w") as replay_file:
+                json.dump(self.transcripts, replay_file, indent=1,
+                          sort_keys=True)
+
+    def transcribe(self, stream, vad=None, on_interim=None, cancelled=None):
+        key = self.key(stream, vad)
+        if cancelled is not None and cancelled.is_set():
+            return None
+        return self.transcripts.get(key)
@@ -0,0 +1,82 @@
+import numpy as np
+
+# The level recordings are normalized to
+MAXIMUM = 16384
+# The number of samples scaled at once by normalize, which bounds the memory
+# of its floating point intermediate
+BLOCK_SIZE = 1 << 16
+
+
+def as_samples(data):
+    """Returns a read only int16 view of data (bytes or an array('h') of 16 bit
+        little endian samples) without copying it."""
+    return np.frombuffer(data, dtype='<i2')
+
+
+def peak(samples):
+    """Returns the largest absolute value of samples."""
+    if not len(samples):
+        return 0
+    # -samples.min() would overflow int16 for -32768
+    return max(int(samples.max()), -int(samples.min()))
+
+
+def is_silent(samples, threshold):
+    """True if every sample is quieter than threshold, whatever its sign."""
+    return peak(samples) < threshold
+
+
+def rms(samples):
+    """Returns the root mean square level of samples."""
+    if not len(samples):
+        return 0.0
+    return float(np.sqrt(np.mean(np.square(samples, dtype=np.float64))))
+
+
+def zero_crossing_rate(samples):
+    """Returns the fraction of pairs of neighbouring samples whose signs
+        differ: around 0.5 for white noise, and much lower for voiced
+        speech."""
+    if len(samples) < 2:
+        return 0.0
+    negative = np.signbit(samples)
+    return float(np.count_nonzero(negative[1:] != negative[:-1])
+                 / (len(samples) - 1))
+
+
+def normalize(samples, maximum=MAXIMUM):
+    """Scales samples so that the loudest one is at maximum, truncating
+        towards zero like int()."""
+    times = float(maximum) / peak(samples)
+    normalized = np.empty(len(samples), dtype=np.int16)
+    scaled = np.empty(min(len(samples), BLOCK_SIZE))
+    for start in range(0, len(samples), BLOCK_SIZE):
+        block = samples[start:start + BLOCK_SIZE]
+        np.multiply(block, times, out=scaled[:len(block)])
+        normalized[start:start + len(block)] = scaled[:len(block)]
+    return normalized
+
+
+def trim(samples, threshold):
+    """Returns a view of samples without the quiet samples at either end."""
+    loud = (samples > threshold) | (samples < -threshold)
+    if not loud.any():
+        return samples[:0]
+    start = int(loud.argmax())
+    end = len(samples) - int(loud[::-1].argmax())
+    return samples[start:end]
+
+
+def add_silence(samples, seconds, rate):
+    """Returns samples with seconds of silence added at the start and end."""
+    padding = int(seconds * rate)
+    padded = np.zeros(len(samples) + 2 * padding, dtype=np.int16)
+    padded[padding:padding + len(samples)] = samples
+    return padded
+
+
+def frames(samples):
+    """Returns a buffer of the native 16 bit samples, which
+        wave.writeframes writes without copying (it swaps the bytes itself on
+        big endian machines)."""
+    return memoryview(np.ascontiguousarray(samples, dtype=np.int16))
@@ -0,0 +1,65 @@
+import tensorflow as tf
+from modules.tracing import span
+
+
+class WakeWordModel:
+    """The wake word graph, loaded once into a long lived session.
+
+        The graph decodes a single WAV file (a scalar string), so it can't
+        take a batch of windows directly. Instead it is imported batch_size
+        times, and one session run feeds each copy a window and fetches all
+        of their predictions, which TensorFlow computes in parallel.
+
+        Attributes:
+            labels: the labels of the graph's predictions
+            batch_size: the number of windows scored by one session run
+            graph: the tf.Graph holding batch_size copies of the model
+            inputs: the resolved input tensor of each copy
+            outputs: the resolved softmax tensor of each copy
+            session: the tf.Session running graph
+    """
+
+    def __init__(self, graph_path, labels, batch_size=4,
+                 input_name="wav_data:0", output_name="labels_softmax:0"):
+        self.labels = labels
+        self.batch_size = batch_size
+        with tf.gfile.FastGFile(graph_path, 'rb') as graph_file:
+            graph_def = tf.GraphDef()
+            graph_def.ParseFromString(graph_file.read())
+        self.graph = tf.Graph()
+        with self.graph.as_default():
+            for index in range(batch_size):
+                tf.import_graph_def(graph_def, name="window{}".format(index))
+        self.inputs = [
+            self.graph.get_tensor_by_name(
+                "window{}/{}".format(index, input_name))
+            for index in range(batch_size)]
+        self.outputs = [
+            self.graph.get_tensor_by_name(
+                "window{}/{}".format(index, output_name))
+            for index in range(batch_size)]
+        self.session = tf.Session(graph=self.graph)
+
+    def predict(self, wavs):
+        """Returns the predictions (an array of probabilities indexed like
+            labels) of each WAV file in wavs."""
+        predictions = []
+        for start in range(0, len(wavs), self.batch_size):
+            batch = wavs[start:start + self.batch_size]
+            with span("audio.wake_word_batch", windows=len(batch)):
+                results = self.session.run(
+                    self.outputs[:len(batch)],
+                    dict(zip(self.inputs, batch)))
+            # each copy returns a batch of one prediction
+            predictions.extend(result[0] for result in results)
+        return predictions
+
+    def top_scores(self, predictions, num_top_predictions):
+        """Returns a dictionary from the most likely labels of a prediction
+            to their probabilities."""
+        top_k = predictions.argsort()[-num_top_predictions:][::-1]
+        return {self.labels[node_id]: predictions[node_id]
+                for node_id in top_k}
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,213 @@
+import queue
+import itertools
+import threading
+from modules.tracing import span
+from . import dsp
+from .wake_word import encode_wav
+
+
+class TeedStream:
+    """The chunks of an utterance which a KeywordSpotter hands to a backend,
+        which transcribes them on its own thread as they are put: first the
+        chunks the spotter buffered while deciding, at once, then the rest
+        of the utterance as it is read.
+
+        Attributes:
+            chunks: a Queue of the chunks the backend hasn't read yet, where
+                None ends the utterance
+            cancelled: an Event set once the transcript isn't needed
+            on_interim: the function called with each interim transcript, or
+                None
+            transcript: the transcript, once thread has finished
+            error: the exception the backend raised, or None
+            thread: the thread the backend transcribes on
+    """
+
+    def __init__(self, backend, on_interim=None):
+        self.chunks = queue.Queue()
+        self.cancelled = threading.Event()
+        self.on_interim = on_interim
+        self.transcript = None
+        self.error = None
+        self.thread = threading.Thread(target=self.run, args=(backend,),
+                                       name="marvin-stt-stream", daemon=True)
+        self.thread.start()
+
+    def run(self, backend):
+        try:
+            self.transcript = backend.transcribe(self, None, self.interim,
+                                                 self.cancelled)
+        except Exception as e:
+            self.error = e
+
+    def interim(self, transcript):
+        if self.on_interim is not None and not self.cancelled.is_set():
+            self.on_interim(transcript)
+
+    def read(self, frames, exception_on_overflow=False):
+        """Blocks until the spotter puts the next chunk, and returns it, or
+            b"" once the utterance has ended or been cancelled."""
+        chunk = self.chunks.get()
+        if chunk is None or self.cancelled.is_set():
+            # later reads end too
+            self.chunks.put(None)
+            return b""
+        return chunk
+
+    def put(self, chunk):
+        self.chunks.put(chunk)
+
+    def end(self):
+        """Ends the utterance, and returns its transcript."""
+        self.chunks.put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+        return self.transcript
+
+    def cancel(self):
+        """Ends the utterance without waiting for its transcript, which the
+            backend abandons."""
+        self.cancelled.set()
+        self.chunks.put(None)
+
+
+class KeywordSpotter:
+    """Recognizes a fixed set of short commands (like "pause" or "volume up")
+        on the device, so that they skip the round trip to the speech to text
+        backend.
+
+        The graph is trained and frozen like the wake word graph (by
+        TensorFlow's speech_commands example, with the commands as its wanted
+        words), so it scores one second WAV windows and its labels are the
+        commands with spaces written as underscores, besides _silence_ and
+        _unknown_. An utterance is read with the vad into a buffer until it
+        ends, and its speech is scored: if one command is confident enough,
+        its words are the transcript, and the backend is never called.
+        Otherwise the spotter is unsure, and the buffered audio is replayed
+        to the backend (see TeedStream), which reads the rest of the
+        utterance as it is said. So that free-form speech isn't held back
+        until it ends, the spotter gives up early once the utterance grows
+        longer than any command, or once a window of its speech has been
+        said and no command scores above reject_threshold in it, which is
+        checked every hop.
+
+        Attributes:
+            model: a WakeWordModel of the keyword spotting graph
+            rate: the sampling rate of the audio
+            threshold: the probability above which a command is recognized
+            reject_threshold: the probability below which a window of speech
+                can't be the start of a command
+            loudness: the level of the samples which start and end speech
+            window_samples: the number of samples in a window of the graph
+            hop_samples: the number of samples between two windows of a
+                command longer than a window
+            max_seconds: the length of the longest utterance which can be a
+                command
+            commands: a dictionary from the labels of the graph which are
+                commands to their transcripts
+    """
+
+    def __init__(self, model, rate, threshold=0.85, reject_threshold=0.2,
+                 loudness=500, window_seconds=1.0, hop_seconds=0.25,
+                 max_seconds=2.0):
+        self.model = model
+        self.rate = rate
+        self.threshold = threshold
+        self.reject_threshold = reject_threshold
+        self.loudness = loudness
+        self.window_samples = int(window_seconds * rate)
+        self.hop_samples = int(hop_seconds * rate)
+        self.max_seconds = max_seconds
+        self.commands = {label: label.replace("_", " ")
+                         for label in model.labels
+                         if not label.startswith("_")}
+
+    def windows(self, samples):
+        """Returns the windows the speech of samples (an int16 array) is
+            scored in: one window centered on it if it is short enough, and
+            otherwise overlapping windows across it."""
+        speech = dsp.trim(samples, self.loudness)
+        if not len(speech):
+            return []
+        if len(speech) <= self.window_samples:
+            padding = (self.window_samples - len(speech)) / 2 / self.rate
+            return [dsp.add_silence(speech, padding, self.rate)[
+                :self.window_samples]]
+        starts = range(0, len(speech) - self.window_samples + self.hop_samples,
+                       self.hop_samples)
+        return [speech[start:start + self.window_samples] for start in starts]
+
+    def score(self, windows):
+        """Returns the label of the command most likely said in any of
+            windows and its probability, or (None, 0.0) if there are no
+            windows."""
+        if not windows:
+            return None, 0.0
+        wavs = []
+        for window in windows:
+            if dsp.peak(window):
+                # the graph was trained on normalized recordings
+                window = dsp.normalize(window)
+            wavs.append(encode_wav(window, self.rate))
+        best_label, best = None, 0.0
+        for prediction in self.model.predict(wavs):
+            for index, label in enumerate(self.model.labels):
+                if label in self.commands and prediction[index] > best:
+                    best_label, best = label, float(prediction[index])
+        return best_label, best
+
+    def spot(self, samples):
+        """Returns the command said in samples (an int16 array) and its
+            probability, or None and the highest probability of a command if
+            none is confident enough."""
+        label, best = self.score(self.windows(samples))
+        if best > self.threshold:
+            return self.commands[label], best
+        return None, best
+
+    def rejects(self, samples):
+        """True if the speech in samples (an int16 array) is at least a
+            window long, and no command is even remotely likely in it."""
+        speech = dsp.trim(samples, self.loudness)
+        if len(speech) < self.window_samples:
+            return False
+        return self.score(self.windows(samples))[1] < self.reject_threshold
+
+    def transcribe(self, stream, vad, backend, on_interim=None):
+        """Transcribes the utterance read from stream on the device if it is
+            a command, and with backend otherwise (see
+            SpeechBackend.transcribe)."""
+        max_samples = int(self.max_seconds * self.rate)
+        utterance = backend.chunks(stream, vad)
+        chunks = []
+        samples = checked = 0
+        with span("stt.keyword_spotter") as spot_span:
+            for chunk in utterance:
+                chunks.append(chunk)
+                samples += len(chunk) // 2
+                if samples > max_samples:
+                    spot_span.set(command=None, gave_up="long")
+                    break
+                if samples - checked >= self.hop_samples:
+                    checked = samples
+                    if self.rejects(dsp.as_samples(b"".join(chunks))):
+                        spot_span.set(command=None, gave_up="unlikely")
+                        break
+            else:
+                # the utterance ended while it could still be a command
+                command, confidence = self.spot(
+                    dsp.as_samples(b"".join(chunks)))
+                spot_span.set(command=command, confidence=confidence)
+                if command is not None:
+                    return command
+        # the spotter is unsure, so the backend hears the buffered audio and
+        # then the rest of the utterance as it is read
+        teed = TeedStream(backend, on_interim)
+        try:
+            for chunk in itertools.chain(chunks, utterance):
+                teed.put(chunk)
+        except BaseException:
+            teed.cancel()
+            raise
+        return teed.end()
@@ -0,0 +1,207 @@
+import sys
+import time
+import wave
+import importlib
+import numpy as np
+
+# The audio sources, by the name they are configured with
+SOURCES = {
+    "microphone": "modules.speech_to_text.sources.MicrophoneSource",
+    "wav": "modules.speech_to_text.sources.WavSource",
+    "pipe": "modules.speech_to_text.sources.PipeSource",
+    "synthetic": "modules.speech_to_text.sources.SyntheticSource",
+}
+
+
+def open_source(spec, rate, real_time=True):
+    """Opens the audio source described by spec: the name of a source in
+        SOURCES (or a dotted path), optionally followed by a colon and its
+        argument, like "wav:command.wav", "pipe:-" or "synthetic:300".
+
+        Sources which aren't live are read no faster than real time if
+        real_time, like a microphone.
+    """
+    name, _, argument = spec.partition(":")
+    module_path, class_name = SOURCES.get(name, name).rsplit(".", 1)
+    source_class = getattr(importlib.import_module(module_path), class_name)
+    return source_class.open(argument, rate, real_time)
+
+
+class AudioSource:
+    """Mono 16 bit little endian audio, read like a pyaudio input stream.
+
+        Attributes:
+            rate: the sampling rate of the audio
+            real_time: True if reads wait until their audio would have been
+                captured by a microphone
+            start: the perf_counter time of the first read, or None
+            position: the number of samples read so far
+    """
+
+    def __init__(self, rate, real_time=False):
+        self.rate = rate
+        self.real_time = real_time
+        self.start = None
+        self.position = 0
+
+    @classmethod
+    def open(cls, argument, rate, real_time):
+        """Creates the source from the argument of its spec (see
+            open_source)."""
+        raise NotImplementedError
+
+    def read_samples(self, frames):
+        """Returns the bytes of up to frames samples, or b"" once the audio
+            has run out."""
+        raise NotImplementedError
+
+    def read(self, frames, exception_on_overflow=False):
+        if self.start is None:
+            self.start = time.perf_counter()
+        if self.real_time:
+            delay = (self.start + (self.position + frames) / self.rate
+                     - time.perf_counter())
+            if delay > 0:
+                time.sleep(delay)
+        data = self.read_samples(frames)
+        self.position += len(data) // 2
+        return data
+
+    def get_read_available(self):
+        """Returns the number of samples which can be read without
+            waiting."""
+        if self.real_time:
+            if self.start is None:
+                return 0
+            captured = int((time.perf_counter() - self.start) * self.rate)
+            return max(0, captured - self.position)
+        return sys.maxsize
+
+    def close(self):
+        pass
+
+
+class MicrophoneSource(AudioSource):
+    """The default microphone, through pyaudio.
+
+        Attributes:
+            player: the pyaudio.PyAudio object
+            stream: the pyaudio input stream
+    """
+
+    def __init__(self, rate, chunk_size=1024):
+        super().__init__(rate)
+        import pyaudio
+        self.player = pyaudio.PyAudio()
+        self.stream = self.player.open(
+            format=pyaudio.paInt16, channels=1, rate=rate, input=True,
+            frames_per_buffer=chunk_size)
+
+    @classmethod
+    def open(cls, argument, rate, real_time):
+        return cls(rate)
+
+    def read_samples(self, frames):
+        return self.stream.read(frames, exception_on_overflow=False)
+
+    def get_read_available(self):
+        return self.stream.get_read_available()
+
+    def close(self):
+        self.stream.stop_stream()
+        self.stream.close()
+        self.player.terminate()
+
+
+class WavSource(AudioSource):
+    """A mono 16 bit WAV file, which sets the rate."""
+
+    def __init__(self, path, real_time=False):
+        self.wav = wave.open(path, 'rb')
+        if self.wav.getnchannels() != 1 or self.wav.getsampwidth() != 2:
+            self.wav.close()
+            raise ValueError("{} isn't mono 16 bit audio".format(path))
+        super().__init__(self.wav.getframerate(), real_time)
+
+    @classmethod
+    def open(cls, argument, rate, real_time):
+        source = cls(argument, real_time)
+        if source.rate != rate:
+            source.close()
+            raise ValueError("{} is sampled at {} Hz, not {} Hz".format(
+                argument, source.rate, rate))
+        return source
+
+    def read_samples(self, frames):
+        return self.wav.readframes(frames)
+
+    def close(self):
+        self.wav.close()
+
+
+class PipeSource(AudioSource):
+    """Raw 16 bit little endian samples read from a binary file, such as a
+        named pipe or the standard input of `arecord -t raw -f S16_LE`.
+
+        Attributes:
+            pipe: the binary file the samples are read from
+    """
+
+    def __init__(self, pipe, rate, real_time=False):
+        super().__init__(rate, real_time)
+        self.pipe = pipe
+
+    @classmethod
+    def open(cls, argument, rate, real_time):
+        # a producer faster than real time (like `cat` of a recording) would
+        # overrun the engine's ring of captured audio, so pipes are paced
+        # like files; a live producer is read as it produces
+        if argument in ("", "-"):
+            return cls(sys.stdin.buffer, rate, real_time)
+        return cls(open(argument, 'rb'), rate, real_time)
+
+    def read_samples(self, frames):
+        data = self.pipe.read(2 * frames)
+        if len(data) % 2:
+            # a pipe can end in the middle of a sample
+            data = data[:-1]
+        return data
+
+    def close(self):
+        if self.pipe is not sys.stdin.buffer:
+            self.pipe.close()
+
+
+class SyntheticSource(AudioSource):
+    """Generated audio: Gaussian noise by default, or any function of the
+        sample position.
+
+        Attributes:
+            length: the number of samples generated in all, or None for no end
+            generate: a function from the position of the first sample and a
+                number of samples to an int16 array of them
+    """
+
+    def __init__(self, rate, seconds=None, level=100.0, generate=None,
+                 seed=0, real_time=False):
+        super().__init__(rate, real_time)
+        self.length = None if seconds is None else int(seconds * rate)
+        if generate is None:
+            random = np.random.RandomState(seed)
+
+            def generate(start, frames):
+                noise = level * random.standard_normal(frames)
+                return np.clip(noise, -32768, 32767).astype('<i2')
+        self.generate = generate
+
+    @classmethod
+    def open(cls, argument, rate, real_time):
+        seconds = float(argument) if argument else None
+        return cls(rate, seconds, real_time=real_time)
+
+    def read_samples(self, frames):
+        if self.length is not None:
+            frames = min(frames, self.length - self.position)
+        if frames <= 0:
+            return b""
+        return self.generate(self.position, frames).astype('<i2').tobytes()
@@ -0,0 +1,102 @@
+import numpy as np
+from . import dsp
+
+
+class VoiceActivityDetector:
+    """Finds the end of an utterance in a stream of audio, frame by frame.
+
+        Each frame is speech if its level is ratio times above the noise
+        floor, which follows the level of the frames which aren't speech, so
+        a noisy room raises the bar for speech instead of sounding like
+        speech forever. The utterance starts after min_speech seconds of
+        speech, which ignores clicks, and ends once hangover seconds have
+        passed without speech, which bridges the pauses between words.
+
+        Attributes:
+            frame_size: the number of samples in a frame
+            ratio: how many times louder than the noise floor speech is
+            min_level: the lowest level counted as speech, so that digital
+                silence doesn't make every sound speech
+            min_speech_frames: the number of speech frames in a row which
+                start the utterance
+            hangover_frames: the number of frames without speech which end
+                the utterance
+            floor_attack: how fast the noise floor falls to a quieter frame
+            floor_release: how fast the noise floor rises to a louder frame
+                which isn't speech
+            floor_creep: how fast the noise floor rises to speech, so that a
+                noise which starts and doesn't stop is eventually heard as
+                noise
+            noise_floor: the level of the noise, or None before the first
+                frame
+            started: True once the utterance has started
+            ended: True once the utterance has ended
+            speech_run: the number of speech frames in a row so far
+            silence_run: the number of frames without speech in a row so far
+            pending: the samples of an incomplete frame, kept for the next
+                call to update
+    """
+
+    def __init__(self, rate, frame_seconds=0.02, hangover=0.5, ratio=2.0,
+                 min_level=100.0, min_speech=0.06, floor_attack=0.2,
+                 floor_release=0.02, floor_creep=0.002):
+        self.frame_size = int(frame_seconds * rate)
+        self.ratio = ratio
+        self.min_level = min_level
+        self.min_speech_frames = max(1, int(round(min_speech / frame_seconds)))
+        self.hangover_frames = max(1, int(round(hangover / frame_seconds)))
+        self.floor_attack = floor_attack
+        self.floor_release = floor_release
+        self.floor_creep = floor_creep
+        self.noise_floor = None
+        self.reset()
+
+    def reset(self):
+        """Starts listening for a new utterance, keeping the noise floor."""
+        self.started = False
+        self.ended = False
+        self.speech_run = 0
+        self.silence_run = 0
+        self.pending = None
+
+    def is_speech(self, level):
+        """True if a frame of level is speech, updating the noise floor with
+            the frames which aren't."""
+        if self.noise_floor is None:
+            self.noise_floor = level
+        speech = level > max(self.noise_floor * self.ratio, self.min_level)
+        if level < self.noise_floor:
+            rate = self.floor_attack
+        elif speech:
+            rate = self.floor_creep
+        else:
+            rate = self.floor_release
+        self.noise_floor += rate * (level - self.noise_floor)
+        return speech
+
+    def update(self, samples):
+        """Processes the next samples (an int16 array) of the stream.
+
+            Returns:
+                True once the utterance has ended.
+        """
+        if self.pending is not None:
+            samples = np.concatenate([self.pending, samples])
+            self.pending = None
+        end = len(samples) - len(samples) % self.frame_size
+        for start in range(0, end, self.frame_size):
+            if self.ended:
+                break
+            if self.is_speech(dsp.rms(samples[start:start + self.frame_size])):
+                self.speech_run += 1
+                self.silence_run = 0
+                if self.speech_run >= self.min_speech_frames:
+                    self.started = True
+            else:
+                self.speech_run = 0
+                self.silence_run += 1
+                if self.started and self.silence_run >= self.hangover_frames:
+                    self.ended = True
+        if end < len(samples):
+            self.pending = samples[end:]
+        return self.ended
@@ -0,0 +1,228 @@
+import io
+import wave
+from sys import byteorder
+from array import array
+from modules.tracing import span
+from . import dsp
+from .vad import VoiceActivityDetector
+
+
+def encode_wav(samples, rate):
+    """Returns the bytes of a mono 16 bit WAV file of samples, which is the
+        input the wake word graph decodes."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(rate)
+        wav_file.writeframes(dsp.frames(samples))
+    return buffer.getvalue()
+
+
+class RingBuffer:
+    """The last size samples of a stream of 16 bit audio.
+
+        Attributes:
+            samples: an array of size samples, which wraps around at position
+            position: the index in samples the next sample is written to
+            filled: the number of samples written so far, up to size
+    """
+
+    def __init__(self, size):
+        self.samples = array("h", bytes(2 * size))
+        self.position = 0
+        self.filled = 0
+
+    def __len__(self):
+        return self.filled
+
+    def extend(self, chunk):
+        """Appends a chunk of samples, overwriting the oldest ones."""
+        size = len(self.samples)
+        if len(chunk) >= size:
+            self.samples[:] = chunk[-size:]
+            self.position = 0
+            self.filled = size
+            return
+        end = self.position + len(chunk)
+        if end <= size:
+            self.samples[self.position:end] = chunk
+        else:
+            split = size - self.position
+            self.samples[self.position:] = chunk[:split]
+            self.samples[:end - size] = chunk[split:]
+        self.position = end % size
+        self.filled = min(self.filled + len(chunk), size)
+
+    def window(self):
+        """Returns the buffered samples, oldest first."""
+        return self.samples[self.position:] + self.samples[:self.position]
+
+    def clear(self):
+        self.position = 0
+        self.filled = 0
+
+
+class EnergyGate:
+    """Decides cheaply whether a window of audio could hold the wake word,
+        so the graph isn't run on a silent room.
+
+        Each chunk read is speech if it is louder than the adaptive noise
+        floor of a VoiceActivityDetector and its zero crossing rate is low
+        enough for voiced sound rather than hiss. The gate stays open until
+        the last chunk of speech has left the window.
+
+        Attributes:
+            vad: the VoiceActivityDetector tracking the noise floor
+            max_crossing_rate: the highest zero crossing rate of speech
+            window_samples: the number of samples in a window
+            open_for: the number of samples to be read before the last chunk
+                of speech leaves the window
+    """
+
+    def __init__(self, rate, window_seconds, ratio=1.5, min_level=50.0,
+                 max_crossing_rate=0.4):
+        self.vad = VoiceActivityDetector(rate, ratio=ratio,
+                                         min_level=min_level)
+        self.max_crossing_rate = max_crossing_rate
+        self.window_samples = int(window_seconds * rate)
+        self.open_for = 0
+
+    def update(self, samples):
+        """Processes the next chunk (an int16 array) of the stream."""
+        speech = (self.vad.is_speech(dsp.rms(samples))
+                  and dsp.zero_crossing_rate(samples)
+                  <= self.max_crossing_rate)
+        if speech:
+            self.open_for = self.window_samples
+        else:
+            self.open_for = max(0, self.open_for - len(samples))
+
+    def is_open(self):
+        """True if the current window holds a chunk which could be
+            speech."""
+        return self.open_for > 0
+
+    def clear(self):
+        self.open_for = 0
+
+
+class WakeWordDetector:
+    """Listens for the wake word by scoring overlapping windows of the
+        microphone stream in memory.
+
+        Every hop_seconds of new audio, the last window_seconds of audio are
+        run through the wake word graph, so the word is detected at most one
+        hop after it is said, and nothing is written to disk. When scoring
+        falls behind the microphone, the windows of every hop waiting in the
+        stream are scored together in one batch. Windows which the
+        EnergyGate finds no speech in aren't scored at all.
+
+        Attributes:
+            stt: the MarvinSpeechToText object whose graph scores windows
+            window: the RingBuffer holding the latest window of audio
+            hop_samples: the number of new samples between two scores
+            threshold: the probability above which the wake word is detected
+            wake_word: the label of the wake word in the graph
+            gate: the EnergyGate skipping windows, or None to score every
+                window
+            windows_scored: the number of windows scored so far
+            windows_gated: the number of windows skipped by the gate so far
+    """
+
+    def __init__(self, stt, window_seconds=1.0, hop_seconds=0.25,
+                 threshold=0.90, wake_word="marvin", gated=True):
+        self.stt = stt
+        self.window = RingBuffer(int(window_seconds * stt.RATE))
+        self.hop_samples = int(hop_seconds * stt.RATE)
+        self.threshold = threshold
+        self.wake_word = wake_word
+        self.gate = EnergyGate(stt.RATE, window_seconds) if gated else None
+        self.windows_scored = 0
+        self.windows_gated = 0
+
+    def encode(self, samples):
+        """Returns a window of samples as the WAV file the graph scores."""
+        samples = dsp.as_samples(samples)
+        if dsp.peak(samples):
+            # the graph was trained on normalized recordings
+            samples = self.stt.normalize(samples)
+        return encode_wav(samples, self.stt.RATE)
+
+    def score(self, windows):
+        """Returns the highest probability that one of windows (arrays of
+            samples) is the wake word."""
+        model = self.stt.model
+        index = model.labels.index(self.wake_word)
+        self.windows_scored += len(windows)
+        with span("audio.wake_word_windows", windows=len(windows)):
+            predictions = model.predict(
+                [self.encode(window) for window in windows])
+        return max(prediction[index] for prediction in predictions)
+
+    def detect(self, stream):
+        """Reads chunks of samples from stream until the wake word is
+            detected.
+
+            Args:
+                stream: an AudioSource, AudioReader or pyaudio input stream of
+                    mono 16 bit audio
+
+            Returns:
+                True once the wake word is detected, or False if stream ran
+                out first.
+        """
+        scored, gated = self.windows_scored, self.windows_gated
+        with span("audio.wake_word_detect") as detect_span:
+            try:
+                return self.read_until_detected(stream)
+            finally:
+                detect_span.set(windows=self.windows_scored - scored,
+                                gated=self.windows_gated - gated)
+
+    def read_until_detected(self, stream):
+        self.window.clear()
+        if self.gate is not None:
+            self.gate.clear()
+        since_score = 0
+        windows = []
+        while True:
+            data = stream.read(self.stt.CHUNK_SIZE,
+                               exception_on_overflow=False)
+            if not data:
+                return False
+            if self.gate is not None:
+                self.gate.update(dsp.as_samples(data))
+            chunk = array('h', data)
+            if byteorder == 'big':
+                chunk.byteswap()
+            self.window.extend(chunk)
+            since_score += len(chunk)
+            if (since_score < self.hop_samples
+                    or len(self.window) < len(self.window.samples)):
+                continue
+            since_score = 0
+            if self.gate is None or self.gate.is_open():
+                windows.append(self.window.window())
+                # keep reading while a whole hop is already waiting, so the
+                # windows of every hop are scored in one batch
+                if (len(windows) < self.stt.model.batch_size
+                        and stream.get_read_available() >= self.hop_samples):
+                    continue
+            else:
+                self.windows_gated += 1
+            if windows:
+                if self.score(windows) > self.threshold:
+                    return True
+                windows = []
+
+    def gated_fraction(self):
+        """Returns the fraction of the windows so far which the gate
+            skipped."""
+        total = self.windows_scored + self.windows_gated
+        return self.windows_gated / total if total else 0.0
+
+    def listen(self):
+        """Returns True once the wake word is said into the microphone, or
+            False if its source ran out."""
+        return self.detect(self.stt.microphone)
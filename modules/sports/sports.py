@@ -2,6 +2,8 @@ from math import isnan
 from datetime import datetime, timedelta
 from pybaseball import schedule_and_record
 from .sports_helper import SportsHelper
+from modules.cache import cached
+from modules.tracing import traced
 
 
 class Sports:
@@ -15,6 +17,13 @@ class Sports:
     def __init__(self):
         self.helper = SportsHelper()
 
+    @cached("sports")
+    @traced("api.pybaseball")
+    def get_schedule(self, year, team):
+        """Returns a dataframe of the schedule and results of a team in a
+            season."""
+        return schedule_and_record(year, team)
+
     def route_command(self, command, say, listen):
         """Executes and generates  a string response for a given sports
             command.
@@ -31,11 +40,28 @@ class Sports:
                     false if the command was invalid.
         """
         label, args = self.helper.parse_command(command)
+        return self.run_intent(label, args, say, listen)
+
+    def run_intent(self, label, args, say, listen):
+        """Executes a command which has already been parsed by self.helper.
+
+            Args:
+                label: the label of the command
+                args: the team name, or a dictionary with the team name and day
+                    of the week, parsed from the command
+                say: A function which will say (either through text to speech
+                    or printing) a string in the main speaker loop
+                listen: A function which will listen and record user input
+                    through either speech to text or through the CLI
+            Returns:
+                True if a command was executed (or failed while executed) and
+                    false if the label was invalid.
+        """
         # if the game was today
         if label == "result today":
             today = datetime.utcnow().date()
             current_year = today.year
-            dataframe = schedule_and_record(
+            dataframe = self.get_schedule(
                 current_year, self.helper.baseball_teams_to_abbrev[args])
             index = self.helper.dataframe_first_instance_of(
                 dataframe, self.helper.date_to_dataframe_index(today))
@@ -62,7 +88,7 @@ time"
         elif label == "result yesterday":
             yesterday = datetime.utcnow().date() - timedelta(1)
             current_year = yesterday.year
-            dataframe = schedule_and_record(
+            dataframe = self.get_schedule(
                 current_year, self.helper.baseball_teams_to_abbrev[args])
             index = self.helper.dataframe_first_instance_of(
                 dataframe, self.helper.date_to_dataframe_index(yesterday))
@@ -89,7 +115,7 @@ time"
         elif label == "result specific":
             day = self.helper.day_of_week_to_date(args['day'], datetime.utcnow().date())
             current_year = day.year
-            dataframe = schedule_and_record(
+            dataframe = self.get_schedule(
                 current_year, self.helper.baseball_teams_to_abbrev[args['team']])
             index = self.helper.dataframe_first_instance_of(
                 dataframe, self.helper.date_to_dataframe_index(day))
@@ -114,7 +140,7 @@ time"
             say(response)
         elif label == "record":
             current_year = datetime.utcnow().date().year
-            dataframe = schedule_and_record(
+            dataframe = self.get_schedule(
                 current_year, self.helper.baseball_teams_to_abbrev[args])
             record = self.helper.dataframe_last_non_nan(dataframe)
             if record == "":
@@ -10,7 +10,8 @@ class SportsHelper(ModuleHelper):
         Attributes:
             sports_re: a dictionary from string labels to lists of regular
                 expressions which match commands with similar meanings (e.g.
-                'schedule today' and 'What are my calendar events today?')
+                'schedule today' and 'What are my calendar events today?').
+                Named groups capture the team name and day of the week.
             baseball_teams_to_abbrev: a dictionary from baseball team names to
                 their official abbreviations
             abbrev_to_baseball_teams: the inverse dictionary of
@@ -20,17 +21,17 @@ class SportsHelper(ModuleHelper):
     def __init__(self):
         ModuleHelper.__init__(self)
         self.sports_re = {
-            'result today': [re.compile('[A-Z|a-z|\'| ]*score of the [A-Z|a-z\
-|\'| ]+ game( today)?\??'), ],
-            'result yesterday': [re.compile('[A-Z|a-z|\'| ]*score of the [A-Z|\
-a-z|\'| ]+ game yesterday\??')],
-            'result specific': [re.compile('[A-Z|a-z|\'| ]*score of the [A-Z|\
-a-z|\'| ]+ game (on|last) (monday|tuesday|wednesday|thursday|friday|saturday|\
-sunday)\??')],
+            'result today': [re.compile('[A-Z|a-z|\'| ]*?score of the \
+(?P<team>[A-Z|a-z|\'| ]+?) game( today)?\??'), ],
+            'result yesterday': [re.compile('[A-Z|a-z|\'| ]*?score of the \
+(?P<team>[A-Z|a-z|\'| ]+?) game yesterday\??')],
+            'result specific': [re.compile('[A-Z|a-z|\'| ]*?score of the \
+(?P<team>[A-Z|a-z|\'| ]+?) game (on|last) (?P<day>monday|tuesday|wednesday|\
+thursday|friday|saturday|sunday)\??')],
             'record': [re.compile(
-                '[A-Z|a-z|\'| ]*record (of|for) the [A-Z|a-z|\'| ]+\
-( this year| this season)?\??'), re.compile('[A-Z|a-z|\'| ]*the [A-Z|a-z|\'| ]* record( this\
- year| this season)?\??')],
+                '[A-Z|a-z|\'| ]*?record (of|for) the (?P<team>[A-Z|a-z|\'| ]+?)\
+( this year| this season)?\??'), re.compile('[A-Z|a-z|\'| ]*?the \
+(?P<possessive_team>[A-Z|a-z|\'| ]*?) record( this year| this season)?\??')],
         }
         self.baseball_teams_to_abbrev = {
             'diamondbacks': 'ARI',
@@ -146,6 +147,24 @@ sunday)\??')],
                 pass
         return ""
 
+    def get_intents(self):
+        return self.sports_re
+
+    def get_args(self, label, slots):
+        """Returns the team name of a command, or a dictionary with the team
+            name and the day of the week name for a result specific
+            command."""
+        if label == "result specific":
+            return {"team": slots["team"], "day": slots["day"]}
+        elif slots.get("possessive_team") is not None:
+            team_name = slots["possessive_team"]
+            if team_name.endswith("\'s"):
+                team_name = team_name[:-2]
+            elif team_name.endswith("\'"):
+                team_name = team_name[:-1]
+            return team_name
+        return slots["team"]
+
     def parse_command(self, command):
         """Transforms a command into a label.
 
@@ -159,40 +178,4 @@ sunday)\??')],
                 None, None is returned if no matches to regular expressions
                 can be found.
         """
-        for label in self.sports_re:
-            for regexp in self.sports_re[label]:
-                if regexp.fullmatch(command):
-                    if label == "result today" or label == "result yesterday":
-                        team_name = (command.split("score of the ")[1]).split(
-                            " game")[0]
-                        return label, team_name
-                    elif label == "result specific":
-                        team_name = (command.split("score of the ")[1]).split(
-                            " game")[0]
-                        if " game on " in command:
-                            day_of_week = (command.split(" game on ")[1])
-                        else:
-                            day_of_week = (command.split(" game last ")[1])
-                        if '?' in day_of_week:
-                            day_of_week = day_of_week[:-1]
-                        return label, {"team": team_name, "day": day_of_week}
-                    elif label == "record":
-                        if command.endswith('?'):
-                            command = command.split('?')[0]
-                        if command.endswith('record') or command.endswith('record this year'):
-                            team_name = (command.split(" record")[0]).split(
-                                " the ")[1]
-                            if team_name.endswith("\'s"):
-                                team_name = team_name[:-2]
-                            elif team_name.endswith("\'"):
-                                team_name = team_name[:-1]
-                            return label, team_name
-                        else:
-                            if " of the " in command:
-                                team_name = command.split(" of the ")[1]
-                            else:
-                                team_name = command.split(" for the ")[1]
-                            if " this year" in command:
-                                team_name = team_name.split(" this year")[0]
-                            return label, team_name
-        return None, None
+        return self.parse_intent(command)
@@ -4,6 +4,7 @@ import os
 import yaml
 from time import sleep
 from .spotify_helper import SpotifyHelper
+from modules.tracing import span
 
 
 class Spotify:
@@ -54,7 +55,8 @@ class Spotify:
     def need_auth(fun):
         def wrapped_fun(self, *args, **kwargs):
             if self.auth:
-                fun(self, *args, **kwargs)
+                with span("api.spotify", call=fun.__name__):
+                    fun(self, *args, **kwargs)
             else:
                 raise ValueError("Not logged in to Spotify.")
         return wrapped_fun
@@ -174,6 +176,23 @@ class Spotify:
                     false if the command was invalid.
         """
         label, query = self.helper.parse_command(command)
+        return self.run_intent(label, query, say, listen)
+
+    def run_intent(self, label, query, say, listen):
+        """Executes a command which has already been parsed by self.helper.
+
+            Args:
+                label: the label of the command
+                query: the search query or playlist parsed from the command, or
+                    None
+                say: A function which will say (either through text to speech
+                    or printing) a string in the main speaker loop
+                listen: A function which will listen and record user input
+                    through either speech to text or through the CLI
+            Returns:
+                True if a command was executed (or failed while executed) and
+                    false if the label was invalid.
+        """
         if label == "resume":
             say("Resuming Spotify")
             self.resume_playback()
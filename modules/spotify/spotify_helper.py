@@ -9,7 +9,8 @@ class SpotifyHelper(ModuleHelper):
         Attributes:
             spotify_re: an OrderedDict from string labels to lists of regular
                 expressions which match commands with similar meanings (e.g.
-                'Play the previous song' and 'play the song before this one')
+                'Play the previous song' and 'play the song before this one').
+                Named groups capture the arguments of the command.
     """
 
     def __init__(self):
@@ -24,11 +25,11 @@ my music)?'), ]),
             ("previous", [re.compile('[A-Z|a-z| ]*previous( song)?'),
                           re.compile('[A-Z|a-z| ]*song before[A-Z|a-z| ]*')]),
             ("play playlist", [
-             re.compile('[A-Z|a-z|\'| ]*(play)[A-Z|a-z|\'| ]*(playlist)\
-[A-Z|a-z|\'| |0-9|\!]*')]),
+             re.compile('[A-Z|a-z|\'| ]*?(play)[A-Z|a-z|\'| ]*?playlists? \
+(?P<playlist>[A-Z|a-z|\'| |0-9|\!]*)')]),
             ("search", [
-             re.compile('[A-Z|a-z| ]*play [A-Z|a-z|\'| |0-9]+( by \
-[A-Z|a-z|\'| |0-9]+)?( on spotify)?'), ]),
+             re.compile('[A-Z|a-z| ]*?play (?P<query>[A-Z|a-z|\'| |0-9]+?)\
+( on spotify[A-Z|a-z|\'| |0-9]*)?'), ]),
             ("current", [re.compile('[A-Z|a-z|\'| ]*what[A-Z|a-z|\'| ]+(song|\
 playing|playing now)\??'), ]),
             ("list playlist", [
@@ -47,6 +48,18 @@ playing|playing now)\??'), ]),
         ]
         self.spotify_re = OrderedDict(self.spotify_re)
 
+    def get_intents(self):
+        return self.spotify_re
+
+    def get_args(self, label, slots):
+        """Returns the search query of a search, the playlist name or index
+            of a play playlist command, and None otherwise."""
+        if label == "search":
+            return slots["query"].replace(" by ", " ")
+        elif label == "play playlist":
+            return self.number_dict.get(slots["playlist"], slots["playlist"])
+        return None
+
     def parse_command(self, command):
         """Transforms a command into a label.
 
@@ -59,24 +72,4 @@ playing|playing now)\??'), ]),
                 the query to search for if the command was requesting a search
                 of spotify.
         """
-        for label in self.spotify_re:
-            for regexp in self.spotify_re[label]:
-                if regexp.fullmatch(command):
-                    if label == "search":
-                        search_plus = command.split("play ")[1]
-                        if " on spotify" in search_plus:
-                            search_plus = search_plus.split(" on spotify")[0]
-                        query = " ".join(search_plus.split(" by "))
-                        return label, query
-                    elif label == "play playlist":
-                        if "playlists " in command and "playlist " \
-                                not in command:
-                            playlist_term = command.split("playlists ")[1]
-                        else:
-                            playlist_term = command.split("playlist ")[1]
-                        if playlist_term in list(self.number_dict.keys()):
-                            playlist_term = self.number_dict[playlist_term]
-                        return label, playlist_term
-                    else:
-                        return label, None
-        return None, None
+        return self.parse_intent(command)
@@ -1,4 +1,8 @@
 from .stocks_helper import StocksHelper
+from modules.prefetch import PrefetchMemo
+from modules.cache import cached
+from modules.tracing import traced
+import asyncio
 import yaml
 import requests
 import os
@@ -9,6 +13,7 @@ class Stocks:
     def __init__(self):
         self.helper = StocksHelper()
         self.key = self.get_credentials()
+        self.prefetched = PrefetchMemo()
 
     def get_credentials(self):
         CREDENTIALS_FILE = "{}/stocks-credentials.yaml".format(
@@ -21,6 +26,8 @@ class Stocks:
         else:
             return os.environ.get('ALPHA_VANTAGE_KEY')
 
+    @cached("stocks")
+    @traced("api.alpha_vantage")
     def get_ticker_price(self, ticker):
         url = "https://www.alphavantage.co/query?function=GLOBAL_QUOTE&symbol={}&apikey={}".format(
             ticker, self.key)
@@ -29,8 +36,30 @@ class Stocks:
 
     def route_command(self, command, say, listen):
         label, ticker = self.helper.parse_command(command)
+        return self.run_intent(label, ticker, say, listen)
+
+    def prefetch(self, label, ticker):
+        if label == "price":
+            self.prefetched.put(ticker, self.get_ticker_price(ticker))
+
+    def run_intent(self, label, ticker, say, listen):
+        if label == "price":
+            price = self.prefetched.pop(ticker)
+            if price is None:
+                price = self.get_ticker_price(ticker)
+            say("The current price of {} is {} dollars.".format(ticker, price))
+        else:
+            return False
+        return True
+
+    async def run_intent_async(self, label, ticker, say, listen):
         if label == "price":
-            say("The current price of {} is {} dollars.".format(ticker, self.get_ticker_price(ticker)))
+            price = self.prefetched.pop(ticker)
+            if price is None:
+                loop = asyncio.get_running_loop()
+                price = await loop.run_in_executor(None, self.get_ticker_price,
+                                                   ticker)
+            say("The current price of {} is {} dollars.".format(ticker, price))
         else:
             return False
         return True
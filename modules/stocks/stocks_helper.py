@@ -13,10 +13,17 @@ class StocksHelper(ModuleHelper):
                     'Play the previous song' and 'play the song before this one')
         """
         self.stocks_re = {
-            "price": [re.compile("[A-Z|a-z|\'| ]*stock price of [A-Z|a-z]+( today)?\??"),
-                      re.compile("[A-Z|a-z|\'| ]price of [A-Z|a-z]+ stock( today)?\??")],
+            "price": [re.compile("[A-Z|a-z|\'| ]*stock price of (?P<ticker>[A-Z|a-z]+)( today)?\??"),
+                      re.compile("[A-Z|a-z|\'| ]price of (?P<ticker>[A-Z|a-z]+) stock( today)?\??")],
         }
 
+    def get_intents(self):
+        return self.stocks_re
+
+    def get_args(self, label, slots):
+        """Returns the ticker of a price command."""
+        return slots.get("ticker")
+
     def parse_command(self, command):
         """Transforms a command into a label.
 
@@ -28,15 +35,4 @@ class StocksHelper(ModuleHelper):
                 self.stocks_re which matches command, then either None or
                 the ticker to search for
         """
-        for label in self.stocks_re:
-            for regexp in self.stocks_re[label]:
-                if regexp.fullmatch(command):
-                    ticker = None
-                    if label == "price":
-                        ticker = command.split("price of ")[1]
-                        if "stock " in ticker:
-                            ticker = ticker.split(" stock")[0]
-                        elif " today" in ticker:
-                            ticker = ticker.split(" today")[0]
-                    return label, ticker
-        return None, None
+        return self.parse_intent(command)
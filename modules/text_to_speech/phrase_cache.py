@@ -0,0 +1,181 @@
+import os
+import wave
+import struct
+import hashlib
+import numpy as np
+from collections import namedtuple
+
+# Responses which are always the same, rendered once and played from disk
+PHRASES = [
+    "Cannot understand command",
+    "No music currently selected.",
+    "Resuming Spotify",
+    "Pausing Spotify",
+    "Playing previous song",
+    "Playing next song",
+    "No search results for that query on Spotify",
+    "Not logged into Spotify",
+    "Continue listing? ",
+    "Please clarify your weather query.",
+    "No upcoming events today found.",
+    "No events found tomorrow.",
+    "No events found this week.",
+    "To what number?",
+    "Enter number again please: ",
+    "Ready for message",
+    "Enter message again please: ",
+    "Message successfully sent",
+    "Failure while sending message",
+    "Could not find any results for that query",
+    "Can you please clarify your query",
+    "Goodbye!",
+]
+
+# The fixed beginnings of responses built from templates. The cached prefix
+# is played while the rest of the response is synthesized.
+PREFIXES = [
+    "Turning the volume up to",
+    "Turning the volume down to",
+    "Playing playlist",
+    "The currently playing song is",
+    "The current price of",
+    "The weather today in",
+    "The weather tomorrow in",
+    "The weather on",
+    "Please confirm number:",
+    "Please confirm message:",
+]
+
+Clip = namedtuple("Clip", ["frames", "channels", "sample_width", "rate"])
+
+
+def extended_to_float(data):
+    """Decodes the 80 bit IEEE extended float AIFF stores its rate in."""
+    exponent, mantissa = struct.unpack(">HQ", data)
+    sign = -1 if exponent & 0x8000 else 1
+    exponent &= 0x7FFF
+    if exponent == 0 and mantissa == 0:
+        return 0.0
+    return sign * mantissa * 2.0 ** (exponent - 16383 - 63)
+
+
+def read_aiff(path):
+    """Reads the PCM audio of an AIFF or uncompressed AIFF-C file as native
+        little endian frames."""
+    with open(path, "rb") as audio_file:
+        data = audio_file.read()
+    form_type = data[8:12]
+    if data[:4] != b"FORM" or form_type not in (b"AIFF", b"AIFC"):
+        raise ValueError("{} is not an AIFF file".format(path))
+    big_endian = True
+    common = frames = None
+    position = 12
+    while position + 8 <= len(data):
+        chunk_id, size = struct.unpack(">4sI", data[position:position + 8])
+        chunk = data[position + 8:position + 8 + size]
+        if chunk_id == b"COMM":
+            channels, count, width = struct.unpack(">hIh", chunk[:8])
+            common = (channels, count, (width + 7) // 8,
+                      int(extended_to_float(chunk[8:18])))
+            if form_type == b"AIFC":
+                compression = chunk[18:22]
+                if compression not in (b"NONE", b"sowt"):
+                    raise ValueError("{} is compressed with {!r}".format(
+                        path, compression))
+                big_endian = compression == b"NONE"
+        elif chunk_id == b"SSND":
+            offset = struct.unpack(">I", chunk[:4])[0]
+            frames = chunk[8 + offset:]
+        # chunks are padded to an even length
+        position += 8 + size + size % 2
+    if common is None or frames is None:
+        raise ValueError("{} has no audio".format(path))
+    channels, count, sample_width, rate = common
+    frames = frames[:count * channels * sample_width]
+    if big_endian and sample_width > 1:
+        frames = np.frombuffer(frames, dtype=np.uint8).reshape(
+            -1, sample_width)[:, ::-1].tobytes()
+    return Clip(frames, channels, sample_width, rate)
+
+
+def read_clip(path):
+    """Reads the PCM audio of a WAV or AIFF file (pyttsx3 writes AIFF on
+        macOS) as native little endian frames."""
+    with open(path, "rb") as audio_file:
+        header = audio_file.read(4)
+    if header == b"FORM":
+        return read_aiff(path)
+    with wave.open(path, "rb") as audio:
+        return Clip(audio.readframes(audio.getnframes()),
+                    audio.getnchannels(), audio.getsampwidth(),
+                    audio.getframerate())
+
+
+class PhraseCache:
+    """Audio of Marvin's fixed phrases, rendered once by the text to speech
+        engine and kept on disk, so that they play without being synthesized
+        again.
+
+        Phrases are stored under a hash of their text and of the engine's
+        voice and rate, so changing either renders them again.
+
+        Attributes:
+            directory: the directory the rendered phrases are stored in
+            phrases: the phrases which are cached whole
+            prefixes: the beginnings of templated phrases which are cached,
+                longest first
+            clips: a dictionary from phrases and prefixes to their Clip
+            output: the AudioOutput (of the AudioEngine, when Marvin listens
+                too) which plays the clips
+    """
+
+    def __init__(self, directory, output, phrases=PHRASES,
+                 prefixes=PREFIXES):
+        self.directory = directory
+        self.output = output
+        self.phrases = list(phrases)
+        self.prefixes = sorted(prefixes, key=len, reverse=True)
+        self.clips = {}
+
+    def path(self, text, engine):
+        """Returns the file the audio of text spoken by engine is stored
+            in."""
+        key = "{}|{}|{}".format(engine.getProperty("voice"),
+                                engine.getProperty("rate"), text)
+        return os.path.join(self.directory, "{}.audio".format(
+            hashlib.sha1(key.encode("utf-8")).hexdigest()))
+
+    def prepare(self, engine):
+        """Renders the phrases which aren't on disk yet, then loads every
+            phrase. Must be called from the thread which uses engine."""
+        os.makedirs(self.directory, exist_ok=True)
+        paths = {text: self.path(text, engine)
+                 for text in self.phrases + self.prefixes}
+        missing = [text for text, path in paths.items()
+                   if not os.path.exists(path)]
+        for text in missing:
+            engine.save_to_file(text, paths[text])
+        if missing:
+            engine.runAndWait()
+        for text, path in paths.items():
+            self.clips[text] = read_clip(path)
+
+    def match(self, text):
+        """Finds the cached audio text starts with.
+
+            Returns:
+                The Clip of text, or of its longest cached prefix, and the
+                rest of text which still has to be synthesized. (None, text)
+                if nothing is cached.
+        """
+        clip = self.clips.get(text)
+        if clip is not None:
+            return clip, ""
+        for prefix in self.prefixes:
+            if text.startswith(prefix + " ") and prefix in self.clips:
+                return self.clips[prefix], text[len(prefix) + 1:]
+        return None, text
+
+    def play(self, clip):
+        """Plays a clip, returning once it has been played."""
+        self.output.play(clip)
@@ -0,0 +1,192 @@
+import queue
+import asyncio
+import logging
+import importlib
+import threading
+from modules.tracing import span
+from modules.speech_to_text.audio_engine import AudioOutput
+from .phrase_cache import PhraseCache
+
+logger = logging.getLogger(__name__)
+
+
+class Utterance:
+    """A piece of text waiting to be spoken by a SpeechQueue.
+
+        Attributes:
+            text: the text to speak
+            done: an Event set once the text has been spoken (or cancelled)
+            cancelled: True if the text was cancelled before it was spoken in
+                full
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.done = threading.Event()
+        self.cancelled = False
+
+    def wait(self, timeout=None):
+        """Blocks until the text has been spoken, and returns False if
+            timeout seconds passed first."""
+        return self.done.wait(timeout)
+
+
+class SpeechQueue:
+    """Speaks text with pyttsx3 on a dedicated worker thread, so that saying
+        something returns immediately.
+
+        Text is spoken in the order it was queued. The engine is created on
+        the worker thread, since some pyttsx3 drivers must be used from the
+        thread which created them, and the engine is only ever used from
+        there: cancelling flags the Utterance being spoken, and the worker
+        stops the engine at its next word. Phrases in the PhraseCache are
+        played from their pre-rendered audio instead of being synthesized,
+        unless they fail to render or load. An Utterance which fails to be spoken is logged and marked done, and
+        the worker moves on to the next one.
+
+        Attributes:
+            engine_path: the dotted path of the function creating the engine
+            phrases: a PhraseCache, or None if phrases aren't cached
+            own_output: True if the AudioOutput of phrases was opened by this
+                queue (rather than by Marvin's AudioEngine), and is closed
+                with it
+            queue: the Utterances waiting to be spoken
+            current: the Utterance being spoken, or None
+            last: the Utterance queued last, or None
+            lock: a lock guarding current, last and the cancellation of
+                queued Utterances
+            worker: the thread speaking queued text
+            engine: the pyttsx3 engine, once the worker has created it
+            ready: an Event set once the engine has been created
+            error: the exception raised while creating the engine, or None
+    """
+
+    def __init__(self, engine_path="pyttsx3.init", phrase_directory=None,
+                 output=None):
+        self.engine_path = engine_path
+        self.phrases = None
+        self.own_output = output is None
+        if phrase_directory is not None:
+            self.phrases = PhraseCache(phrase_directory,
+                                       output or AudioOutput())
+        self.queue = queue.Queue()
+        self.current = None
+        self.last = None
+        self.lock = threading.Lock()
+        self.engine = None
+        self.error = None
+        self.ready = threading.Event()
+        self.worker = threading.Thread(target=self.run, name="marvin-speech",
+                                       daemon=True)
+        self.worker.start()
+        self.ready.wait()
+        if self.error is not None:
+            raise self.error
+
+    def run(self):
+        """Creates the engine, then speaks queued Utterances until None is
+            queued."""
+        module_path, name = self.engine_path.rsplit(".", 1)
+        try:
+            self.engine = getattr(importlib.import_module(module_path),
+                                  name)()
+            self.engine.connect("started-word", self.on_word)
+            if self.phrases is not None:
+                self.prepare_phrases()
+        except Exception as e:
+            self.error = e
+            return
+        finally:
+            self.ready.set()
+        while True:
+            utterance = self.queue.get()
+            if utterance is None:
+                return
+            with self.lock:
+                if utterance.cancelled:
+                    utterance.done.set()
+                    continue
+                self.current = utterance
+            try:
+                self.speak(utterance)
+            except Exception:
+                logger.exception("Couldn't speak %r", utterance.text)
+            finally:
+                with self.lock:
+                    self.current = None
+                utterance.done.set()
+
+    def prepare_phrases(self):
+        """Renders and loads the cached phrases. The cache only saves
+            synthesis time, so if it fails, the error is logged and every
+            phrase is synthesized instead."""
+        try:
+            with span("speech.render_phrases"):
+                self.phrases.prepare(self.engine)
+        except Exception:
+            logger.exception("Couldn't prepare the phrases in %s, so they "
+                             "will be synthesized", self.phrases.directory)
+            self.phrases.clips.clear()
+
+    def on_word(self, name, location, length):
+        """Called by the engine on the worker thread before each word it
+            speaks, to stop it once the Utterance has been cancelled."""
+        current = self.current
+        if current is not None and current.cancelled:
+            self.engine.stop()
+
+    def speak(self, utterance):
+        """Speaks an Utterance, playing the cached audio of its beginning (or
+            all of it) if there is some."""
+        clip, rest = None, utterance.text
+        if self.phrases is not None:
+            clip, rest = self.phrases.match(utterance.text)
+        if clip is not None:
+            with span("speech.cached_phrase"):
+                self.phrases.play(clip)
+        if rest and not utterance.cancelled:
+            with span("speech.tts", characters=len(rest)):
+                self.engine.say(rest)
+                self.engine.runAndWait()
+
+    def say(self, text):
+        """Queues text to be spoken after everything queued before it.
+
+            Returns:
+                The Utterance of text, whose wait method blocks until it has
+                been spoken.
+        """
+        utterance = Utterance(text)
+        with self.lock:
+            self.last = utterance
+            self.queue.put(utterance)
+        return utterance
+
+    def flush(self):
+        """Blocks until everything queued so far has been spoken (or
+            cancelled). Call this before listening, so that Marvin doesn't
+            hear itself."""
+        last = self.last
+        if last is not None:
+            last.wait()
+
+    async def flush_async(self):
+        """Waits like flush, without blocking the event loop."""
+        await asyncio.get_running_loop().run_in_executor(None, self.flush)
+
+    def cancel(self):
+        """Drops all the text waiting to be spoken, and has the worker stop
+            the text being spoken at its next word."""
+        with self.lock:
+            for utterance in list(self.queue.queue):
+                if utterance is not None:
+                    utterance.cancelled = True
+            if self.current is not None:
+                self.current.cancelled = True
+
+    def close(self):
+        """Speaks everything already queued, then stops the worker."""
+        self.queue.put(None)
+        self.worker.join()
+        if self.phrases is not None and self.own_output:
+            self.phrases.output.close()
@@ -0,0 +1,172 @@
+import os
+import json
+import atexit
+import threading
+from functools import wraps
+from time import perf_counter
+
+
+class Span:
+    """A timed section of Marvin's work, recorded by a Tracer when it ends.
+
+        Attributes:
+            tracer: the Tracer which records the span
+            name: the name of the span, whose prefix up to the first "." is
+                its category (e.g. "api" for "api.owm")
+            args: a dictionary of details shown with the span
+            start: the perf_counter time the span started at
+    """
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.start = None
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def set(self, **args):
+        """Adds details known only once the span's work is done."""
+        self.args.update(args)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.tracer.record(self.name, self.start, perf_counter(), self.args)
+        return False
+
+
+class NullSpan:
+    """The span returned while tracing is off, which records nothing."""
+
+    def __enter__(self):
+        return self
+
+    def set(self, **args):
+        pass
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class Tracer:
+    """Collects spans and writes them to a file in the Chrome trace event
+        format, which chrome://tracing and Perfetto can open.
+
+        The trace is written in the JSON array format, whose closing bracket
+        is optional: the opening bracket is written when tracing starts, and
+        spans are appended every flush_every spans, so a long running
+        process (like the daemon) holds only a few spans in memory, and a
+        crash loses only the spans since the last flush.
+
+        While the tracer is disabled, span returns a shared NullSpan, so
+        instrumented code only pays for one attribute check.
+
+        Attributes:
+            enabled: True if spans are being recorded
+            path: the file the trace is written to
+            flush_every: the number of spans recorded between writes
+            events: the trace events recorded since the last write
+            written: the number of events written to path so far
+            lock: a lock guarding events and the file, since spans end on
+                many threads
+            origin: the perf_counter time trace timestamps are relative to
+    """
+
+    def __init__(self, flush_every=100):
+        self.enabled = False
+        self.path = None
+        self.flush_every = flush_every
+        self.events = []
+        self.written = 0
+        self.lock = threading.Lock()
+        self.origin = perf_counter()
+
+    def start(self, path):
+        """Starts recording spans, which are appended to path as they
+            accumulate, and when the process exits (or stop is called)."""
+        with self.lock:
+            self.path = path
+            self.events = []
+            self.written = 0
+            with open(path, "w") as trace_file:
+                trace_file.write("[")
+        self.enabled = True
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Stops recording spans, and writes the rest of the trace."""
+        self.enabled = False
+        with self.lock:
+            if self.path is None:
+                return
+            self.write()
+            with open(self.path, "a") as trace_file:
+                trace_file.write("\n]\n")
+            self.path = None
+
+    def span(self, name, **args):
+        """Returns a context manager which times the code it wraps as a span
+            called name."""
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, args)
+
+    def record(self, name, start, end, args):
+        """Records a span which ran from start to end (perf_counter times)."""
+        event = {
+            "name": name,
+            "cat": name.split(".", 1)[0],
+            "ph": "X",
+            "ts": (start - self.origin) * 1e6,
+            "dur": (end - start) * 1e6,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": args,
+        }
+        with self.lock:
+            if self.path is None:
+                return
+            self.events.append(event)
+            if len(self.events) >= self.flush_every:
+                self.write()
+
+    def write(self):
+        """Appends the spans recorded since the last write to self.path.
+            The caller holds the lock."""
+        if not self.events:
+            return
+        with open(self.path, "a") as trace_file:
+            for event in self.events:
+                trace_file.write(",\n" if self.written else "\n")
+                json.dump(event, trace_file, default=str)
+                self.written += 1
+        self.events = []
+
+
+# The tracer shared by Marvin and all of its modules
+TRACER = Tracer()
+
+
+def span(name, **args):
+    """Returns a span of the shared tracer (see Tracer.span)."""
+    return TRACER.span(name, **args)
+
+
+def traced(name):
+    """Returns a decorator which records every call to a function as a span
+        called name."""
+    def decorate(function):
+        @wraps(function)
+        def wrapped(*args, **kwargs):
+            if not TRACER.enabled:
+                return function(*args, **kwargs)
+            with Span(TRACER, name, {}):
+                return function(*args, **kwargs)
+        return wrapped
+    return decorate
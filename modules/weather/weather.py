@@ -3,6 +3,8 @@ from pyowm.exceptions.not_found_error import NotFoundError
 from urllib.request import urlopen
 from urllib.error import HTTPError
 from .weather_helper import WeatherHelper
+from modules.cache import cached
+from modules.tracing import traced
 from datetime import datetime, timedelta
 import requests
 import os
@@ -39,10 +41,12 @@ class Weather:
         self.current_location = self.get_current_location()
         self.helper = WeatherHelper()
 
+    @traced("api.public_ip")
     def get_ip_address(self):
         """Returns a string of the current (public) IP address."""
         return urlopen('http://ip.42.pl/raw').read().decode("utf-8")
 
+    @traced("api.ipstack")
     def get_current_location(self):
         """Returns a dictionary with the current city name, latitude, and
             longitude based on the current IP address."""
@@ -56,6 +60,8 @@ class Weather:
             longitude=data['longitude'],
         )
 
+    @cached("weather", state=["current_location"])
+    @traced("api.owm")
     def get_current_weather(self, location=None):
         """Gets the weather today at some location.
 
@@ -72,6 +78,8 @@ class Weather:
         else:
             return self._OWM.weather_at_place(location)
 
+    @cached("weather", state=["current_location"])
+    @traced("api.owm")
     def get_tomorrow_weather(self, location=None):
         """Gets the weather tomorrow at some location.
 
@@ -91,6 +99,8 @@ class Weather:
             return self._OWM.three_hours_forecast(
                 location).get_weather_at(tomorrow)
 
+    @cached("weather", state=["current_location"])
+    @traced("api.owm")
     def get_specific_day_weather(self, day, location=None):
         """Gets the weather on a specified day of the week at some location.
 
@@ -147,6 +157,23 @@ class Weather:
                     false if the command was invalid.
         """
         label, external_location = self.helper.parse_command(command)
+        return self.run_intent(label, external_location, say, listen)
+
+    def run_intent(self, label, external_location, say, listen):
+        """Executes a command which has already been parsed by self.helper.
+
+            Args:
+                label: the label of the command
+                external_location: the location, day of the week or (day,
+                    location) tuple parsed from the command
+                say: A function which will say (either through text to speech
+                    or printing) a string in the main speaker loop
+                listen: A function which will listen and record user input
+                    through either speech to text or through the CLI
+            Returns:
+                True if a command was executed (or failed while executed) and
+                    false if the label was invalid.
+        """
         if label == "current today":
             weather = self.get_current_weather().get_weather()
             weather_code = self.translate_weather_code(
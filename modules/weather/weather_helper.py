@@ -9,7 +9,8 @@ class WeatherHelper(ModuleHelper):
             weather_re: a dictionary from string labels to lists of regular
                 expressions which match commands with similar meanings (e.g.
                 'What's the weather today?' and 'What's the weather outside
-                now')
+                now'). Named groups capture the location and day of the week
+                of the command.
     """
 
     def __init__(self):
@@ -25,30 +26,46 @@ class WeatherHelper(ModuleHelper):
 be )?(like )?tomorrow\??'), ],
             # weather today in an external location
             "external today": [re.compile('[A-Z|a-z|\'| ]*weather \
-(going to be )?(like )?today in [A-Z|a-z|\'| ]+\??'),
+(going to be )?(like )?today in (?P<location>[A-Z|a-z|\'| ]+)\??'),
                                re.compile('[A-Z|a-z|\'| ]*weather now in \
-[A-Z|a-z|\'| ]+\??'),
+(?P<location>[A-Z|a-z|\'| ]+)\??'),
                                re.compile('[A-Z|a-z|\'| ]*weather in \
-[A-Z|a-z|\'| ]+ (going to be )?(like )?today\??'),
+(?P<location>[A-Z|a-z|\'| ]+?) (going to be )?(like )?today\??'),
                                re.compile('[A-Z|a-z|\'| ]*weather in \
-[A-Z|a-z|\'| ]+ now\??'), ],
+(?P<location>[A-Z|a-z|\'| ]+?) now\??'), ],
             # weather tomorrow in an external location
             "external tomorrow": [re.compile('[A-Z|a-z|\'| ]*weather (going to \
-be )?(like )?tomorrow in [A-Z|a-z|\'| ]+\??'),
+be )?(like )?tomorrow in (?P<location>[A-Z|a-z|\'| ]+)\??'),
                                   re.compile('[A-Z|a-z|\'| ]*weather in \
-[A-Z|a-z|\'| ]+( going to be)? tomorrow\??'), ],
+(?P<location>[A-Z|a-z|\'| ]+?)( going to be)? tomorrow\??'), ],
             # weather on specified date in current location
             "current specific": [re.compile('[A-Z|a-z|\'| ]*weather (going to \
-be )(like )??on (monday|tuesday|wednesday|thursday|friday|saturday|sunday)\??'), ],
+be )(like )??on (?P<day>monday|tuesday|wednesday|thursday|friday|saturday|\
+sunday)\??'), ],
             # weather on specified date in external location
             "external specific": [re.compile('[A-Z|a-z|\'| ]*weather (going to \
-be )(like )??on (monday|tuesday|wednesday|thursday|friday|saturday|sunday) in \
-[A-Z|a-z|\'| ]+\??'),
+be )(like )??on (?P<day>monday|tuesday|wednesday|thursday|friday|saturday|\
+sunday) in (?P<location>[A-Z|a-z|\'| ]+)\??'),
                                   re.compile('[A-Z|a-z|\'| ]*weather (going to \
-be )?(like )?in [A-Z|a-z|\'| ]+ on (monday|tuesday|wednesday|thursday|friday|saturday\
-|sunday)\??')],
+be )?(like )?in (?P<location>[A-Z|a-z|\'| ]+?) on (?P<day>monday|tuesday|\
+wednesday|thursday|friday|saturday|sunday)\??')],
         }
 
+    def get_intents(self):
+        return self.weather_re
+
+    def get_args(self, label, slots):
+        """Returns the location of an external command, the day of the week
+            of a current specific command, a (day, location) tuple for an
+            external specific command and None otherwise."""
+        if label == "external specific":
+            return self.weekday_to_int[slots["day"]], slots["location"]
+        elif label == "current specific":
+            return self.weekday_to_int[slots["day"]]
+        elif "external" in label:
+            return slots["location"]
+        return None
+
     def parse_command(self, command):
         """Transforms a command into a label and possibly a location.
 
@@ -62,37 +79,4 @@ be )?(like )?in [A-Z|a-z|\'| ]+ on (monday|tuesday|wednesday|thursday|friday|sat
                 location (and None otherwise). If no regexp is matched,
                 (None, None) is returned.
         """
-        for label in self.weather_re:
-            for regexp in self.weather_re[label]:
-                if regexp.fullmatch(command):
-                    if "external" in label and "specific" not in label:
-                        splits = command.split("in ")[1].split(" ")
-                        if len(splits) == 1 or len(splits) == 2:
-                            external_location = splits[0]
-                        else:
-                            external_location = " ".join(splits[0:-1])
-                        if "going to be" in external_location:
-                            external_location = external_location.split(" going to be")[0]
-                        elif " like" in external_location:
-                            external_location = external_location.split(" like")[0]
-                        return label, external_location
-                    elif label == "external specific":
-                        if command.find(" on ") < command.find(" in "):
-                            split_on = command.split(" on ")[1]
-                            split_in = split_on.split(" in ")
-                            day = self.weekday_to_int[split_in[0]]
-                            external_location = split_in[1].replace('?', '')
-                            return label, (day, external_location)
-                        else:
-                            split_in = command.split(" in ")[1]
-                            split_on = split_in.split(" on ")
-                            day = self.weekday_to_int[split_on[1]]
-                            external_location = split_on[0].replace('?', '')
-                            return label, (day, external_location)
-                    elif label == "current specific":
-                        day = self.weekday_to_int[
-                            command.split("on ")[1].replace('?', '')]
-                        return label, day
-                    else:
-                        return label, None
-        return None, None
+        return self.parse_intent(command)
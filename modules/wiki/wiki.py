@@ -1,4 +1,8 @@
 from .wiki_helper import WikiHelper
+from modules.prefetch import PrefetchMemo
+from modules.cache import cached
+from modules.tracing import traced
+import asyncio
 import wikipedia
 
 
@@ -8,10 +12,37 @@ class Wiki:
        Attributes:
             helper: a WikiHelper object which will perform the parsing
                 and interpretation of commands for this class.
+            prefetched: a PrefetchMemo of the summaries of queries searched
+                before their command was executed
     """
 
     def __init__(self):
         self.helper = WikiHelper()
+        self.prefetched = PrefetchMemo()
+
+    def get_summary(self, query):
+        """Returns the summary of the Wikipedia page matching query, using a
+            prefetched summary if there is one."""
+        summary = self.prefetched.pop(query)
+        if summary is None:
+            summary = self.fetch_summary(query)
+        return summary
+
+    @cached("wiki")
+    @traced("api.wikipedia")
+    def fetch_summary(self, query):
+        """Returns the summary of the Wikipedia page matching query."""
+        return wikipedia.summary(query, sentences=2)
+
+    def prefetch(self, label, query):
+        """Searches Wikipedia for a command which may be executed soon.
+
+            Args:
+                label: the label of the command
+                query: the search term parsed from the command
+        """
+        if label == "search":
+            self.prefetched.put(query, self.fetch_summary(query))
 
     def route_command(self, command, say, listen):
         """Generates a string response for a given wiki command.
@@ -28,11 +59,27 @@ class Wiki:
                     false if the command was invalid.
         """
         label, query = self.helper.parse_command(command)
+        return self.run_intent(label, query, say, listen)
+
+    def run_intent(self, label, query, say, listen):
+        """Executes a command which has already been parsed by self.helper.
+
+            Args:
+                label: the label of the command
+                query: the search term parsed from the command
+                say: A function which will say (either through text to speech
+                    or printing) a string in the main speaker loop
+                listen: A function which will listen and record user input
+                    through either speech to text or through the CLI
+            Returns:
+                True if a command was executed (or failed while executed) and
+                    false if the label was invalid.
+        """
         if label == "search":
             # say("Searching for information about {} on Wikipedia".format(
             #    query))
             try:
-                say(wikipedia.summary(query, sentences=2))
+                say(self.get_summary(query))
             except wikipedia.exceptions.PageError:
                 say("Could not find any results for that query")
             except wikipedia.exceptions.DisambiguationError:
@@ -40,3 +87,32 @@ class Wiki:
         else:
             return False
         return True
+
+    async def run_intent_async(self, label, query, say, listen):
+        """Executes a command like run_intent, but lets the event loop run
+            other commands while Wikipedia is being queried.
+
+            Args:
+                label: the label of the command
+                query: the search term parsed from the command
+                say: A function which will say (either through text to speech
+                    or printing) a string in the main speaker loop
+                listen: A function which will listen and record user input
+                    through either speech to text or through the CLI
+            Returns:
+                True if a command was executed (or failed while executed) and
+                    false if the label was invalid.
+        """
+        if label != "search":
+            return False
+        loop = asyncio.get_running_loop()
+        try:
+            summary = await loop.run_in_executor(None, self.get_summary,
+                                                 query)
+        except wikipedia.exceptions.PageError:
+            say("Could not find any results for that query")
+        except wikipedia.exceptions.DisambiguationError:
+            say("Can you please clarify your query")
+        else:
+            say(summary)
+        return True
@@ -15,11 +15,19 @@ class WikiHelper(ModuleHelper):
     def __init__(self):
         ModuleHelper.__init__(self)
         self.wiki_re = {
-            "search": [re.compile("[A-Z|a-z|\'| ]*(search|look up) [A-Z|a-z\
-|\'|0-9| |:]*(on wikipedia)?"), re.compile("[A-Z|a-z|\'| ]*(what|who)( is| are) \
-[A-Z|a-z|\'|0-9| |:]*\??"), ],
+            "search": [re.compile("[A-Z|a-z|\'| ]*?(search|look up) \
+(?P<query>[A-Z|a-z|\'|0-9| |:]*?)( on wikipedia[A-Z|a-z|\'|0-9| |:]*)?"),
+                       re.compile("[A-Z|a-z|\'| ]*?(what|who)( is| are) \
+(?P<query>[A-Z|a-z|\'|0-9| |:]*?)( on wikipedia[A-Z|a-z|\'|0-9| |:]*)?\??"), ],
         }
 
+    def get_intents(self):
+        return self.wiki_re
+
+    def get_args(self, label, slots):
+        """Returns the search term of a search command."""
+        return slots["query"]
+
     def parse_command(self, command):
         """Transforms a command into a label.
 
@@ -30,29 +38,4 @@ class WikiHelper(ModuleHelper):
                 the label of the first regular expression in
                 self.wiki_re which matches command, then the search term
         """
-        for label in self.wiki_re:
-            for regexp in self.wiki_re[label]:
-                if regexp.fullmatch(command):
-                    if label == "search":
-                        if "search " in command and "look up " not in command:
-                            command = command.split("search ")[1]
-                        elif "look up " in command:
-                            command = command.split("look up ")[1]
-                        elif "what is " in command:
-                            command = command.split("what is ")[1].replace(
-                                "?", "")
-                        elif "who is " in command:
-                            command = command.split("who is ")[1].replace(
-                                "?", "")
-                        elif "what are " in command:
-                            command = command.split("what are ")[1].replace(
-                                "?", ""
-                            )
-                        elif "who are " in command:
-                            command = command.split("who are ")[1].replace(
-                                "?", ""
-                            )
-                        if "on wikipedia" in command:
-                            command = command.split(" on wikipedia")[0]
-                        return label, command
-        return None
+        return self.parse_intent(command)